@@ -143,8 +143,12 @@ STATIC_URL = '/static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# EXPORT_SNAPSHOT_DIR -> set up in developer.py & production.py (export snapshots, see opencon/application/snapshots.py)
+# Incremental exports (`?since=`) stop this long before the export starts -- longer than any transaction takes to commit
+EXPORT_WATERMARK_MARGIN_SECONDS = 10 * 60
+
 EMAIL_DATA_BACKUP = ['opencon2017+app@gmail.com', 'opencon2017@yahoo.com', 'openconapp+opencon2017application@gmail.com',]
-# SEND_EMAILS -> set up in developer.py & production.py
+# SEND_EMAILS, REVIEWER_MAIL_ENABLED -> set up in developer.py & production.py
 SEND_ACCESS_INTERVAL = 10 # How often we can send access (in minutes)
 
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL')
@@ -155,6 +159,16 @@ EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_PORT = os.environ.get('EMAIL_PORT')
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS')
 
+# Reviewer invitations (see opencon/rating/management/commands/invite_reviewers.py)
+FROM_MAIL = DEFAULT_FROM_EMAIL
+BASE_URL = os.environ.get('BASE_URL', 'https://apply.opencon2017.org')  # prefix of the links in the mail, no trailing slash
+
+# Outbox of the mail sent by the application, delivered by `python manage.py send_queued_mail` (see opencon/application/mail.py)
+MAIL_OUTBOX_BATCH_SIZE = 50
+MAIL_OUTBOX_MAX_ATTEMPTS = 10
+MAIL_OUTBOX_RETRY_SECONDS = 60  # doubled after every failed attempt...
+MAIL_OUTBOX_MAX_RETRY_SECONDS = 6 * 60 * 60  # ...up to this
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 MAX_CUSTOM_REFERRAL_LENGTH = 20
@@ -170,6 +184,22 @@ STATICFILES_STORAGE = 'whitenoise.django.GzipManifestStaticFilesStorage'
 LEADERBOARD_ROUND0_MAX_DISPLAYED = 75
 LEADERBOARD_ROUND1_MAX_DISPLAYED = 75
 LEADERBOARD_ROUND2_MAX_DISPLAYED = 75
+# Leaderboards are cached for this long (and refreshed sooner whenever a rating is saved, see opencon/rating/leaderboard.py)
+LEADERBOARD_CACHE_SECONDS = 60
+
+# Number of rows per page of the reviewers' application lists (see opencon/rating/pagination.py)
+RATING_LIST_PAGE_SIZE = 100
+
+# Facet choices (and their counts) of the reviewers' application filters are cached for this long (see opencon/rating/filters.py)
+RATING_FILTER_CACHE_SECONDS = 30
+
+# Autocomplete responses are cached for this long in the shared cache (and dropped sooner when their data change,
+# see opencon/application/autocomplete_cache.py), and for this long by the browsers
+AUTOCOMPLETE_CACHE_SECONDS = 24 * 60 * 60
+AUTOCOMPLETE_BROWSER_CACHE_SECONDS = 10 * 60
+
+# How long an application assigned to a reviewer stays reserved for them (see opencon/rating/queue.py)
+RATING_LEASE_MINUTES = 30
 
 REDIRECT_URL = 'http://www.opencon2017.org/opportunities'
 
@@ -210,6 +240,10 @@ LOGGING = {
             'handlers': ['file'],
             'level': 'DEBUG',
         },
+        'opencon': {
+            'handlers': ['file'],
+            'level': 'INFO',
+        },
     }
 }
 
@@ -20,3 +20,7 @@ ALLOWED_HOSTS = ['applytest.opencon2017.org', 'localhost'] # test domain
 
 # 2017-07-01`16:41:46 -- moved from common settings
 SEND_EMAILS = False
+REVIEWER_MAIL_ENABLED = False
+
+# full copies of the exports (personal data) -- never under MEDIA_ROOT or STATIC_ROOT, those are served to anyone
+EXPORT_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'private', 'exports')
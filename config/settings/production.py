@@ -6,3 +6,18 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 
 # 2017-07-01`16:41:59 -- moved from common settings file
 SEND_EMAILS = True
+REVIEWER_MAIL_ENABLED = True
+
+# full copies of the exports (personal data) -- never under MEDIA_ROOT or STATIC_ROOT, those are served to anyone
+EXPORT_SNAPSHOT_DIR = os.environ.get('EXPORT_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'private', 'exports'))
+
+# shared by all gunicorn workers (e.g. the leaderboards are cached here) -- the redis service is defined in docker-compose.yml
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://redis:6379/1'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    },
+}
@@ -0,0 +1 @@
+default_app_config = 'opencon.application.apps.ApplicationConfig'
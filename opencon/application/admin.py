@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Application2017, Draft, Reference
+from django.utils import timezone
+from .models import Application2017, Draft, OutgoingEmail, Reference
 from .forms import Application2017Form, ChangeStatusAdminForm
 
 
@@ -116,3 +117,18 @@ class ReferenceAdmin(admin.ModelAdmin):
     list_display = ('key', 'name')
 
 admin.site.register(Reference, ReferenceAdmin)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'created_at', 'sent_at', 'next_attempt_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at', 'sent_at', 'attempts', 'last_error')
+    search_fields = ('subject', 'to')
+    actions = ['retry']
+
+    def retry(self, request, queryset):
+        """Queues failed mail again (e.g. after fixing the SMTP settings)"""
+        queryset.exclude(status=OutgoingEmail.SENT).update(status=OutgoingEmail.QUEUED, attempts=0, next_attempt_at=timezone.now(), updated_at=timezone.now())
+    retry.short_description = 'Send again'
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,139 @@
+"""
+In-memory search index of the airports (used by AirportAutocomplete).
+
+Every worker process builds the index from the Airport table on first use and
+keeps it until the table changes: saving or deleting an airport (or loading
+the airport list, see loaders.py) stores a new version in the cache, and a
+worker which sees a version different from the one of its index rebuilds it.
+Searching only needs this one cache read, no database queries. (With the
+local-memory cache of development, only the process which changed the table
+notices -- production uses Redis.)
+
+The index holds the airports sorted by name, the exact IATA codes and the
+sorted list of the words of the names (lowercased, accents removed), so that
+"the words of the query are prefixes of words of the name" is a few binary
+searches and set intersections.
+"""
+import bisect
+import re
+import unicodedata
+import uuid
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Airport
+
+VERSION_KEY = 'airport-index:version'
+
+
+class AirportEntry(namedtuple('AirportEntry', 'pk iata_code name')):
+    """The fields of an Airport shown by the autocomplete (str() is the same as for the model)"""
+    __slots__ = ()
+
+    def __str__(self):
+        return '[{}] {}'.format(self.iata_code, self.name)
+
+
+def normalize(text):
+    """Lowercase words without accents, e.g. 'São Paulo (Guarulhos)' -> ['sao', 'paulo', 'guarulhos']"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text.casefold())
+
+
+class AirportIndex:
+    """Immutable index of the given AirportEntries (see the module docstring)"""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.entries = tuple(sorted(entries, key=lambda entry: normalize(entry.name)))
+        self.normalized = tuple(' '.join(normalize(entry.name)) for entry in self.entries)
+        iata, words = {}, set()
+        for i, entry in enumerate(self.entries):
+            iata.setdefault(entry.iata_code.upper(), []).append(i)
+            words.update((word, i) for word in normalize(entry.name))
+        self.iata = {code: tuple(indexes) for code, indexes in iata.items()}
+        self.iata_codes = tuple(sorted(self.iata))
+        words = sorted(words)
+        self.words = tuple(word for word, i in words)
+        self.word_entries = tuple(i for word, i in words)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def prefix_matches(self, prefix):
+        """Indexes of the entries with a word starting with `prefix`"""
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + '\U0010ffff', start)
+        return set(self.word_entries[start:end])
+
+    def iata_matches(self, prefix):
+        start = bisect.bisect_left(self.iata_codes, prefix)
+        end = bisect.bisect_left(self.iata_codes, prefix + '\U0010ffff', start)
+        return {i for code in self.iata_codes[start:end] for i in self.iata[code]}
+
+    def search(self, query):
+        """
+        AirportEntries matching the query, best first: the exact IATA code,
+        then IATA codes starting with the query, names starting with it (e.g.
+        the city) and other names containing all the words of the query
+        (as word prefixes); alphabetically within each group
+        """
+        words = normalize(query or '')
+        if not words:
+            return list(self.entries)
+
+        code = query.strip().upper()
+        by_code = self.iata_matches(code) if len(words) == 1 else set()
+        by_name = self.prefix_matches(words[0])
+        for word in words[1:]:
+            if not by_name:
+                break
+            by_name &= self.prefix_matches(word)
+
+        phrase = ' '.join(words)
+
+        def rank(i):
+            if self.entries[i].iata_code.upper() == code:
+                return 0, i
+            if i in by_code:
+                return 1, i
+            if self.normalized[i].startswith(phrase):
+                return 2, i
+            return 3, i
+
+        return [self.entries[i] for i in sorted(by_code | by_name, key=rank)]
+
+
+_index = None
+
+
+def build_index(version=None):
+    entries = [AirportEntry(*row) for row in Airport.objects.values_list('pk', 'iata_code', 'name')]
+    return AirportIndex(entries, version)
+
+
+def current_version():
+    """The version of the Airport table, which changes whenever an airport is saved or deleted"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_index():
+    """The index of this process, rebuilt if the airports changed since it was built"""
+    global _index
+    version = current_version()
+    index = _index
+    if index is None or index.version != version:
+        index = _index = build_index(version)
+    return index
+
+
+def invalidate(**kwargs):
+    """Makes every process rebuild its index once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
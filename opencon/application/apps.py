@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class ApplicationConfig(AppConfig):
-    name = 'application'
+    name = 'opencon.application'
+    label = 'application'
+
+    def ready(self):
+        from . import airport_index
+        from .indexes import create_partial_indexes
+        post_migrate.connect(create_partial_indexes, sender=self, dispatch_uid='create_partial_indexes')
+
+        Airport = self.get_model('Airport')
+        post_save.connect(airport_index.invalidate, sender=Airport, dispatch_uid='invalidate_airport_index_save')
+        post_delete.connect(airport_index.invalidate, sender=Airport, dispatch_uid='invalidate_airport_index_delete')
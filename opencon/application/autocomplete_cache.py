@@ -0,0 +1,104 @@
+"""
+Shared cache of the autocomplete responses (see CachedAutocompleteMixin).
+
+Every applicant typing "lon" gets the same JSON, so the serialized responses
+are cached, keyed by the endpoint, the version of its data, the normalized
+query (see airport_index.normalize -- "Lon", " lon" and "LON" are the same
+query) and the page. The responses also carry an ETag and Cache-Control
+headers, so the browser itself repeats a query without a request, or with a
+conditional one answered by 304 Not Modified.
+
+The hits, misses and 304s of every endpoint are counted in the cache; see
+`python manage.py autocomplete_stats`.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+from .airport_index import normalize
+
+COUNTERS = ('hits', 'misses', 'not_modified')
+
+# the cache_name of the cached views (see views.py)
+ENDPOINTS = ('airports',)
+
+
+def normalize_query(q):
+    return ' '.join(normalize(q or ''))
+
+
+def cache_key(endpoint, version, q, page):
+    # hashed: the query is free text (spaces, non-ASCII letters) and may be long
+    digest = hashlib.md5('{}\n{}'.format(q, page).encode('utf-8')).hexdigest()
+    return 'autocomplete:{}:{}:{}'.format(endpoint, version, digest)
+
+
+def counter_key(endpoint, counter):
+    return 'autocomplete-stats:{}:{}'.format(endpoint, counter)
+
+
+def count(endpoint, counter):
+    key = counter_key(endpoint, counter)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted in between
+        cache.add(key, 1, None)
+
+
+def get_stats(endpoint):
+    """{'hits', 'misses', 'not_modified', 'hit_rate'} of the endpoint -- 304s count as hits too"""
+    stats = {counter: cache.get(counter_key(endpoint, counter)) or 0 for counter in COUNTERS}
+    requests = stats['hits'] + stats['misses']
+    stats['hit_rate'] = float(stats['hits']) / requests if requests else None
+    return stats
+
+
+def reset_stats(endpoint):
+    cache.delete_many([counter_key(endpoint, counter) for counter in COUNTERS])
+
+
+def etag_matches(request, etag):
+    tags = [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
+class CachedAutocompleteMixin:
+    """
+    Serves the GET responses of a dal autocomplete view from the shared cache.
+    The view sets `cache_name` and overrides `cache_version` to return a value
+    which changes with its data (otherwise the cached responses only expire
+    after AUTOCOMPLETE_CACHE_SECONDS).
+    """
+    cache_name = None
+
+    def cache_version(self):
+        return ''
+
+    def get(self, request, *args, **kwargs):
+        self.q = normalize_query(self.q)
+        key = cache_key(self.cache_name, self.cache_version(), self.q, request.GET.get('page') or '1')
+        cached = cache.get(key)
+        if cached is not None:
+            count(self.cache_name, 'hits')
+            etag, content = cached
+        else:
+            count(self.cache_name, 'misses')
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = response.content
+            etag = '"{}"'.format(hashlib.md5(content).hexdigest())
+            cache.set(key, (etag, content), settings.AUTOCOMPLETE_CACHE_SECONDS)
+
+        if etag_matches(request, etag):
+            count(self.cache_name, 'not_modified')
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.AUTOCOMPLETE_BROWSER_CACHE_SECONDS)
+        return response
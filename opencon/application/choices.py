@@ -0,0 +1,66 @@
+"""
+Label index of the choice tables (`*_CHOICES`), built once at import time.
+
+The choice tables are lists of (code, label) pairs, so looking up the label of
+a code used to mean building `dict(Application2017.COUNTRY_CHOICES)` -- for
+every call, i.e. for every field of every row shown. ChoiceLabelIndex turns
+every table into a read-only dict once; `CHOICE_LABELS` (see models.py) is the
+index of all tables of Application2017 and data.py.
+
+USAGE:
+CHOICE_LABELS.label('citizenship', 'SK')  # by field name -> 'Slovakia'
+CHOICE_LABELS.label('COUNTRY_CHOICES', 'SK')  # by table name
+CHOICE_LABELS.labels('events', ['oa_week', 'other'])
+"""
+from types import MappingProxyType
+
+
+def choice_items(choices):
+    """(code, label) pairs of a choice table, including the ones in option groups"""
+    for code, label in choices:
+        if isinstance(label, (list, tuple)):
+            yield from choice_items(label)
+        else:
+            yield code, label
+
+
+class ChoiceLabelIndex(object):
+    """Read-only {table: {code: label}} index with additional names (e.g. field names) of the tables"""
+
+    def __init__(self, tables, aliases=None):
+        self._tables = MappingProxyType({
+            name: MappingProxyType(dict(choice_items(choices))) for name, choices in tables.items()
+        })
+        aliases = aliases or {}
+        unknown = set(aliases.values()) - set(self._tables)
+        if unknown:
+            raise ValueError('Aliases of unknown choice tables: {}'.format(', '.join(sorted(unknown))))
+        self._aliases = MappingProxyType(dict(aliases))
+
+    @classmethod
+    def from_namespace(cls, namespace, prefix='', aliases=None):
+        """Index of all `*_CHOICES` attributes of a class or module"""
+        tables = {prefix + name: getattr(namespace, name) for name in dir(namespace) if name.endswith('_CHOICES')}
+        return cls(tables, aliases)
+
+    def merge(self, other):
+        """New index with the tables and aliases of both indexes"""
+        tables, aliases = dict(self._tables), dict(self._aliases)
+        tables.update(other._tables)
+        aliases.update(other._aliases)
+        return type(self)(tables, aliases)
+
+    def table(self, name):
+        """{code: label} of the table with the given name (or alias)"""
+        return self._tables[self._aliases.get(name, name)]
+
+    def label(self, name, code, default=None):
+        return self.table(name).get(code, default)
+
+    def labels(self, name, codes):
+        """Labels of the codes -- unknown codes are kept as they are"""
+        table = self.table(name)
+        return [table.get(code, code) for code in codes]
+
+    def __contains__(self, name):
+        return name in self._aliases or name in self._tables
@@ -0,0 +1,63 @@
+from django.db import connections
+from django.db.models import Case, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+
+def skip_locked_pks(queryset, limit=1):
+    """
+    Returns primary keys of the first `limit` rows of an (ordered) queryset and
+    locks them for the rest of the current transaction, skipping rows which are
+    already locked by another transaction (`SELECT ... FOR UPDATE SKIP LOCKED`).
+
+    Django 1.10 does not support SKIP LOCKED yet, so the locking clause is
+    appended to the SQL generated by the ORM. On backends without row-level
+    locking (SQLite) the rows are returned without a lock -- callers have to
+    claim them with a conditional UPDATE and retry when they lose the race.
+
+    USAGE:
+    with transaction.atomic():
+        pks = skip_locked_pks(Job.objects.filter(done=False).order_by('id'), limit=10)
+    """
+    connection = connections[queryset.db]
+    queryset = queryset.values_list('pk', flat=True)[:limit]
+    if connection.vendor != 'postgresql':
+        return list(queryset)
+
+    sql, params = queryset.query.sql_with_params()
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute('{} FOR UPDATE OF {} SKIP LOCKED'.format(sql, table), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_update(queryset, objs, fields, batch_size=500, **values):
+    """
+    Writes `fields` of the given model instances with one UPDATE per batch:
+    `UPDATE ... SET field = CASE WHEN id = 1 THEN ... WHEN id = 2 THEN ... END
+    WHERE id IN (1, 2, ...)`. Extra keyword arguments are set on all of the rows
+    (e.g. `updated_at=timezone.now()`). Returns the number of updated rows.
+
+    Django 1.10 has no QuerySet.bulk_update(), this is the same thing. Note
+    that neither save() nor the pre_save / post_save signals are called --
+    `auto_now` fields (e.g. `updated_at`, used by the incremental exports) are
+    set to the current time unless they are written explicitly.
+    """
+    model = queryset.model
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False) and field.name not in fields and field.attname not in values:
+            values[field.attname] = timezone.now()
+    requires_casting = connections[queryset.db].vendor == 'postgresql'  # CASE of untyped parameters would be text
+    objs = list(objs)
+    fields = [model._meta.get_field(name) for name in fields]
+    updated = 0
+    for start in range(0, len(objs), batch_size):
+        batch = objs[start:start + batch_size]
+        changes = dict(values)
+        for field in fields:
+            whens = [When(pk=obj.pk, then=Value(getattr(obj, field.attname), output_field=field)) for obj in batch]
+            changes[field.attname] = Case(*whens, output_field=field)
+            if requires_casting:
+                changes[field.attname] = Cast(changes[field.attname], field)
+        updated += queryset.filter(pk__in=[obj.pk for obj in batch]).update(**changes)
+    return updated
@@ -0,0 +1,262 @@
+"""
+Streaming CSV exports of the resources in resources.py.
+
+`Resource().export()` builds the whole tablib dataset (and then the whole CSV
+string) in memory before the first byte is sent. The exports here write the
+same columns, rendered by the same import-export widgets, row by row: the rows
+are read `CHUNK_SIZE` at a time (keyset pagination on the primary key, as a
+narrow `values_list` projection) and every chunk is sent before the next one
+is read, so the memory use does not grow with the number of rows.
+
+Only plain model fields and foreign keys are supported (no `dehydrate_*`
+methods or many-to-many fields).
+
+Incremental exports: with `since`, only the rows created or updated after
+that time are exported (in `updated_at` order), up to the watermark. Every
+export sends its watermark in the X-Export-Watermark header, to be passed as
+`?since=` next time. `updated_at` is stamped before the transaction commits,
+so a row may become visible long after its `updated_at`: the watermark is
+EXPORT_WATERMARK_MARGIN_SECONDS (longer than any transaction) before the
+export started, and the rows changed since then are exported the next time
+again. Rows which disappear from an export (e.g. deleted applications) are not
+reported.
+
+The wide export (iter_wide_csv) has one row per application: its columns,
+the aggregates of its ratings and the ratings of every Round 1 / Round 2
+reviewer pivoted into columns. With `since`, it has the rows of the
+applications changed since then and of the ones with a Round 1 / Round 2
+rating changed since then (a deleted rating changes the running totals, i.e.
+the application).
+"""
+import csv
+import datetime
+import math
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from import_export import widgets
+from opencon.rating.models import Round1Rating, Round2Rating
+
+from .resources import Application2017Resource
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object for csv.writer -- `write` returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(resource):
+    """[(header, values_list lookup, widget)] for the export fields of the resource"""
+    opts = resource._meta.model._meta
+    columns = []
+    for field in resource.get_export_fields():
+        if getattr(resource, 'dehydrate_{}'.format(resource.get_field_name(field)), None) is not None:
+            raise ValueError('Cannot stream the dehydrated field {!r}'.format(field.column_name))
+        lookup, widget = field.attribute, field.widget
+        if isinstance(widget, widgets.ManyToManyWidget):
+            raise ValueError('Cannot stream the many-to-many field {!r}'.format(field.column_name))
+        if isinstance(widget, widgets.ForeignKeyWidget):
+            # the rendered value is a column of the related object -- for the pk, the FK column itself
+            lookup = opts.get_field(lookup).attname if widget.field == 'pk' else '{}__{}'.format(lookup, widget.field)
+            widget = widgets.Widget()
+        columns.append((field.column_name, lookup, widget))
+    return columns
+
+
+def seek(keyset, values):
+    """Rows strictly after `values` in the order of the `keyset` fields"""
+    condition = Q()
+    for i, field in enumerate(keyset):
+        equal = dict(zip(keyset[:i], values[:i]))
+        condition |= Q(**equal) & Q(**{'{}__gt'.format(field): values[i]})
+    return condition
+
+
+def iter_values(queryset, lookups, chunk_size=CHUNK_SIZE, keyset=('pk',)):
+    """
+    Yields `queryset.values_list(*lookups)` ordered by `keyset` (which has to
+    end with 'pk'), reading `chunk_size` rows at a time
+    """
+    queryset = queryset.order_by(*keyset)
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(seek(keyset, last))
+        rows = list(chunk.values_list(*(tuple(keyset) + tuple(lookups)))[:chunk_size])
+        for row in rows:
+            yield row[len(keyset):]
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][:len(keyset)]
+
+
+def iter_csv(resource, queryset=None, chunk_size=CHUNK_SIZE, keyset=('pk',)):
+    """Yields the lines of the CSV export of the resource (the same output as `resource.export().csv`)"""
+    if queryset is None:
+        queryset = resource.get_queryset()
+    columns = export_columns(resource)
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, lookup, widget in columns])
+    renderers = [widget.render for header, lookup, widget in columns]
+    for values in iter_values(queryset, [lookup for header, lookup, widget in columns], chunk_size, keyset):
+        yield writer.writerow(['' if value is None else render(value) for render, value in zip(renderers, values)])
+
+
+def parse_watermark(value):
+    """The `since` parameter (an ISO 8601 time, as sent in X-Export-Watermark) -- raises ValueError"""
+    # an unescaped "+" of the UTC offset arrives as a space
+    since = parse_datetime(re.sub(r' (\d\d:?\d\d)$', r'+\1', value.strip()))
+    if since is None:
+        raise ValueError('Invalid watermark: {!r}'.format(value))
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def current_watermark():
+    """The watermark of an export starting now -- the changes after it may still be uncommitted"""
+    return timezone.now() - datetime.timedelta(seconds=settings.EXPORT_WATERMARK_MARGIN_SECONDS)
+
+
+def csv_response(resource, filename, queryset=None, since=None):
+    if queryset is None:
+        queryset = resource.get_queryset()
+    keyset = ('pk',)
+    watermark = current_watermark()
+    if since is not None:
+        watermark = max(watermark, since)
+        # later changes (and the ones which may still be uncommitted) go to the next export
+        queryset = queryset.filter(updated_at__gt=since, updated_at__lte=watermark)
+        keyset = ('updated_at', 'pk')
+
+    response = StreamingHttpResponse(iter_csv(resource, queryset, keyset=keyset), content_type='csv')
+    response['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+    response['X-Export-Watermark'] = watermark.isoformat()
+    return response
+
+
+# (column prefix, rating model, [(column, lookup)]) -- one group of columns per rating of the round
+RATING_PIVOTS = [
+    ('r1', Round1Rating, [
+        ('reviewer', 'created_by__nick'), ('rating', 'rating'), ('recommendations', 'recommendations'), ('issues', 'issues'),
+    ]),
+    ('r2', Round2Rating, [
+        ('reviewer', 'created_by__nick'), ('rating', 'rating'), ('decision', 'decision'),
+        ('recommendations', 'recommendations'), ('issues', 'issues'),
+    ]),
+]
+
+# aggregates of the ratings, from the running totals (see Application2017.SUMMARY_FIELDS)
+AGGREGATE_HEADERS = [
+    'r0_yes', 'r0_no', 'r0_review',
+    'r1_count', 'r1_average', 'r1_standard_deviation',
+    'r2_count', 'r2_average', 'r2_standard_deviation',
+]
+
+
+def score_aggregates(count, total, squares):
+    """[count, average, (population) standard deviation] of the ratings given by their count, sum and sum of squares"""
+    if not count:
+        return [0, '', '']
+    average = float(total) / count
+    return [count, round(average, 2), round(math.sqrt(max(float(squares) / count - average * average, 0)), 2)]
+
+
+def render_pivoted(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):  # recommendations / issues
+        return ', '.join(str(item) for item in value)
+    return value
+
+
+def group_ratings(model, lookups, low, high, application_ids=None):
+    """
+    {application id: [values of the lookups of each rating]} for the
+    applications with `low <= id <= high` (only the given ones, if any)
+    """
+    ratings = defaultdict(list)
+    queryset = model.objects.filter(application_id__gte=low, application_id__lte=high).order_by('application_id', 'pk')
+    if application_ids is not None:
+        queryset = queryset.filter(application_id__in=application_ids)
+    for row in queryset.values_list('application_id', *lookups):
+        ratings[row[0]].append(row[1:])
+    return ratings
+
+
+def iter_wide_csv(chunk_size=CHUNK_SIZE, since=None, watermark=None):
+    """
+    Yields the lines of the wide export (with `since`: only the rows changed
+    after `since`, up to `watermark`). Besides two queries counting the
+    columns needed for the reviewers, every chunk of applications takes three
+    queries: the applications and the Round 1 and Round 2 ratings of their id range.
+    """
+    resource = Application2017Resource()
+    columns = export_columns(resource)
+    summary_fields = ['r0_yes_count', 'r0_no_count', 'r0_review_count',
+                      'r1_count', 'r1_sum', 'r1_sum_squares', 'r2_count', 'r2_sum', 'r2_sum_squares']
+    lookups = [lookup for header, lookup, widget in columns] + summary_fields
+    renderers = [widget.render for header, lookup, widget in columns]
+
+    slots = {}  # the highest number of ratings of one application, per round
+    headers = [header for header, lookup, widget in columns] + AGGREGATE_HEADERS
+    for prefix, model, pivoted in RATING_PIVOTS:
+        per_application = model.objects.values('application').annotate(n=Count('id')).order_by()
+        slots[prefix] = per_application.aggregate(slots=Max('n'))['slots'] or 0
+        for i in range(1, slots[prefix] + 1):
+            headers += ['{}_{}_{}'.format(prefix, i, column) for column, lookup in pivoted]
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+
+    queryset = resource.get_queryset().order_by('pk')
+    if since is not None:
+        changed = Q(updated_at__gt=since, updated_at__lte=watermark)
+        for prefix, model, pivoted in RATING_PIVOTS:
+            rated = model.objects.filter(updated_at__gt=since, updated_at__lte=watermark).values('application_id')
+            changed |= Q(pk__in=rated)
+        queryset = queryset.filter(changed)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        applications = list(chunk.values_list('pk', *lookups)[:chunk_size])
+        if not applications:
+            return
+        low, high = applications[0][0], applications[-1][0]
+        # the changed applications may be far apart: read the ratings of the ones in the chunk only
+        ids = [row[0] for row in applications] if since is not None else None
+        ratings = {prefix: group_ratings(model, [lookup for column, lookup in pivoted], low, high, ids)
+                   for prefix, model, pivoted in RATING_PIVOTS}
+
+        for row in applications:
+            pk, values, totals = row[0], row[1:len(columns) + 1], row[len(columns) + 1:]
+            line = ['' if value is None else render(value) for render, value in zip(renderers, values)]
+            line += list(totals[:3]) + score_aggregates(*totals[3:6]) + score_aggregates(*totals[6:9])
+            for prefix, model, pivoted in RATING_PIVOTS:
+                given = ratings[prefix].get(pk, [])[:slots[prefix]]
+                for rating in given:
+                    line += [render_pivoted(value) for value in rating]
+                line += [''] * (len(pivoted) * (slots[prefix] - len(given)))
+            yield writer.writerow(line)
+
+        if len(applications) < chunk_size:
+            return
+        last_pk = high
+
+
+def wide_csv_response(filename, since=None):
+    watermark = current_watermark()
+    if since is not None:
+        watermark = max(watermark, since)
+    response = StreamingHttpResponse(iter_wide_csv(since=since, watermark=watermark), content_type='csv')
+    response['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+    response['X-Export-Watermark'] = watermark.isoformat()
+    return response
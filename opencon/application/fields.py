@@ -0,0 +1,68 @@
+import json
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+
+from .utils import decode_literal
+
+
+class ChoiceListFormField(forms.Field):
+    """Passes the list of a multiple-choice widget (e.g. CheckboxSelectMultiple) to the model as it is"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return []
+        return value
+
+
+class ChoiceListField(models.TextField):
+    """
+    Multiple choices -- a list of choice codes, or a [choice(s), written in answer]
+    pair (see forms_field_other.py) -- stored as JSON text, so they are decoded by
+    `json.loads` and can be matched in queries, e.g.
+    `Application2017.objects.filter(events__contains='"oa_week"')`.
+
+    Values stored by earlier versions as Python reprs are still readable (see
+    utils.decode_literal) and are converted by `python manage.py convert_choice_lists`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', list)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection, context):
+        if not value:
+            return [] if value == '' else value
+        try:
+            return decode_literal(value)
+        except ValueError:
+            return value  # shown as it is stored (see rating/rendering.py)
+
+    def to_python(self, value):
+        if value in (None, ''):
+            return []
+        try:
+            return decode_literal(value)
+        except ValueError:
+            raise ValidationError('Invalid list of choices.', code='invalid')
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                value = decode_literal(value)
+            except ValueError:
+                pass  # a single code, e.g. the right-hand side of a lookup
+        if isinstance(value, tuple):
+            value = list(value)
+        return json.dumps(value)
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
+
+    def formfield(self, **kwargs):
+        defaults = {'form_class': ChoiceListFormField}
+        defaults.update(kwargs)
+        return super().formfield(**defaults)
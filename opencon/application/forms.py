@@ -6,7 +6,6 @@ from django.core.validators import ValidationError
 from django.forms.widgets import CheckboxSelectMultiple, HiddenInput, RadioSelect, Select
 
 from dal import autocomplete
-import ast
 from .data import *
 from .models import STATUS_CHOICES
 
@@ -17,17 +16,7 @@ class Application2017Form(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         kwargs.setdefault('label_suffix', '') # do not append colon to the widget labels
-        if kwargs.get('instance'):
-            kwargs['initial'] = {
-                # these are the fields which use CheckboxSelectMultiple widget
-                'events': ast.literal_eval(kwargs.get('instance').events or '[]'),
-                'profession': ast.literal_eval(kwargs.get('instance').profession or '[]'),
-                'degrees': ast.literal_eval(kwargs.get('instance').degrees or '[]'),
-                'skills': ast.literal_eval(kwargs.get('instance').skills or '[]'),
-                'expenses': ast.literal_eval(kwargs.get('instance').expenses or '[]'),
-                'permissions': ast.literal_eval(kwargs.get('instance').permissions or '[]'),
-                'acknowledgments': ast.literal_eval(kwargs.get('instance').acknowledgments or '[]'),
-            }
+        # the fields which use CheckboxSelectMultiple widget are ChoiceListFields -- their initial values are lists
 
         # # careful about hardcoding values for "self.initial", we could end up with hardcoded values everywhere
         # self.initial['partners'] = ast.literal_eval(self.initial.get('partners', '[]'))
@@ -1,6 +1,7 @@
 from django.core.exceptions import ValidationError
 from django import forms
-import ast
+
+from .utils import decode_literal
 
 
 class OptionalChoiceWidget(forms.MultiWidget):
@@ -10,8 +11,8 @@ class OptionalChoiceWidget(forms.MultiWidget):
 
     def decompress(self, value):
         if value:
-            value = ast.literal_eval(value)
             try: # #todo -- log this situation and find out when it occurs
+                value = decode_literal(value)
                 return [value[0], value[1]]
             except:
                 return [None, None]
@@ -0,0 +1,34 @@
+"""
+Partial indexes matching the predicates of ApplicationManager.get_need_rating,
+get_all_round1 and get_all_round2 (PostgreSQL only).
+
+Django 1.10 cannot declare partial indexes on a model, so they are created
+after every `migrate` (see ApplicationConfig.ready) with
+`CREATE INDEX IF NOT EXISTS` -- changing the predicate of an index needs a new
+name. Each index only contains the applications a rating round can pick from,
+so it stays small however many applications have been fully rated.
+"""
+from django.apps import apps
+from django.db import connections
+
+# (name, columns, predicate) -- all of them on Application2017
+PARTIAL_INDEXES = [
+    ('application_need_rating0', ['id'], "need_rating0 AND status <> 'deleted'"),
+    ('application_need_rating1', ['id'], "need_rating1 AND status <> 'deleted'"),
+    ('application_round1', ['id'], "need_rating1 AND NOT need_rating0 AND status NOT IN ('deleted', 'whitelist2', 'whitelist3')"),
+    ('application_round2', ['rating1'], "NOT need_rating1 AND status NOT IN ('deleted', 'whitelist3')"),
+    ('application_need_rating2', ['rating1'], "need_rating2 AND NOT need_rating1 AND status NOT IN ('deleted', 'whitelist3')"),
+]
+
+
+def create_partial_indexes(using='default', **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    table = connection.ops.quote_name(apps.get_model('application', 'Application2017')._meta.db_table)
+    with connection.cursor() as cursor:
+        for name, columns, predicate in PARTIAL_INDEXES:
+            cursor.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({}) WHERE {}'.format(
+                connection.ops.quote_name(name), table,
+                ', '.join(connection.ops.quote_name(column) for column in columns), predicate,
+            ))
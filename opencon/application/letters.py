@@ -0,0 +1,114 @@
+"""
+Decision letters -- one mail to every applicant once the rating is over, with
+the notes the reviewers wrote for them (the `note` of their Round 1 and
+Round 2 ratings, shared anonymously).
+
+`python manage.py queue_decision_letters` puts the letters in the outbox
+(see mail.py); `python manage.py send_queued_mail --connections N` sends them.
+The letter of an application is rendered from
+`application/email/decision/<status>.txt` (or `default.txt` if there is no
+template for its status), its subject is the first line of the template.
+
+The applications are read CHUNK_SIZE at a time (keyset pagination, as in
+exports.py), and the letters of every chunk are queued with one INSERT in
+their own transaction. Every letter has the key `decision-letter:<application id>`
+in the outbox, so a run which is interrupted (or repeated) queues only the
+letters which are not queued yet.
+
+Deleted applications (mostly duplicate or withdrawn submissions) get no
+letter unless `include_deleted` is set. An applicant gets one letter even if
+more applications have their email (compared case-insensitively): the one of
+the application with the lowest id, which is the same in every run.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import select_template
+from opencon.rating.models import Round1Rating, Round2Rating
+
+from .models import Application2017, OutgoingEmail
+
+CHUNK_SIZE = 500
+
+TEMPLATE = 'application/email/decision/{}.txt'
+
+NOTE_MODELS = (Round1Rating, Round2Rating)
+
+
+def letter_key(application_id):
+    return 'decision-letter:{}'.format(application_id)
+
+
+def group_notes(application_ids):
+    """{application id: [the non-empty notes of its ratings, Round 1 first]}"""
+    notes = defaultdict(list)
+    for model in NOTE_MODELS:
+        queryset = model.objects.filter(application_id__in=application_ids).exclude(note='').order_by('application_id', 'pk')
+        for application_id, note in queryset.values_list('application_id', 'note'):
+            if note.strip():
+                notes[application_id].append(note.strip())
+    return notes
+
+
+def render_letter(application, notes):
+    """(subject, body) of the decision letter of the application"""
+    template = select_template([TEMPLATE.format(application.status), TEMPLATE.format('default')])
+    subject, _, body = template.render({'application': application, 'notes': notes}).lstrip().partition('\n')
+    return subject.strip(), body.lstrip('\n')
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Lists of the applications of the queryset, `chunk_size` at a time in the order of their primary keys"""
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def queue_letters(queryset=None, chunk_size=CHUNK_SIZE, dry_run=False, include_deleted=False):
+    """
+    Queues the letters which are not queued yet, returns {'queued', 'skipped',
+    'duplicates'} (skipped: queued before, duplicates: another application has
+    the same email)
+    """
+    if queryset is None:
+        queryset = Application2017.objects.get_all()
+    if not include_deleted:
+        queryset = queryset.exclude(status='deleted')
+    stats = {'queued': 0, 'skipped': 0, 'duplicates': 0}
+    emails = set()
+    reply_to = [settings.DEFAULT_REPLYTO_EMAIL] if settings.DEFAULT_REPLYTO_EMAIL else []
+    for chunk in iter_chunks(queryset, chunk_size):
+        unique = []
+        for application in chunk:
+            email = application.email.strip().lower()
+            if email in emails:
+                stats['duplicates'] += 1
+                continue
+            emails.add(email)
+            unique.append(application)
+        chunk = unique
+
+        keys = [letter_key(application.pk) for application in chunk]
+        queued = set(OutgoingEmail.objects.filter(key__in=keys).values_list('key', flat=True))
+        pending = [application for application in chunk if letter_key(application.pk) not in queued]
+        stats['skipped'] += len(chunk) - len(pending)
+        stats['queued'] += len(pending)
+        if dry_run or not pending:
+            continue
+
+        notes = group_notes([application.pk for application in pending])
+        emails = []
+        for application in pending:
+            subject, body = render_letter(application, notes.get(application.pk, []))
+            emails.append(OutgoingEmail(**OutgoingEmail.objects.fields(
+                subject, body, [application.email], reply_to=reply_to, key=letter_key(application.pk),
+            )))
+        with transaction.atomic():
+            OutgoingEmail.objects.bulk_create(emails)
+    return stats
@@ -0,0 +1,308 @@
+"""
+Loaders of the data in data/ (see the add_* management commands).
+
+BulkLoader upserts the rows of a file keyed on a natural key (e.g. email):
+the file is read and validated row by row, and every batch of rows takes one
+query for the existing rows, one bulk insert and one bulk update of the rows
+which changed. The whole file is loaded in one transaction.
+
+The airports (sync) are replaced as a whole: the file is compared with the
+rows already in the database and only the difference is applied -- bulk
+inserts, bulk updates of the changed rows and deletes -- in one transaction,
+so the airport autocomplete is never empty or half-loaded. Rows which are
+still referenced (e.g. the airport of an application) are never deleted.
+"""
+import csv
+import json
+from collections import Counter, OrderedDict, namedtuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from opencon.rating.models import User
+
+from . import airport_index
+from .db import bulk_update
+from .models import Airport, Country, Draft, Institution, Organization
+
+OTHER_AIRPORT = ('---', {'name': 'Other airport', 'latitude': None, 'longitude': None, 'timezone': ''})
+
+SyncResult = namedtuple('SyncResult', 'created updated deleted kept')
+
+
+def read_blacklist(path):
+    """Set of the codes in the file (one per line, lines starting with "#" are comments)"""
+    with open(path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip() and not line.strip().startswith('#')}
+
+
+def parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def read_airports(path, blacklist=()):
+    """
+    {IATA code: field values} of the airports in an OpenFlights airports.dat
+    file (id, name, city, country, IATA, ICAO, latitude, longitude, altitude,
+    UTC offset, DST, timezone), without the blacklisted ones. The first airport
+    wins if a code is listed twice.
+    """
+    max_length = Airport._meta.get_field('name').max_length
+    airports = OrderedDict()
+    with open(path, encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            airport_name, city, country, iata_code = row[1], row[2], row[3], row[4].strip()
+            if not iata_code or iata_code == '\\N' or iata_code in blacklist or iata_code in airports:
+                continue
+            airports[iata_code] = {
+                'name': '{} ({}), {}'.format(city, airport_name, country)[:max_length],
+                'latitude': parse_float(row[6]),
+                'longitude': parse_float(row[7]),
+                'timezone': row[11] if row[11] != '\\N' else '',
+            }
+    airports[OTHER_AIRPORT[0]] = OTHER_AIRPORT[1]
+    return airports
+
+
+def referenced_pks(model, pks):
+    """The pks (of `pks`) which are referenced by a foreign key of another model"""
+    referenced = set()
+    for relation in model._meta.related_objects:
+        if relation.many_to_many or not relation.field.concrete:
+            continue
+        lookup = '{}__in'.format(relation.field.name)
+        referenced.update(relation.related_model._base_manager.filter(**{lookup: pks}).values_list(relation.field.attname, flat=True))
+    return referenced
+
+
+def sync(model, key, rows, batch_size=500):
+    """
+    Makes the rows of `model` match `rows` ({key value: {field: value}}):
+    missing rows are inserted, changed rows are updated and rows which are not
+    in `rows` are deleted (unless they are referenced). Returns a SyncResult.
+    """
+    fields = list(next(iter(rows.values())).keys()) if rows else []
+    with transaction.atomic():
+        existing, duplicates = {}, []
+        for obj in model._base_manager.order_by('pk'):
+            if getattr(obj, key) in existing:
+                duplicates.append(obj)
+            else:
+                existing[getattr(obj, key)] = obj
+
+        to_create, to_update = [], []
+        for value, values in rows.items():
+            obj = existing.pop(value, None)
+            if obj is None:
+                to_create.append(model(**dict(values, **{key: value})))
+            elif any(getattr(obj, field) != values[field] for field in fields):
+                for field, field_value in values.items():
+                    setattr(obj, field, field_value)
+                to_update.append(obj)
+
+        model._base_manager.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            bulk_update(model._base_manager.all(), to_update, fields, batch_size=batch_size)
+
+        stale = [obj.pk for obj in list(existing.values()) + duplicates]
+        kept = referenced_pks(model, stale)
+        deleted = [pk for pk in stale if pk not in kept]
+        for i in range(0, len(deleted), batch_size):
+            model._base_manager.filter(pk__in=deleted[i:i + batch_size]).delete()
+
+    return SyncResult(len(to_create), len(to_update), len(deleted), len(kept))
+
+
+def load_airports(list_path='data/airport_list.txt', blacklist_path='data/airport_blacklist.txt'):
+    result = sync(Airport, 'iata_code', read_airports(list_path, read_blacklist(blacklist_path)))
+    airport_index.invalidate()  # bulk operations do not send post_save / post_delete
+    return result
+
+
+LoadResult = namedtuple('LoadResult', 'inserted updated skipped failed')
+
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkLoader:
+    """
+    Upserts the rows of a CSV file into `model`, keyed on the `key` field. Rows
+    whose key is already in the database are updated if any of their values
+    changed (otherwise skipped); invalid rows are reported and skipped.
+    Subclasses set the model and the key, and define `parse(row)`, which turns
+    a CSV row (a list of strings) into {field: value}, the key included (raising
+    ValueError or IndexError for malformed rows). Empty lines and lines starting
+    with "#" are ignored.
+    """
+    model = None
+    key = None
+    header = False  # the first row of the file is a header (skipped)
+    defaults = {}  # set on inserted rows only
+    batch_size = 1000
+
+    def __init__(self):
+        self.columns = []
+        self.errors = []  # [(row number, messages)]
+
+    def rows(self, f):
+        """
+        Yields (line number in the file, CSV row), the header is stored in
+        `columns`. A row may span lines (a quoted field with line breaks, e.g.
+        an essay), its number is the one of its first line.
+        """
+        first_line = 0
+
+        def lines():
+            nonlocal first_line
+            quoted = False  # in a quoted field continued on the next line
+            for number, line in enumerate(f, 1):
+                if not quoted:
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    first_line = number
+                quoted ^= line.count('"') % 2 == 1  # an escaped quote ("") does not change it
+                yield line
+
+        reader = csv.reader(lines())
+        if self.header:
+            self.columns = next(reader, [])
+        for row in reader:
+            yield first_line, row
+
+    def differs(self, name, stored, value):
+        """Whether the stored value of the field has to be updated to `value`"""
+        return stored != value
+
+    def clean(self, values):
+        """The values converted and validated by the model fields (raises ValidationError)"""
+        obj = self.model(**dict(self.defaults, **values))
+        obj.clean_fields(exclude=[field.name for field in self.model._meta.fields if field.name not in values])
+        return {name: getattr(obj, name) for name in values}
+
+    def load(self, path):
+        for name in [self.key] + list(self.defaults):
+            self.model._meta.get_field(name)  # FieldDoesNotExist, e.g. for the placeholder models
+        counts = Counter()
+        with open(path, encoding='utf-8', newline='') as f, transaction.atomic():
+            for batch in batches(self.rows(f), self.batch_size):
+                valid = OrderedDict()
+                for number, row in batch:
+                    try:
+                        values = self.clean(self.parse(row))
+                    except (ValidationError, ValueError, IndexError) as e:
+                        counts['failed'] += 1
+                        self.errors.append((number, getattr(e, 'messages', [str(e)])))
+                        continue
+                    if values[self.key] in valid:
+                        counts['skipped'] += 1  # listed twice, the later row wins
+                    valid[values[self.key]] = values
+                self.upsert(valid, counts)
+        return LoadResult(counts['inserted'], counts['updated'], counts['skipped'], counts['failed'])
+
+    def upsert(self, rows, counts):
+        existing = {}
+        for obj in self.model._base_manager.filter(**{'{}__in'.format(self.key): list(rows)}).order_by('-pk'):
+            existing[getattr(obj, self.key)] = obj  # the oldest row wins if the key is not unique
+
+        to_create, to_update, fields = [], [], set()
+        for key, values in rows.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(self.model(**dict(self.defaults, **values)))
+                continue
+            changed = [name for name, value in values.items() if self.differs(name, getattr(obj, name), value)]
+            if not changed:
+                counts['skipped'] += 1
+                continue
+            for name in changed:
+                setattr(obj, name, values[name])
+            fields.update(changed)
+            to_update.append(obj)
+
+        self.model._base_manager.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            bulk_update(self.model._base_manager.all(), to_update, sorted(fields), batch_size=self.batch_size)  # sets updated_at
+        counts['inserted'] += len(to_create)
+        counts['updated'] += len(to_update)
+
+
+class DraftLoader(BulkLoader):
+    """data/draft_list.txt -- a header with the names of the form fields, one draft per row"""
+    model = Draft
+    key = 'email'
+    header = True
+
+    def parse(self, row):
+        data = {column: [value] for column, value in zip(self.columns, row) if value}
+        return {'email': row[0], 'data': json.dumps(data, sort_keys=True)}
+
+    def differs(self, name, stored, value):
+        if name == 'data':  # drafts saved by the form (see views.post_to_json) have their keys in another order
+            try:
+                return json.loads(stored) != json.loads(value)
+            except ValueError:
+                return True
+        return super().differs(name, stored, value)
+
+
+class UserLoader(BulkLoader):
+    """data/user_list.txt -- email, first_name, last_name, nick (with a header)"""
+    model = User
+    key = 'email'
+    header = True
+
+    def parse(self, row):
+        email, first_name, last_name, nick = row[:4]
+        return {'email': email, 'first_name': first_name, 'last_name': last_name, 'nick': nick}
+
+
+class NameListLoader(BulkLoader):
+    """One name per line (e.g. data/country_list.txt)"""
+    key = 'name'
+
+    def parse(self, row):
+        return {'name': row[0].strip()}
+
+
+class CountryLoader(NameListLoader):
+    model = Country
+
+
+class InstitutionLoader(NameListLoader):
+    model = Institution
+    defaults = {'show': True}
+
+
+class OrganizationLoader(NameListLoader):
+    model = Organization
+    defaults = {'show': True}
+
+
+class LoaderCommand(BaseCommand):
+    """Management command loading `path` with `loader_class`"""
+    loader_class = None
+    path = None
+
+    def handle(self, *args, **options):
+        loader = self.loader_class()
+        try:
+            result = loader.load(self.path)
+        except FieldDoesNotExist as e:
+            raise CommandError('Cannot load {}: {}'.format(self.path, e))
+        for number, messages in loader.errors:
+            self.stderr.write('{}, row {}: {}'.format(self.path, number, ' '.join(messages)))
+        self.stdout.write('{}: {inserted} inserted, {updated} updated, {skipped} skipped, {failed} failed.'.format(
+            self.path, **result._asdict()))
@@ -0,0 +1,71 @@
+"""
+Delivery of the outbox (OutgoingEmail, see models.py).
+
+Requests never talk to the SMTP server: they only queue their mail with
+`OutgoingEmail.objects.queue(...)`, in the same transaction as the change the
+mail is about. `python manage.py send_queued_mail` sends the queued mail in
+batches of MAIL_OUTBOX_BATCH_SIZE over one SMTP connection, kept open between
+batches. The rows of a batch are locked (`SELECT ... FOR UPDATE SKIP LOCKED`),
+so several workers can run at the same time without sending a mail twice --
+e.g. `send_queued_mail --connections 8` sends over eight SMTP connections at
+once (on PostgreSQL; SQLite has no row locks).
+
+A mail which cannot be sent is retried later, after MAIL_OUTBOX_RETRY_SECONDS,
+then twice as long after every further failure (up to MAIL_OUTBOX_MAX_RETRY_SECONDS);
+after MAIL_OUTBOX_MAX_ATTEMPTS failures it is marked as failed. The error of
+the last attempt is kept in `last_error` (see the admin).
+
+Delivery is at least once: if a worker dies in the middle of a batch, the
+mail it has already sent is sent again by the next worker.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .db import skip_locked_pks
+from .models import OutgoingEmail
+
+
+def retry_delay(attempts):
+    """How long to wait after the given number of failed attempts"""
+    seconds = settings.MAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1)
+    return datetime.timedelta(seconds=min(seconds, settings.MAIL_OUTBOX_MAX_RETRY_SECONDS))
+
+
+def record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = '{}: {}'.format(type(error).__name__, error)
+    if email.attempts >= settings.MAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def send_batch(connection=None, batch_size=None):
+    """
+    Sends one batch of due mail over the connection (a new one by default; it is
+    left open for the next batch) and returns {'sent', 'retried', 'failed'}
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    connection = connection or get_connection()
+    with transaction.atomic():
+        pks = skip_locked_pks(OutgoingEmail.objects.due(), limit=batch_size or settings.MAIL_OUTBOX_BATCH_SIZE)
+        for email in OutgoingEmail.objects.filter(pk__in=pks).order_by('next_attempt_at', 'pk'):
+            now = timezone.now()
+            try:
+                connection.open()  # no-op while the connection is open
+                email.to_message(connection).send()
+            except Exception as error:  # any error of the SMTP server or the connection to it
+                connection.close()  # reconnect for the next mail
+                record_failure(email, error, now)
+                stats['failed' if email.status == OutgoingEmail.FAILED else 'retried'] += 1
+            else:
+                email.attempts += 1
+                email.status = OutgoingEmail.SENT
+                email.sent_at = now
+                stats['sent'] += 1
+            email.save(update_fields=['attempts', 'status', 'sent_at', 'next_attempt_at', 'last_error', 'updated_at'])
+    return stats
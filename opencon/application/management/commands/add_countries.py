@@ -1,13 +1,7 @@
-from django.core.management.base import BaseCommand, CommandError
-from ...models import Country
+from ...loaders import LoaderCommand, CountryLoader
 
 
-class Command(BaseCommand):
-    help = 'Add countries to database from /data/country_list.txt'
-
-    def handle(self, *args, **options):
-        with open('data/country_list.txt') as file:
-            Country.objects.all().delete()
-            for row in file.readlines():
-                country = Country.objects.create(name=row)
-                country.save()
+class Command(LoaderCommand):
+    help = 'Add countries to database from /data/country_list.txt (new rows are inserted, changed rows updated)'
+    loader_class = CountryLoader
+    path = 'data/country_list.txt'
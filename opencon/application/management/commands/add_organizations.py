@@ -1,13 +1,7 @@
-from django.core.management.base import BaseCommand, CommandError
-from ...models import Organization
+from ...loaders import LoaderCommand, OrganizationLoader
 
 
-class Command(BaseCommand):
-    help = 'Add countries to database from /data/organization_list.txt'
-
-    def handle(self, *args, **options):
-        with open('data/organization_list.txt') as file:
-            for row in file.readlines():
-                organization, created = Organization.objects.get_or_create(name=row, show=True)
-                if created:
-                    organization.save()
+class Command(LoaderCommand):
+    help = 'Add organizations to database from /data/organization_list.txt (new rows are inserted, changed rows updated)'
+    loader_class = OrganizationLoader
+    path = 'data/organization_list.txt'
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from ... import autocomplete_cache
+
+
+class Command(BaseCommand):
+    help = 'Show the cache hits / misses of the autocomplete endpoints (see opencon/application/autocomplete_cache.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        for endpoint in autocomplete_cache.ENDPOINTS:
+            stats = autocomplete_cache.get_stats(endpoint)
+            hit_rate = '-' if stats['hit_rate'] is None else '{:.1%}'.format(stats['hit_rate'])
+            self.stdout.write(
+                '{}: {hits} hits, {misses} misses (hit rate {}), {not_modified} answered with 304 Not Modified'.format(
+                    endpoint, hit_rate, **stats)
+            )
+            if options['reset']:
+                autocomplete_cache.reset_stats(endpoint)
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from opencon.rating.models import Round1Rating, Round2Rating
+from ...db import bulk_update
+from ...fields import ChoiceListField
+from ...models import Application2017
+from ...utils import decode_literal
+
+
+class Command(BaseCommand):
+    help = 'Convert multiple choices stored as Python reprs (e.g. "[\'oa_week\']") to JSON (see ChoiceListField)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the values which would be converted')
+
+    def handle(self, *args, **options):
+        for model in [Application2017, Round1Rating, Round2Rating]:
+            fields = [field for field in model._meta.concrete_fields if isinstance(field, ChoiceListField)]
+            converted = self.convert(model, fields, options['chunk_size'], options['dry_run'])
+            self.stdout.write('{}: {} values {}.'.format(
+                model.__name__, converted, 'would be converted' if options['dry_run'] else 'converted'))
+
+    def convert(self, model, fields, chunk_size, dry_run):
+        """Reads the raw text of the columns (chunk by chunk) and rewrites the values which are not JSON"""
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        sql = 'SELECT id, {} FROM {} WHERE id > %s ORDER BY id LIMIT %s'.format(columns, table)
+
+        converted, last_pk = 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_pk, chunk_size])
+                rows = cursor.fetchall()
+            if not rows:
+                return converted
+            last_pk = rows[-1][0]
+
+            changed = {field.name: [] for field in fields}
+            for row in rows:
+                for field, value in zip(fields, row[1:]):
+                    if value is None or self.is_json(value):
+                        continue
+                    try:
+                        decoded = decode_literal(value) if value else []
+                    except ValueError as e:
+                        self.stderr.write('{} {} ({}): {}'.format(model.__name__, row[0], field.name, e))
+                        continue
+                    changed[field.name].append(model(pk=row[0], **{field.name: decoded}))
+                    converted += 1
+
+            if dry_run:
+                continue
+            with transaction.atomic():
+                for name, objs in changed.items():
+                    bulk_update(model._base_manager.all(), objs, [name])
+
+    @staticmethod
+    def is_json(value):
+        try:
+            json.loads(value)
+        except ValueError:
+            return False
+        return True
@@ -1,6 +1,5 @@
-import ast
-
 from django.core.management.base import BaseCommand, CommandError
+from ...utils import decode_literal
 from ...models import Draft, Application2017
 
 class Command(BaseCommand):
@@ -41,7 +40,7 @@ class Command(BaseCommand):
                 value=str(getattr(draft, field))
                 value=value.replace('\t','    ')
                 print(value + '\t', end='')
-            data=ast.literal_eval(draft.data)
+            data=decode_literal(draft.data)
             for field in virtual_fields:
                 value=str(data.get(field, "['*NONEXISTENT*']"))
                 value=value.replace('\t','    ')
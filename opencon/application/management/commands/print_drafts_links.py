@@ -1,5 +1,3 @@
-import ast
-
 from django.core.management.base import BaseCommand, CommandError
 from ...models import Draft
 
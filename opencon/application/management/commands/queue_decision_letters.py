@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from ... import letters
+from ...models import Application2017, STATUS_CHOICES
+
+
+class Command(BaseCommand):
+    help = 'Queue the decision letters (with the notes of the reviewers) of all applications, then send them with send_queued_mail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', help='Only the applications with this status (can be repeated)')
+        parser.add_argument('--chunk-size', type=int, default=letters.CHUNK_SIZE, help='Applications read (and letters queued) at a time')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the letters')
+        parser.add_argument('--include-deleted', action='store_true',
+                            help='Also the deleted applications (mostly duplicate or withdrawn submissions)')
+
+    def handle(self, *args, **options):
+        queryset = Application2017.objects.get_all()
+        if options['status']:
+            unknown = set(options['status']) - {status for status, label in STATUS_CHOICES}
+            if unknown:
+                raise CommandError('Unknown statuses: {}'.format(', '.join(sorted(unknown))))
+            if 'deleted' in options['status'] and not options['include_deleted']:
+                raise CommandError('Deleted applications get no letter without --include-deleted')
+            queryset = queryset.filter(status__in=options['status'])
+
+        stats = letters.queue_letters(queryset, options['chunk_size'], options['dry_run'], options['include_deleted'])
+        self.stdout.write('{} {queued} letters ({skipped} were queued before, {duplicates} applications share the email of another one).'.format(
+            'Would queue' if options['dry_run'] else 'Queued', **stats))
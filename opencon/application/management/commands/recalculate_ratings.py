@@ -1,18 +1,61 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from opencon.rating import queue
 from ...models import Application2017
-import sys
+from ...ratings import recalculate_range
+
+
+def recalculate_chunk(pk_range, dry_run):
+    # runs in a worker process (or in the command itself with --processes 1) -- one transaction per chunk, see recalculate_range
+    return recalculate_range(pk_range, dry_run=dry_run)
 
 
 class Command(BaseCommand):
-    help = 'Recalculate ratings for applications'
+    help = 'Recalculate ratings for applications (in bulk, chunk by chunk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Number of applications recalculated (and written) at once')
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes the chunks are distributed to')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the applications which would change')
 
     def handle(self, *args, **options):
-        applications = Application2017.objects.all()
-        app_count = applications.count()
+        chunk_size, processes = options['chunk_size'], options['processes']
+        if chunk_size < 1 or processes < 1:
+            raise CommandError('--chunk-size and --processes have to be positive')
+
+        # chunks are primary key ranges [low, high) of `chunk_size` applications each
+        pks = list(Application2017.objects.order_by('pk').values_list('pk', flat=True))
+        lows = pks[::chunk_size]
+        ranges = list(zip(lows, lows[1:] + [None]))
+
+        started = time.time()
+        done = changed = 0
+        for count, chunk_changed in self.run(ranges, processes, options['dry_run']):
+            done += count
+            changed += chunk_changed
+            elapsed = time.time() - started
+            self.stdout.write('\rRecalculated: {:.2f}% ({} applications, {:.0f}/s, {} changed)'.format(
+                done / len(pks) * 100, done, done / elapsed if elapsed else 0, changed), ending='')
+            self.stdout.flush()
+
+        self.stdout.write('\nRecalculation done in {:.1f}s: {} of {} applications {}.'.format(
+            time.time() - started, changed, done, 'would change' if options['dry_run'] else 'changed'))
+
+        if changed and not options['dry_run']:
+            # bulk updates do not send post_save, sync the rating queue with the new flags
+            self.stdout.write('Rating queue: queued {added} and removed {removed} slots.'.format(**queue.reap()))
 
-        for i, application in enumerate(applications):
-            application.save()
-            if i % 20 == 0:
-                sys.stdout.write('\rRecalculated: {0:.2f}%'.format(i/app_count*100))
+    def run(self, ranges, processes, dry_run):
+        if processes == 1:
+            for pk_range in ranges:
+                yield recalculate_chunk(pk_range, dry_run)
+            return
 
-        print('\nRecalculation done!')
+        connections.close_all()  # the forked workers must not share the connection of the parent
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(recalculate_chunk, pk_range, dry_run) for pk_range in ranges]
+            for future in futures:
+                yield future.result()
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection as db_connection
+from ... import mail
+
+
+class Command(BaseCommand):
+    help = 'Send the mail queued in the outbox (run it continuously with --loop, or periodically, e.g. every minute from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Mail sent per batch (MAIL_OUTBOX_BATCH_SIZE by default)')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking the outbox every --interval seconds when it is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the outbox is empty (with --loop)')
+        parser.add_argument('--connections', type=int, default=1,
+                            help='Send over this many SMTP connections at the same time (e.g. for the decision letters, PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        if options['connections'] == 1:
+            self.deliver(options)
+            return
+
+        # every thread has its own SMTP and database connection, the batches are locked with SKIP LOCKED (see mail.py)
+        threads = [threading.Thread(target=self.deliver_in_thread, args=(options,)) for _ in range(options['connections'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def deliver_in_thread(self, options):
+        try:
+            self.deliver(options)
+        finally:
+            db_connection.close()
+
+    def deliver(self, options):
+        connection = get_connection()
+        try:
+            while True:
+                stats = mail.send_batch(connection, options['batch_size'])
+                if any(stats.values()):
+                    self.stdout.write('Sent {sent}, will retry {retried}, gave up on {failed}.'.format(**stats))
+                elif not options['loop']:
+                    return
+                if not stats['sent'] and options['loop']:
+                    connection.close()  # do not keep an idle connection
+                    time.sleep(options['interval'])
+        finally:
+            connection.close()
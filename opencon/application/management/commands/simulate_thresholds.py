@@ -0,0 +1,54 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from ...ratings import DEFAULT_POLICY, RatingPolicy
+from ...simulation import OUTCOMES, decide_arrays, load_rating_arrays, summarize
+
+
+def parse_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate the rating policy with other constants (see constants.py) without changing the database. '
+        'Every option takes a comma-separated list of values, all combinations are evaluated, e.g. '
+        '`simulate_thresholds --yeses-needed 1,2 --needed-rating-to-round2 7,7.5,8`'
+    )
+
+    def add_arguments(self, parser):
+        for name in RatingPolicy._fields:
+            parser.add_argument('--' + name.replace('_', '-'), dest=name, help='default: {}'.format(getattr(DEFAULT_POLICY, name)))
+
+    def handle(self, *args, **options):
+        grid = []
+        for name in RatingPolicy._fields:
+            default = getattr(DEFAULT_POLICY, name)
+            if options[name] is None:
+                grid.append([default])
+                continue
+            try:
+                grid.append([parse_number(value) for value in options[name].split(',')])
+            except ValueError:
+                raise CommandError('Invalid value of --{}: {}'.format(name.replace('_', '-'), options[name]))
+
+        started = time.time()
+        data = load_rating_arrays()
+        self.stdout.write('Loaded {} applications in {:.2f}s.'.format(len(data['pk']), time.time() - started))
+        baseline = decide_arrays(data)
+
+        for values in itertools.product(*grid):
+            policy = RatingPolicy(*values)
+            started = time.time()
+            summary = summarize(decide_arrays(data, policy), baseline)
+            elapsed = time.time() - started
+
+            changed = ', '.join('{}={}'.format(name, value) for name, value in zip(RatingPolicy._fields, values)
+                                if value != getattr(DEFAULT_POLICY, name))
+            self.stdout.write('\n{} ({:.1f} ms)'.format(changed or 'current constants', elapsed * 1000))
+            for name in OUTCOMES:
+                self.stdout.write('  {:<13} {:>6}  (+{}, -{})'.format(name, *summary[name]))
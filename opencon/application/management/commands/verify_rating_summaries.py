@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from ...models import Application2017
+from ...ratings import fetch_rating_stats, repair_totals
+
+
+class Command(BaseCommand):
+    help = 'Compare the running rating totals stored on applications with the ratings (and optionally repair them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Overwrite wrong totals and recalculate the affected applications')
+
+    def handle(self, *args, **options):
+        stats = fetch_rating_stats()
+        fields = Application2017.SUMMARY_FIELDS
+        applications = Application2017.objects.get_all().only(*fields)
+
+        wrong = []
+        for application in applications.iterator():
+            expected = stats[application.pk]
+            stored = application.get_rating_stats()
+            if stored._replace(r1_spread=0) != expected._replace(r1_spread=0):
+                wrong.append((application.pk, expected))
+
+        self.stdout.write('{} of {} applications have wrong rating totals.'.format(len(wrong), len(stats)))
+        if not options['repair']:
+            return
+
+        repair_totals([pk for pk, _ in wrong])
+        self.stdout.write('Repaired {} applications.'.format(len(wrong)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from ... import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write gzipped snapshots of the CSV exports, which are then served by the export URLs (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Exports to write (all by default): {}'.format(', '.join(sorted(snapshots.SNAPSHOT_EXPORTS))))
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(snapshots.SNAPSHOT_EXPORTS)
+        unknown = set(names) - set(snapshots.SNAPSHOT_EXPORTS)
+        if unknown:
+            raise CommandError('Unknown exports: {}'.format(', '.join(sorted(unknown))))
+        for name in names:
+            sha256, changed = snapshots.write_snapshot(name)
+            self.stdout.write('{}: {} ({})'.format(name, sha256[:12], 'written' if changed else 'unchanged'))
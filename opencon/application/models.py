@@ -6,15 +6,19 @@ import datetime
 from django.conf import settings
 from django.core.mail import EmailMessage
 from django.core.validators import MinLengthValidator
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.template.loader import render_to_string
 from django.utils import timezone
 from .validators import MaxChoicesValidator, MinChoicesValidator, EverythingCheckedValidator, none_validator, twitter_username_validator, orcid_validator, expenses_validator
 
+from . import data as data_choices
 from .data import *
+from .choices import ChoiceLabelIndex
+from .fields import ChoiceListField
 from .constants import *
 
+from .ratings import RatingDecision, decide, stats_from_totals
 from .utils import parse_raw_choices
 
 STATUS_CHOICES = [
@@ -35,7 +39,7 @@ class HideInactive(models.Manager):
 class TimestampMixin(models.Model):
     """ Mixin for saving the creation time and the time of the last update """
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # incremental exports (see application/exports.py)
 
     class Meta:
         abstract = True
@@ -62,28 +66,27 @@ class Draft(TimestampMixin, models.Model):
 
         if can_send:
             self.sent_email_data = timezone.now()
-            self.save()
-            if settings.SEND_EMAILS:
-                message = render_to_string('application/email/draft.txt', {'uuid': self.uuid, 'email': self.email,})
-                email = EmailMessage(
-                    subject='OpenCon 2017 Draft Application',
-                    body=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[self.email],
-                    reply_to=[settings.DEFAULT_REPLYTO_EMAIL],
-                )
-                email.content_subtype = "html"
-                try:
-                    email.send(fail_silently=True)
-                except:
-                    pass # #todo -- fix problem with sending e-mail
+            with transaction.atomic():
+                self.save()
+                if settings.SEND_EMAILS:
+                    message = render_to_string('application/email/draft.txt', {'uuid': self.uuid, 'email': self.email,})
+                    OutgoingEmail.objects.queue(
+                        subject='OpenCon 2017 Draft Application',
+                        body=message,
+                        to=[self.email],
+                        reply_to=[settings.DEFAULT_REPLYTO_EMAIL],
+                        html=True,
+                    )
             return True
         return False
 
 
 class Airport(models.Model):
-    iata_code = models.CharField(max_length=10)
+    iata_code = models.CharField(max_length=10, db_index=True)
     name = models.CharField(max_length=100)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    timezone = models.CharField(max_length=50, blank=True, default='')  # e.g. Europe/Berlin
 
     def __str__(self):
         return '[{}] {}'.format(self.iata_code, self.name)
@@ -146,14 +149,53 @@ class ApplicationManager(models.Manager):
     def get_all(self):
         return super().get_queryset()
 
+    def get_need_rating(self, rating_round):
+        """Applications which still need a rating in the given round (0, 1 or 2), by anyone"""
+        # #fyi -- keep in sync with Application2017.needs_rating
+        if rating_round == 0:
+            return self.get_queryset().filter(need_rating0=True)
+        elif rating_round == 1:
+            return self.get_queryset().filter(need_rating1=True)
+        elif rating_round == 2:
+            return self.get_all_round2().filter(need_rating2=True)
+        raise ValueError('Unknown rating round: {}'.format(rating_round))
+
     def get_unrated0(self, user):
-        return self.get_queryset().filter(need_rating0=True).exclude(ratings0__created_by=user)
+        return self.get_need_rating(0).exclude(ratings0__created_by=user)
 
     def get_unrated(self, user):
-        return self.get_queryset().filter(need_rating1=True).exclude(ratings__created_by=user)
+        return self.get_need_rating(1).exclude(ratings__created_by=user)
 
     def get_unrated2(self, user):
-        return self.get_all_round2().filter(need_rating2=True).exclude(ratings2__created_by=user)
+        return self.get_need_rating(2).exclude(ratings2__created_by=user)
+
+    def update_summary(self, application_id, contribution, sign=1):
+        """Atomically adds (sign=1) or subtracts (sign=-1) the contribution of a rating to the running totals"""
+        changes = {field: F(field) + sign * value for field, value in contribution.items() if value}
+        if changes:
+            self.get_all().filter(pk=application_id).update(updated_at=timezone.now(), **changes)
+
+    def apply_summary_changes(self, application_id, changes):
+        """
+        Adds the changes ({summary field: difference}) to the running totals of
+        the application and recalculates it -- one locked SELECT of the fields
+        the decision depends on and one UPDATE of the totals (with F()) and the
+        decision, instead of saving the application. Returns the application as
+        it was written, or None if it does not exist.
+        """
+        fields = set(self.model.SUMMARY_FIELDS) | set(self.model.ELIGIBILITY_FIELDS)
+        application = self.get_all().select_for_update().only(*fields).filter(pk=application_id).first()
+        if application is None:
+            return None
+        changes = {field: value for field, value in changes.items() if value}
+        for field, value in changes.items():
+            setattr(application, field, getattr(application, field) + value)
+        application.recalculate_ratings()
+
+        values = {field: F(field) + value for field, value in changes.items()}
+        values.update({field: getattr(application, field) for field in RatingDecision._fields})
+        self.get_all().filter(pk=application_id).update(updated_at=timezone.now(), **values)
+        return application
 
     def get_all_round1(self):
         return self.get_queryset().filter(need_rating1=True).filter(need_rating0=False).exclude(status__exact='whitelist2').exclude(status__exact='whitelist3')
@@ -322,7 +364,7 @@ class Application2017(TimestampMixin, models.Model):
         None of the Above [none]
         """
     )
-    events = models.TextField( # 2016: participation
+    events = ChoiceListField( # 2016: participation
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Event Participation^',
         help_text='All of the events listed below are global and open to participation, so anyone, anywhere can be involved. Please indicate which of the following events you have participated in, or plan to participate in next year. Check all that apply.',
@@ -362,7 +404,7 @@ class Application2017(TimestampMixin, models.Model):
         try:
             # if self.area_of_interest == "other":
             #     return None
-            return dict(self.AREA_OF_INTEREST_CHOICES).get(self.area_of_interest, None)
+            return CHOICE_LABELS.label('area_of_interest', self.area_of_interest)
         except ValueError:
             return None
 
@@ -633,7 +675,7 @@ class Application2017(TimestampMixin, models.Model):
         try:
             if self.citizenship == "other":
                 return None
-            return dict(self.COUNTRY_CHOICES).get(self.citizenship, None)
+            return CHOICE_LABELS.label('citizenship', self.citizenship)
         except ValueError:
             return None
 
@@ -650,7 +692,7 @@ class Application2017(TimestampMixin, models.Model):
         try:
             if self.residence == "other":
                 return None
-            return dict(self.COUNTRY_CHOICES).get(self.residence, None)
+            return CHOICE_LABELS.label('residence', self.residence)
         except ValueError:
             return None
 
@@ -678,7 +720,7 @@ class Application2017(TimestampMixin, models.Model):
         None of these describes me [none]
         """
     )
-    profession = models.TextField(
+    profession = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Primary Profession^',
         help_text='Please check the profession that best describes what you do. If there are multiple options that equally describe you, you may select up to three.',
@@ -714,7 +756,7 @@ class Application2017(TimestampMixin, models.Model):
         None of the above [none]
         """
     )
-    degrees = models.TextField(
+    degrees = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Academic Degrees^',
         help_text='Please select the academic degrees you have attained, if any. Only check the degrees you have already been awarded.',
@@ -771,7 +813,7 @@ class Application2017(TimestampMixin, models.Model):
         try:
             if self.field == "other":
                 return None
-            return dict(self.FIELD_CHOICES).get(self.field, None)
+            return CHOICE_LABELS.label('field', self.field)
         except ValueError:
             return None
 
@@ -786,12 +828,11 @@ class Application2017(TimestampMixin, models.Model):
     )
     GENDER_VERBOSE_NAME='Gender^'
     GENDER_HELP_TEXT='Please select an option.'
-    gender = models.CharField(
+    gender = ChoiceListField(
         # Widget: CUSTOM Radio + fill-in other -- choices are defined in forms.py (also: verbose_name & help_text)
         # defining verbose_name & help_text here as well (in addition to forms.py) because it's accessed in get_data
         verbose_name=GENDER_VERBOSE_NAME,
         help_text=GENDER_HELP_TEXT,
-        max_length=100,
         blank=False, # required
     )
 
@@ -834,7 +875,7 @@ class Application2017(TimestampMixin, models.Model):
     )
     ETHNICITY_VERBOSE_NAME='Ethnicity and Race^'
     ETHNICITY_HELP_TEXT='OpenCon is committed to supporting diversity, equity and inclusion, and this information adds an important dimension to our efforts. We understand that different cultures have different  sensitivities around this type of information, so this question is optional. Select “Prefer not to say” to skip the question. If you decide to answer, select any/all options that apply. You can also write  your own answer in the box at the bottom, either in addition to the options below, or instead of checking one of the available options (just be sure to check "Specified below"). By "origin" we generally mean where your ancestors are from.'
-    ethnicity = models.TextField(
+    ethnicity = ChoiceListField(
         # Widget: CUSTOM Checkboxes + fill-in other -- choices are defined in forms.py (also: verbose_name & help_text)
         # defining verbose_name & help_text here as well (in addition to forms.py) because it's accessed in get_data
         verbose_name=ETHNICITY_VERBOSE_NAME,
@@ -1064,7 +1105,7 @@ class Application2017(TimestampMixin, models.Model):
         Video Filming / Editing [videos]
         """
     )
-    skills = models.TextField(
+    skills = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Skills^',
         help_text='Do you have any of the following skills that you would be interested in volunteering for an open-related project? Check all that apply below.',
@@ -1083,7 +1124,7 @@ class Application2017(TimestampMixin, models.Model):
         No scholarship requested [none]
         """
     )
-    expenses = models.TextField(
+    expenses = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='What expenses do you need your scholarship to cover?',
         help_text='Select the expenses below for which you would like to apply for a scholarship, or select "Full scholarship" to request all of them.',
@@ -1153,7 +1194,7 @@ class Application2017(TimestampMixin, models.Model):
         OpenCon has permission to share my application publicly in connection with my name and data for the purposes of connecting with others in the community (email addresses are kept private). [share]
         """
     )
-    permissions = models.TextField(
+    permissions = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Permissions',
         help_text='Please select the boxes below to give us permission to contact you and use the data you have provided. Your selections will not impact your application rating, however giving us these permissions can help make sure you get the most out of the OpenCon community.',
@@ -1169,7 +1210,7 @@ class Application2017(TimestampMixin, models.Model):
         I understand that my responses to the questions marked with a caret (^) will be released publicly as Open Data. [4]
         """
     )
-    acknowledgments = models.TextField(
+    acknowledgments = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Acknowledgments',
         help_text='Please check the boxes below to acknowledge your understanding. All boxes must be checked to submit your application. Links to the OpenCon Privacy Policy and the CC0 Public Domain Dedication are provided in the instructions above.',
@@ -1243,18 +1284,28 @@ class Application2017(TimestampMixin, models.Model):
 
     data_sent_at = models.DateTimeField(null=True, blank=True)
 
-    def save(self, *args):
+    def save(self, *args, **kwargs):
+        if self.pk and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # running totals are only ever changed with F() expressions (see update_summary), never overwritten
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.SUMMARY_FIELDS]
+
         if not self.my_referral:
             possible_characters = string.ascii_letters + string.digits
             self.my_referral = ''.join(random.choice(possible_characters) for _ in range(5))
 
         self.recalculate_ratings()
 
-        if self.data_sent_at is None:
+        send_data = self.data_sent_at is None
+        if send_data:
             self.data_sent_at = timezone.now()
-            self.send_data_by_mail()
 
-        super().save(*args)
+        if send_data:
+            with transaction.atomic():  # the confirmation is queued only if the application is saved
+                super().save(*args, **kwargs)
+                self.send_data_by_mail()
+        else:
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.full_name()
@@ -1263,96 +1314,33 @@ class Application2017(TimestampMixin, models.Model):
         return ' '.join([self.first_name, self.last_name])
 
     def send_data_by_mail(self):
+        """Queues the confirmation mail with the submitted data (sent by `python manage.py send_queued_mail`)"""
         if settings.SEND_EMAILS:
             message = render_to_string('application/email/data.txt', {'object': self, 'first_name': self.first_name, 'nickname': self.nickname, 'my_referral': self.my_referral,})
-            email = EmailMessage(
+            OutgoingEmail.objects.queue(
                 subject='OpenCon 2017 Application Received',
                 body=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
                 to=[self.email],
                 bcc=settings.EMAIL_DATA_BACKUP,
                 reply_to=[settings.DEFAULT_REPLYTO_EMAIL],
+                html=True,
             )
-            email.content_subtype = "html"
-            try:
-                email.send(fail_silently=True)
-            except:
-                pass # #todo -- fix problem with sending e-mail
-
-    def recalculate_ratings(self):
-        self.need_rating0 = not self.ratings0.filter(decision='review').exists()
-
-        # If no-one reviewed it
-        if self.need_rating0:
-            if self.ratings0.filter(decision='yes').count() >= YESES_NEEDED:
-                self.need_rating0 = False
-            elif self.ratings0.filter(decision='no').count() >= NOS_NEEDED:
-                self.status = 'blacklisted'
-                self.need_rating0 = False
-
-        # At this point we established need_rating0 -- we will not need to alter it anymore unless there is an explicit whitelist / blacklist decision
-
-        # Calculate rating scores
-        try:
-            rating1 = sum(r.rating for r in self.ratings.all()) / self.ratings.count()
-        except ZeroDivisionError:
-            rating1 = 0
-
-        try:
-            rating2 = sum(r.rating for r in self.ratings2.all()) / self.ratings2.count()
-        except ZeroDivisionError:
-            rating2 = 0
-
-        self.rating1 = rating1
-        self.rating2 = rating2
-
-        # Normally, every application should have a certain number of reviews
-        self.need_rating1 = self.ratings.count() < MAX_REVIEWS_ROUND_ONE
-        self.need_rating2 = self.ratings2.count() < MAX_REVIEWS_ROUND_TWO
-
-        # However, there are exceptions...
-        # If this is a very low quality application
-        if self.rating1 <= RATING_R1_LOW_THRESHOLD:
-            # And it has exactly 1 review
-            if self.ratings.count() == 1:
-                # no other reviews are needed (i.e., do not get a second review)
-                self.need_rating1 = False
-
-        # Or if the rating is in the middle range <X,Y)
-        elif NEEDED_RATING_FOR_THIRD_REVIEW_ROUND1 <= self.rating1 < NEEDED_RATING_TO_ROUND2:
-            # And it has exactly 2 reviews
-            if self.ratings.count() == 2:
-                ratings = list(self.ratings.all())
-                r1 = ratings[0].rating
-                r2 = ratings[1].rating
 
-                # And the difference between them is big enough
-                if abs(r1-r2) > NEEDED_DIFFERENCE_FOR_THIRD_REVIEW_ROUND1:
-                    # it needs a 3rd review ("third opinion")
-                    self.need_rating1 = True
+    def recalculate_ratings(self, stats=None):
+        """
+        Recalculates the rating scores and flags (see ratings.py) from the running
+        totals, or from `stats` if given (e.g. fetched by fetch_rating_stats).
+        """
+        if stats is None:
+            stats = self.get_rating_stats()
 
-        if self.need_rating0:
-            self.need_rating1 = False
-            self.need_rating2 = False
-        if self.need_rating1:
-            self.need_rating2 = False
-
-        if self.status == 'blacklisted':
-            self.rating1 = 0
-            self.rating2 = 0
-            self.need_rating0 = False
-            self.need_rating1 = False
-            self.need_rating2 = False
-        elif self.status == 'whitelist2':
-            self.need_rating0 = False
-            self.need_rating1 = False
-            # self.need_rating2 = True  # commenting out this line because whitelist2 would then accept infinite number of reviews -- instead, rely on the logic above (`self.need_rating2 = self.ratings2.count() < MAX_REVIEWS_ROUND_TWO`)
-            # R2 whitelisted apps still need to be rated (repeat of the code from a few lines above)
-            self.need_rating2 = self.ratings2.count() < MAX_REVIEWS_ROUND_TWO
-        elif self.status == 'whitelist3':
-            self.need_rating0 = False
-            self.need_rating1 = False
-            self.need_rating2 = False
+        decision = decide(stats, self.status)
+        self.status = decision.status
+        self.rating1 = decision.rating1
+        self.rating2 = decision.rating2
+        self.need_rating0 = decision.need_rating0
+        self.need_rating1 = decision.need_rating1
+        self.need_rating2 = decision.need_rating2
 
     rating1 = models.FloatField(default=0)
     rating2 = models.FloatField(default=0)
@@ -1360,6 +1348,54 @@ class Application2017(TimestampMixin, models.Model):
     need_rating1 = models.BooleanField(default=True)
     need_rating2 = models.BooleanField(default=True)
 
+    # Running totals of the ratings -- updated with F() expressions whenever a rating is created, edited or deleted
+    # (see opencon/rating/models.py), verified by `python manage.py verify_rating_summaries`
+    SUMMARY_FIELDS = [
+        'r0_yes_count', 'r0_no_count', 'r0_review_count',
+        'r1_count', 'r1_sum', 'r1_sum_squares',
+        'r2_count', 'r2_sum', 'r2_sum_squares',
+    ]
+    r0_yes_count = models.PositiveIntegerField(default=0)
+    r0_no_count = models.PositiveIntegerField(default=0)
+    r0_review_count = models.PositiveIntegerField(default=0)
+    r1_count = models.PositiveIntegerField(default=0)
+    r1_sum = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    r1_sum_squares = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    r2_count = models.PositiveIntegerField(default=0)
+    r2_sum = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    r2_sum_squares = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def get_rating_stats(self):
+        """The aggregated ratings (see ratings.py), taken from the running totals"""
+        return stats_from_totals(*[getattr(self, field) for field in self.SUMMARY_FIELDS])
+
+    # the fields needs_rating depends on
+    ELIGIBILITY_FIELDS = ('status', 'rating1', 'need_rating0', 'need_rating1', 'need_rating2')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.ELIGIBILITY_FIELDS) <= set(field_names):
+            instance._saved_eligible_rounds = instance.eligible_rounds()  # the rating queue is synced if they change
+        return instance
+
+    def eligible_rounds(self):
+        """The rounds (0, 1, 2) in which the application needs a rating"""
+        return tuple(rating_round for rating_round in (0, 1, 2) if self.needs_rating(rating_round))
+
+    def needs_rating(self, rating_round):
+        """In-memory version of ApplicationManager.get_need_rating (used to keep the rating queue in sync)"""
+        if self.status == 'deleted':
+            return False
+        if rating_round == 0:
+            return self.need_rating0
+        elif rating_round == 1:
+            return self.need_rating1
+        elif rating_round == 2:
+            qualified = self.rating1 >= NEEDED_RATING_TO_ROUND2 or self.status == 'whitelist2'
+            return self.need_rating2 and not self.need_rating1 and qualified and self.status != 'whitelist3'
+        raise ValueError('Unknown rating round: {}'.format(rating_round))
+
     def get_rating1(self):
         return round(self.rating1, 1)
 
@@ -1394,7 +1430,7 @@ class Application2017(TimestampMixin, models.Model):
                 data.append(current_field)
         return data
 
-    status = models.TextField(choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0])
+    status = models.TextField(choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0], db_index=True)
     status_reason = models.TextField(null=True, blank=True)
     status_by = models.ForeignKey('rating.User', related_name='statuses', null=True, blank=True)
     status_ip = models.GenericIPAddressField(blank=True, null=True)
@@ -1408,6 +1444,19 @@ class Application2017(TimestampMixin, models.Model):
         self.status_reason = reason
         self.save()
 
+
+# labels of all choice tables (by table name or by field name of Application2017) -- see choices.py
+CHOICE_LABELS = ChoiceLabelIndex.from_namespace(Application2017, aliases=dict(
+    {field.name: field.name.upper() + '_CHOICES' for field in Application2017._meta.fields if hasattr(Application2017, field.name.upper() + '_CHOICES')},
+    citizenship='COUNTRY_CHOICES',
+    residence='COUNTRY_CHOICES',
+)).merge(
+    ChoiceLabelIndex({'STATUS_CHOICES': STATUS_CHOICES}, {'status': 'STATUS_CHOICES'})
+).merge(
+    ChoiceLabelIndex.from_namespace(data_choices, prefix='data.')
+)
+
+
 """
 class Application(TimestampMixin, models.Model):
     # field no. 1
@@ -1802,3 +1851,78 @@ class Reference(TimestampMixin, models.Model):
 
     def __str__(self):
         return '{1} - {0}'.format(self.name, self.key)
+
+
+class OutgoingEmailManager(models.Manager):
+    def queue(self, subject, body, to, bcc=(), reply_to=(), from_email=None, html=False, key=None):
+        """
+        Stores the mail in the outbox -- in the current transaction, so it is only
+        sent if the transaction commits -- to be sent by `python manage.py send_queued_mail`
+        """
+        return self.create(**self.fields(subject, body, to, bcc, reply_to, from_email, html, key))
+
+    def fields(self, subject, body, to, bcc=(), reply_to=(), from_email=None, html=False, key=None):
+        """The fields of a queued mail (see queue), e.g. for bulk_create"""
+        return dict(
+            subject=subject,
+            body=body,
+            html=html,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(to),
+            bcc=list(bcc),
+            reply_to=list(reply_to),
+            key=key,
+        )
+
+    def due(self, now=None):
+        """Queued mail whose (next) attempt is due, oldest first"""
+        return self.filter(status=OutgoingEmail.QUEUED, next_attempt_at__lte=now or timezone.now()).order_by('next_attempt_at', 'pk')
+
+
+class OutgoingEmail(TimestampMixin, models.Model):
+    """Outbox of the mail sent by the application (see mail.py)"""
+    QUEUED = 'queued'
+    SENT = 'sent'
+    FAILED = 'failed'  # given up after MAIL_OUTBOX_MAX_ATTEMPTS
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html = models.BooleanField(default=False)
+    from_email = models.CharField(max_length=254)
+    to = ChoiceListField()  # lists of addresses
+    bcc = ChoiceListField(blank=True)
+    reply_to = ChoiceListField(blank=True)
+    key = models.CharField(max_length=100, unique=True, blank=True, null=True)  # a mail is queued only once per key (e.g. see letters.py)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+
+    objects = OutgoingEmailManager()
+
+    class Meta:
+        index_together = [('status', 'next_attempt_at')]
+
+    def __str__(self):
+        return '{} ({})'.format(self.subject, ', '.join(self.to))
+
+    def to_message(self, connection=None):
+        message = EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            bcc=self.bcc,
+            reply_to=self.reply_to,
+            connection=connection,
+        )
+        if self.html:
+            message.content_subtype = 'html'
+        return message
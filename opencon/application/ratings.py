@@ -0,0 +1,271 @@
+"""
+Rating policy -- decides which applications need more ratings.
+
+The decision only depends on a few aggregates of the ratings (RatingStats), so
+the inputs of all applications can be fetched with a single query
+(fetch_rating_stats) and the policy itself (decide) runs in memory.
+
+Application2017 also stores running totals of these aggregates (SUMMARY_FIELDS,
+maintained by the rating models with F() expressions), so the rating policy of
+a single application can be applied without reading the rating tables at all.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .constants import *
+from .db import bulk_update
+
+RatingStats = namedtuple('RatingStats', [
+    'r0_yes', 'r0_no', 'r0_review',  # number of Round 0 decisions of each kind
+    'r1_count', 'r1_sum', 'r1_sum_squares',
+    'r1_spread',  # difference between the two R1 ratings (only used when there are exactly two of them)
+    'r2_count', 'r2_sum', 'r2_sum_squares',
+])
+
+EMPTY_STATS = RatingStats(0, 0, 0, 0, Decimal(0), Decimal(0), Decimal(0), 0, Decimal(0), Decimal(0))
+
+RatingPolicy = namedtuple('RatingPolicy', [
+    'yeses_needed', 'nos_needed', 'max_reviews_round_one', 'max_reviews_round_two',
+    'rating_r1_low_threshold', 'needed_rating_to_round2',
+    'needed_rating_for_third_review_round1', 'needed_difference_for_third_review_round1',
+])
+
+# the policy configured in constants.py
+DEFAULT_POLICY = RatingPolicy(
+    YESES_NEEDED, NOS_NEEDED, MAX_REVIEWS_ROUND_ONE, MAX_REVIEWS_ROUND_TWO,
+    RATING_R1_LOW_THRESHOLD, NEEDED_RATING_TO_ROUND2,
+    NEEDED_RATING_FOR_THIRD_REVIEW_ROUND1, NEEDED_DIFFERENCE_FOR_THIRD_REVIEW_ROUND1,
+)
+
+RatingDecision = namedtuple('RatingDecision', 'status rating1 rating2 need_rating0 need_rating1 need_rating2')
+
+
+def decide(stats, status, policy=DEFAULT_POLICY):
+    """Applies the rating policy to the aggregated ratings of an application with the given status"""
+    need_rating0 = not stats.r0_review
+
+    # If no-one reviewed it
+    if need_rating0:
+        if stats.r0_yes >= policy.yeses_needed:
+            need_rating0 = False
+        elif stats.r0_no >= policy.nos_needed:
+            status = 'blacklisted'
+            need_rating0 = False
+
+    # At this point we established need_rating0 -- we will not need to alter it anymore unless there is an explicit whitelist / blacklist decision
+
+    # Calculate rating scores
+    rating1 = stats.r1_sum / stats.r1_count if stats.r1_count else 0
+    rating2 = stats.r2_sum / stats.r2_count if stats.r2_count else 0
+
+    # Normally, every application should have a certain number of reviews
+    need_rating1 = stats.r1_count < policy.max_reviews_round_one
+    need_rating2 = stats.r2_count < policy.max_reviews_round_two
+
+    # However, there are exceptions...
+    # If this is a very low quality application
+    if rating1 <= policy.rating_r1_low_threshold:
+        # And it has exactly 1 review
+        if stats.r1_count == 1:
+            # no other reviews are needed (i.e., do not get a second review)
+            need_rating1 = False
+
+    # Or if the rating is in the middle range <X,Y)
+    elif policy.needed_rating_for_third_review_round1 <= rating1 < policy.needed_rating_to_round2:
+        # And it has exactly 2 reviews and the difference between them is big enough
+        if stats.r1_count == 2 and stats.r1_spread > policy.needed_difference_for_third_review_round1:
+            # it needs a 3rd review ("third opinion")
+            need_rating1 = True
+
+    if need_rating0:
+        need_rating1 = False
+        need_rating2 = False
+    if need_rating1:
+        need_rating2 = False
+
+    if status == 'blacklisted':
+        rating1 = 0
+        rating2 = 0
+        need_rating0 = False
+        need_rating1 = False
+        need_rating2 = False
+    elif status == 'whitelist2':
+        need_rating0 = False
+        need_rating1 = False
+        # R2 whitelisted apps still need to be rated (but not infinitely, hence no `need_rating2 = True`)
+        need_rating2 = stats.r2_count < policy.max_reviews_round_two
+    elif status == 'whitelist3':
+        need_rating0 = False
+        need_rating1 = False
+        need_rating2 = False
+
+    return RatingDecision(status, rating1, rating2, need_rating0, need_rating1, need_rating2)
+
+
+def stats_from_totals(r0_yes, r0_no, r0_review, r1_count, r1_sum, r1_sum_squares, r2_count, r2_sum, r2_sum_squares):
+    """RatingStats from running totals (counts, sums and sums of squares, see Application2017.SUMMARY_FIELDS)"""
+    # for two ratings a, b: (a - b)^2 = 2 * (a^2 + b^2) - (a + b)^2
+    r1_spread = max(2 * r1_sum_squares - r1_sum * r1_sum, Decimal(0)).sqrt() if r1_count == 2 else Decimal(0)
+    return RatingStats(r0_yes, r0_no, r0_review, r1_count, r1_sum, r1_sum_squares, r1_spread, r2_count, r2_sum, r2_sum_squares)
+
+
+def to_decimal(value, places='0.1'):
+    """SUM/MIN/MAX of a DecimalField come back as Decimal (PostgreSQL) or float (SQLite)"""
+    if value is None:
+        return Decimal(0)
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value)).quantize(Decimal(places))
+    return value
+
+
+def fetch_rating_stats(application_ids=None, pk_range=None):
+    """
+    Returns {application_id: RatingStats} for the given applications, for the
+    applications with `low <= id < high` if `pk_range` is given (`high` may be
+    None), or for all of them. The stats are computed by one query with
+    conditional aggregates. Every rating table is aggregated in its own derived
+    table, so the joins do not multiply the rows.
+    """
+    tables = [connection.ops.quote_name(apps.get_model(*name)._meta.db_table) for name in (
+        ('application', 'Application2017'), ('rating', 'Round0Rating'), ('rating', 'Round1Rating'), ('rating', 'Round2Rating'),
+    )]
+
+    conditions, condition_params = [], []
+    if application_ids is not None:
+        application_ids = list(application_ids)
+        if not application_ids:
+            return {}
+        conditions.append('{column} IN (' + ', '.join(['%s'] * len(application_ids)) + ')')
+        condition_params += application_ids
+    if pk_range is not None:
+        low, high = pk_range
+        conditions.append('{column} >= %s')
+        condition_params.append(low)
+        if high is not None:
+            conditions.append('{column} < %s')
+            condition_params.append(high)
+
+    where = {'application_id': '', 'id': ''}
+    if conditions:
+        where = {column: 'WHERE ' + ' AND '.join(conditions).format(column=column) for column in where}
+    params = condition_params * 4  # 3x in the derived tables, 1x for the applications
+
+    sql = """
+        SELECT a.id, r0.yeses, r0.nos, r0.reviews,
+            r1.n, r1.total, r1.squares, r1.lowest, r1.highest, r2.n, r2.total, r2.squares
+        FROM {app} a
+        LEFT JOIN (
+            SELECT application_id,
+                COUNT(CASE WHEN decision = 'yes' THEN 1 END) AS yeses,
+                COUNT(CASE WHEN decision = 'no' THEN 1 END) AS nos,
+                COUNT(CASE WHEN decision = 'review' THEN 1 END) AS reviews
+            FROM {r0} {where_rating} GROUP BY application_id
+        ) r0 ON r0.application_id = a.id
+        LEFT JOIN (
+            SELECT application_id, COUNT(*) AS n, SUM(rating) AS total, SUM(rating * rating) AS squares,
+                MIN(rating) AS lowest, MAX(rating) AS highest
+            FROM {r1} {where_rating} GROUP BY application_id
+        ) r1 ON r1.application_id = a.id
+        LEFT JOIN (
+            SELECT application_id, COUNT(*) AS n, SUM(rating) AS total, SUM(rating * rating) AS squares
+            FROM {r2} {where_rating} GROUP BY application_id
+        ) r2 ON r2.application_id = a.id
+        {where_app}
+    """.format(
+        app=tables[0], r0=tables[1], r1=tables[2], r2=tables[3],
+        where_rating=where['application_id'], where_app=where['id'],
+    )
+
+    stats = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            pk, yes, no, review, r1_count, r1_sum, r1_squares, r1_min, r1_max, r2_count, r2_sum, r2_squares = row
+            stats[pk] = RatingStats(
+                yes or 0, no or 0, review or 0,
+                r1_count or 0, to_decimal(r1_sum), to_decimal(r1_squares, '0.01'), to_decimal(r1_max) - to_decimal(r1_min),
+                r2_count or 0, to_decimal(r2_sum), to_decimal(r2_squares, '0.01'),
+            )
+    return stats
+
+
+def repair_totals(application_ids):
+    """
+    Overwrites the running totals of the applications with the aggregates of
+    their ratings and recalculates them (saves them), one transaction each
+    """
+    Application2017 = apps.get_model('application', 'Application2017')
+    fields = Application2017.SUMMARY_FIELDS
+    for pk in application_ids:
+        with transaction.atomic():
+            # locked before the ratings are read again, so the F() increment of a rating saved meanwhile is not lost
+            application = Application2017.objects.get_all().select_for_update().filter(pk=pk).first()
+            if application is None:
+                continue
+            totals = fetch_rating_stats([pk]).get(pk, EMPTY_STATS)._asdict()
+            del totals['r1_spread']
+            Application2017.objects.get_all().filter(pk=pk).update(updated_at=timezone.now(), **dict(zip(fields, totals.values())))
+            application.refresh_from_db()
+            application.save()  # when save is envoked ratings are recalculated
+
+
+# fields written by recalculate_range -- the decision and the running totals it is based on
+RECALCULATED_FIELDS = list(RatingDecision._fields) + [
+    'r0_yes_count', 'r0_no_count', 'r0_review_count',
+    'r1_count', 'r1_sum', 'r1_sum_squares',
+    'r2_count', 'r2_sum', 'r2_sum_squares',
+]
+
+
+def recalculate_range(pk_range, policy=DEFAULT_POLICY, dry_run=False):
+    """
+    Recalculates the applications with `low <= id < high` in bulk: the ratings
+    are aggregated by one query, the policy is applied in memory and only the
+    applications whose flags, scores or totals changed are written back (one
+    UPDATE per batch, see db.bulk_update). Returns (applications, changed).
+
+    Saving an application one by one does the same, but also sends post_save
+    -- the caller is responsible for re-syncing the rating queue afterwards.
+
+    The applications of the range are locked (SELECT ... FOR UPDATE) before the
+    ratings are aggregated: a rating saved meanwhile either is included in the
+    aggregates, or its F() increment of the totals waits for this transaction
+    and is applied on top of the written totals -- it is never overwritten.
+    """
+    with transaction.atomic():
+        return _recalculate_range(pk_range, policy, dry_run)
+
+
+def _recalculate_range(pk_range, policy, dry_run):
+    Application2017 = apps.get_model('application', 'Application2017')
+    low, high = pk_range
+    applications = Application2017.objects.filter(pk__gte=low).only(*RECALCULATED_FIELDS)
+    if high is not None:
+        applications = applications.filter(pk__lt=high)
+    if not dry_run:
+        applications = applications.select_for_update()
+    applications = list(applications.order_by('pk'))
+
+    stats = fetch_rating_stats(pk_range=pk_range)
+    count, changed = 0, []
+    for application in applications:
+        count += 1
+        before = [getattr(application, field) for field in RECALCULATED_FIELDS]
+        totals = stats.get(application.pk, EMPTY_STATS)
+        application.r0_yes_count, application.r0_no_count, application.r0_review_count = totals.r0_yes, totals.r0_no, totals.r0_review
+        application.r1_count, application.r1_sum, application.r1_sum_squares = totals.r1_count, totals.r1_sum, totals.r1_sum_squares
+        application.r2_count, application.r2_sum, application.r2_sum_squares = totals.r2_count, totals.r2_sum, totals.r2_sum_squares
+        decision = decide(totals, application.status, policy)
+        decision = decision._replace(rating1=float(decision.rating1), rating2=float(decision.rating2))  # FloatFields
+        for field, value in zip(RatingDecision._fields, decision):
+            setattr(application, field, value)
+        if [getattr(application, field) for field in RECALCULATED_FIELDS] != before:
+            changed.append(application)
+
+    if changed and not dry_run:
+        bulk_update(Application2017.objects.get_all(), changed, RECALCULATED_FIELDS, updated_at=timezone.now())
+    return count, len(changed)
@@ -0,0 +1,104 @@
+"""
+What-if simulation of the rating policy (see ratings.py).
+
+The aggregated ratings of all applications are loaded once into NumPy arrays
+(load_rating_arrays) and `decide` is evaluated for all of them at once as array
+operations (decide_arrays), so a candidate RatingPolicy can be evaluated in a
+few milliseconds without touching the database. Used by
+`python manage.py simulate_thresholds`.
+"""
+import numpy as np
+
+from .models import Application2017
+from .ratings import DEFAULT_POLICY, fetch_rating_stats
+
+# sets of applications compared between the policies (see summarize)
+OUTCOMES = ['need_rating0', 'need_rating1', 'need_rating2', 'round2', 'blacklisted']
+
+
+def load_rating_arrays():
+    """{name: array} of the statuses and the aggregated ratings of all (not deleted) applications"""
+    stats = fetch_rating_stats()
+    applications = list(Application2017.objects.values_list('pk', 'status'))
+    rows = [stats[pk] for pk, _ in applications]
+
+    def column(name, dtype):
+        return np.array([getattr(row, name) for row in rows], dtype=dtype)
+
+    return {
+        'pk': np.array([pk for pk, _ in applications], dtype=np.int64),
+        'status': np.array([status for _, status in applications], dtype=object),
+        'r0_yes': column('r0_yes', np.int64),
+        'r0_no': column('r0_no', np.int64),
+        'r0_review': column('r0_review', np.int64),
+        'r1_count': column('r1_count', np.int64),
+        'r1_sum': column('r1_sum', np.float64),
+        'r1_spread': column('r1_spread', np.float64),
+        'r2_count': column('r2_count', np.int64),
+        'r2_sum': column('r2_sum', np.float64),
+    }
+
+
+def decide_arrays(data, policy=DEFAULT_POLICY):
+    """ratings.decide for all applications at once -- returns {name: array} (see OUTCOMES)"""
+    r1_count, r2_count = data['r1_count'], data['r2_count']
+
+    # Round 0
+    need_rating0 = data['r0_review'] == 0
+    enough_yeses = data['r0_yes'] >= policy.yeses_needed
+    rejected = need_rating0 & ~enough_yeses & (data['r0_no'] >= policy.nos_needed)
+    need_rating0 = need_rating0 & ~enough_yeses & ~rejected
+
+    blacklisted = (data['status'] == 'blacklisted') | rejected
+    whitelist2 = (data['status'] == 'whitelist2') & ~blacklisted
+    whitelist3 = (data['status'] == 'whitelist3') & ~blacklisted
+
+    # Rating scores
+    rating1 = np.where(r1_count > 0, data['r1_sum'] / np.maximum(r1_count, 1), 0)
+    rating2 = np.where(r2_count > 0, data['r2_sum'] / np.maximum(r2_count, 1), 0)
+
+    need_rating1 = r1_count < policy.max_reviews_round_one
+    need_rating2 = r2_count < policy.max_reviews_round_two
+
+    # very low quality application with exactly 1 review -- no second review
+    low = rating1 <= policy.rating_r1_low_threshold
+    need_rating1 &= ~(low & (r1_count == 1))
+
+    # middle range with exactly 2 distant reviews -- third opinion
+    middle = ~low & (policy.needed_rating_for_third_review_round1 <= rating1) & (rating1 < policy.needed_rating_to_round2)
+    need_rating1 |= middle & (r1_count == 2) & (data['r1_spread'] > policy.needed_difference_for_third_review_round1)
+
+    need_rating1 &= ~need_rating0
+    need_rating2 &= ~need_rating0 & ~need_rating1
+
+    # explicit decisions
+    rating1 = np.where(blacklisted, 0, rating1)
+    rating2 = np.where(blacklisted, 0, rating2)
+    need_rating0 &= ~(blacklisted | whitelist2 | whitelist3)
+    need_rating1 &= ~(blacklisted | whitelist2 | whitelist3)
+    need_rating2 = np.where(whitelist2, r2_count < policy.max_reviews_round_two, need_rating2 & ~blacklisted & ~whitelist3)
+
+    # see ApplicationManager.get_all_round2
+    round2 = ~need_rating1 & ((rating1 >= policy.needed_rating_to_round2) | whitelist2) & ~whitelist3
+
+    return {
+        'rating1': rating1,
+        'rating2': rating2,
+        'need_rating0': need_rating0,
+        'need_rating1': need_rating1,
+        'need_rating2': need_rating2,
+        'round2': round2,
+        'blacklisted': blacklisted,
+    }
+
+
+def summarize(outcome, baseline):
+    """{outcome: (count, moved in, moved out)} compared to the outcome of the baseline policy"""
+    return {
+        name: (
+            int(np.count_nonzero(outcome[name])),
+            int(np.count_nonzero(outcome[name] & ~baseline[name])),
+            int(np.count_nonzero(~outcome[name] & baseline[name])),
+        )
+        for name in OUTCOMES
+    }
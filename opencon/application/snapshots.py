@@ -0,0 +1,146 @@
+"""
+Export snapshots -- the CSV exports (see exports.py) written to gzipped files
+by `python manage.py write_export_snapshots` (e.g. from cron), so downloading
+an export reads a file instead of the database.
+
+A snapshot is `<name>.<sha256 of the CSV>.csv.gz` in EXPORT_SNAPSHOT_DIR (a
+private directory, outside of MEDIA_ROOT and STATIC_ROOT), and
+`<name>.json` records the current one (its hash, when it last changed and the
+watermark of the export, see exports.py). The hash is the ETag of the
+download: unchanged exports are not rewritten and are answered with 304 Not
+Modified (see ExportView). Both responses send the watermark in
+X-Export-Watermark, so an incremental sync can start from a snapshot: the rows
+changed after the watermark are sent by the next `?since=` export.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import exports
+from .resources import Application2017Resource, DraftResource, UserResource, Round0RatingResource, Round1RatingResource, Round2RatingResource
+
+# name: function returning the lines of the export
+SNAPSHOT_EXPORTS = {
+    'applications': lambda: exports.iter_csv(Application2017Resource()),
+    'drafts': lambda: exports.iter_csv(DraftResource()),
+    'users': lambda: exports.iter_csv(UserResource()),
+    'round0ratings': lambda: exports.iter_csv(Round0RatingResource()),
+    'round1ratings': lambda: exports.iter_csv(Round1RatingResource()),
+    'round2ratings': lambda: exports.iter_csv(Round2RatingResource()),
+    'applications-with-ratings': exports.iter_wide_csv,
+}
+
+
+def snapshot_dir():
+    return settings.EXPORT_SNAPSHOT_DIR
+
+
+def get_snapshot(name):
+    """{'sha256', 'path', 'modified', 'watermark'} of the current snapshot of the export, or None"""
+    try:
+        with open(os.path.join(snapshot_dir(), '{}.json'.format(name))) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = os.path.join(snapshot_dir(), meta['file'])
+    if not os.path.exists(path):
+        return None
+    watermark = meta.get('watermark')  # None for the snapshots written before it was recorded
+    return {
+        'sha256': meta['sha256'],
+        'path': path,
+        'modified': parse_datetime(meta['modified']),
+        'watermark': parse_datetime(watermark) if watermark else None,
+    }
+
+
+def write_snapshot(name):
+    """Writes a new snapshot of the export (unless the CSV did not change), returns (sha256, changed)"""
+    watermark = exports.current_watermark()  # before the first row is read
+    directory = snapshot_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)  # personal data, readable by the app only
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.{}.'.format(name))
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            for line in SNAPSHOT_EXPORTS[name]():
+                data = line.encode('utf-8')
+                digest.update(data)
+                f.write(data)
+
+        sha256 = digest.hexdigest()
+        current = get_snapshot(name)
+        if current is not None and current['sha256'] == sha256:
+            # the same rows, read later: only the watermark moves on
+            write_meta(name, {
+                'sha256': sha256,
+                'file': os.path.basename(current['path']),
+                'modified': current['modified'].isoformat(),
+                'watermark': watermark.isoformat(),
+            })
+            return sha256, False
+
+        filename = '{}.{}.csv.gz'.format(name, sha256)
+        os.replace(temp_path, os.path.join(directory, filename))
+        write_meta(name, {
+            'sha256': sha256,
+            'file': filename,
+            'modified': timezone.now().isoformat(),
+            'watermark': watermark.isoformat(),
+        })
+        if current is not None and current['path'] != os.path.join(directory, filename):
+            os.remove(current['path'])  # a download in progress keeps reading the open file
+        return sha256, True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_meta(name, meta):
+    fd, temp_path = tempfile.mkstemp(dir=snapshot_dir(), prefix='.{}.'.format(name))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(temp_path, os.path.join(snapshot_dir(), '{}.json'.format(name)))
+
+
+def snapshot_response(request, snapshot, filename):
+    """
+    The snapshot as a download with ETag / Last-Modified / X-Export-Watermark,
+    or 304 Not Modified for a matching If-None-Match (or If-Modified-Since).
+    The gzipped file is sent as it is to clients accepting gzip, other clients
+    get the plain CSV.
+    """
+    etag = '"{}"'.format(snapshot['sha256'])
+    modified = int(snapshot['modified'].timestamp())
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        not_modified = '*' in tags or etag in tags or 'W/' + etag in tags
+    else:
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        not_modified = if_modified_since is not None and modified <= if_modified_since
+
+    if not_modified:
+        response = HttpResponseNotModified()
+    elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = FileResponse(open(snapshot['path'], 'rb'), content_type='csv')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(gzip.open(snapshot['path'], 'rb'), content_type='csv')
+    if not not_modified:
+        response['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    if snapshot['watermark'] is not None:
+        response['X-Export-Watermark'] = snapshot['watermark'].isoformat()
+    response['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,68 @@
+import json
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase, TransactionTestCase
+
+from .airport_index import AirportEntry, AirportIndex
+from .autocomplete_cache import get_stats
+from .models import Airport
+
+
+class AirportIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = AirportIndex([
+            AirportEntry(1, 'GRU', 'São Paulo (Guarulhos), Brazil'),
+            AirportEntry(2, 'LHR', 'London (Heathrow), United Kingdom'),
+            AirportEntry(3, 'LON', 'London (All Airports), United Kingdom'),
+            AirportEntry(4, 'YXU', 'London (London), Canada'),
+            AirportEntry(5, 'LDY', 'Londonderry (Eglinton), United Kingdom'),
+        ])
+
+    def test_iata_code_first(self):
+        self.assertEqual([entry.pk for entry in self.index.search('lon')], [3, 2, 4, 5])
+        self.assertEqual([entry.pk for entry in self.index.search('LHR')], [2])
+
+    def test_word_prefixes_without_accents(self):
+        self.assertEqual([entry.pk for entry in self.index.search('sao pau')], [1])
+        self.assertEqual([entry.pk for entry in self.index.search('guarulhos brazil')], [1])
+        self.assertEqual([entry.pk for entry in self.index.search('london canada')], [4])
+        self.assertEqual(self.index.search('paris'), [])
+        self.assertEqual(len(self.index.search('')), 5)
+
+
+class AirportAutocompleteTest(TransactionTestCase):
+    # the index is refreshed when a transaction commits
+
+    def setUp(self):
+        cache.clear()
+        Airport.objects.create(iata_code='BER', name='Berlin (Brandenburg), Germany')
+
+    def get(self, q, **headers):
+        return self.client.get(reverse('application:airport-autocomplete'), {'q': q}, **headers)
+
+    def search(self, q):
+        response = self.get(q)
+        return [result['text'] for result in json.loads(response.content.decode())['results']]
+
+    def test_served_from_memory_and_refreshed(self):
+        self.assertEqual(self.search('berl'), ['[BER] Berlin (Brandenburg), Germany'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('germany'), ['[BER] Berlin (Brandenburg), Germany'])
+
+        Airport.objects.create(iata_code='TXL', name='Berlin (Tegel), Germany')
+        self.assertEqual(self.search('berlin'), ['[BER] Berlin (Brandenburg), Germany', '[TXL] Berlin (Tegel), Germany'])
+
+    def test_cached_by_normalized_query(self):
+        response = self.get('Berl')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertEqual(get_stats('airports')['misses'], 1)
+
+        repeated = self.get('  BERL ')
+        self.assertEqual(repeated.content, response.content)
+        self.assertEqual(repeated['ETag'], response['ETag'])
+        self.assertEqual(get_stats('airports')['hits'], 1)
+
+        not_modified = self.get('berl', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(get_stats('airports'), {'hits': 2, 'misses': 1, 'not_modified': 1, 'hit_rate': 2 / 3})
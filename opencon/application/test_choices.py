@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from .choices import ChoiceLabelIndex
+from .models import Application2017, CHOICE_LABELS
+
+
+class ChoiceLabelIndexTest(SimpleTestCase):
+    def test_label_by_field_and_by_table(self):
+        self.assertEqual(CHOICE_LABELS.label('citizenship', 'SK'), dict(Application2017.COUNTRY_CHOICES)['SK'])
+        self.assertEqual(CHOICE_LABELS.label('COUNTRY_CHOICES', 'SK'), dict(Application2017.COUNTRY_CHOICES)['SK'])
+        self.assertEqual(CHOICE_LABELS.label('area_of_interest', 'open_access'), 'Open Access')
+        self.assertIsNone(CHOICE_LABELS.label('field', 'no-such-code'))
+        self.assertIn('data.GENDER_CHOICES', CHOICE_LABELS)
+
+    def test_labels_keep_unknown_codes(self):
+        self.assertEqual(CHOICE_LABELS.labels('attended', ['2015', 'unknown']), ['OpenCon 2015', 'unknown'])
+
+    def test_index_is_read_only(self):
+        with self.assertRaises(TypeError):
+            CHOICE_LABELS.table('field')['un08'] = 'Changed'
+
+    def test_option_groups_and_unknown_aliases(self):
+        index = ChoiceLabelIndex({'GROUPED_CHOICES': [('Group', [('a', 'A'), ('b', 'B')])]})
+        self.assertEqual(index.labels('GROUPED_CHOICES', ['a', 'b']), ['A', 'B'])
+        with self.assertRaises(ValueError):
+            ChoiceLabelIndex({}, {'field': 'MISSING_CHOICES'})
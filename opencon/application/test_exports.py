@@ -0,0 +1,178 @@
+import csv
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from opencon.rating.models import User, Round1Rating
+from . import exports, snapshots
+from .db import bulk_update
+from .models import Application2017
+from .resources import Application2017Resource, Round1RatingResource
+from .testing import create_application
+
+
+class StreamingExportTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(email='no@mail.com')
+        for rating in ['6.0', '7.5', '9.0']:
+            Round1Rating.objects.create(created_by=user, application=create_application(), rating=Decimal(rating))
+
+    def test_same_output_as_tablib(self):
+        for resource_class in (Application2017Resource, Round1RatingResource):
+            streamed = ''.join(exports.iter_csv(resource_class(), chunk_size=2))
+            self.assertEqual(streamed, resource_class().export().csv)
+
+    def test_rows_are_read_in_chunks(self):
+        with self.assertNumQueries(2):  # 2 + 1 rows
+            lines = list(exports.iter_csv(Round1RatingResource(), chunk_size=2))
+        self.assertEqual(len(lines), 4)
+
+    @override_settings(EXPORT_WATERMARK_MARGIN_SECONDS=0)
+    def test_incremental_export(self):
+        url = reverse('application:export_round1ratings')
+        self.client.force_login(get_user_model().objects.create_user('admin', password='secret'))
+        response = self.client.get(url, {'live': 1})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+        watermark = response['X-Export-Watermark']
+
+        response = self.client.get(url, {'since': watermark})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)  # the header only
+        watermark = response['X-Export-Watermark']
+
+        rating = Round1Rating.objects.order_by('pk').first()
+        rating.rating = Decimal('5.0')
+        rating.save()
+        response = self.client.get(url, {'since': watermark})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(set(lines[1].split(',')), {str(rating.pk), '5.0', str(rating.application_id), str(rating.created_by_id)})
+        self.assertGreater(exports.parse_watermark(response['X-Export-Watermark']), exports.parse_watermark(watermark))
+
+    def test_recent_changes_wait_for_the_next_export(self):
+        # rows changed within EXPORT_WATERMARK_MARGIN_SECONDS may belong to transactions which are not committed yet
+        since = timezone.now() - datetime.timedelta(days=1)
+        response = exports.csv_response(Round1RatingResource(), 'ratings.csv', since=since)
+        self.assertEqual(len(list(response.streaming_content)), 1)  # the header only
+        watermark = exports.parse_watermark(response['X-Export-Watermark'])
+        self.assertLess(watermark, timezone.now() - datetime.timedelta(seconds=settings.EXPORT_WATERMARK_MARGIN_SECONDS - 60))
+
+    def test_bulk_update_sets_updated_at(self):
+        rating = Round1Rating.objects.order_by('pk').first()
+        Round1Rating.objects.filter(pk=rating.pk).update(updated_at=timezone.now() - datetime.timedelta(days=1))
+        rating.rating = Decimal('5.0')
+        bulk_update(Round1Rating.objects.all(), [rating], ['rating'])
+        self.assertGreater(Round1Rating.objects.get(pk=rating.pk).updated_at, timezone.now() - datetime.timedelta(minutes=1))
+
+    def test_invalid_watermark(self):
+        self.client.force_login(get_user_model().objects.create_user('admin', password='secret'))
+        response = self.client.get(reverse('application:export_round1ratings'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class WideExportTest(TestCase):
+    def test_ratings_are_pivoted(self):
+        reviewers = [User.objects.create(email='{}@example.com'.format(i), nick='reviewer{}'.format(i)) for i in range(2)]
+        applications = [create_application() for _ in range(3)]
+        Round1Rating.objects.create(created_by=reviewers[0], application=applications[0], rating=Decimal('6.0'), recommendations=['oc', 'certificate'])
+        Round1Rating.objects.create(created_by=reviewers[1], application=applications[0], rating=Decimal('8.0'))
+        Round1Rating.objects.create(created_by=reviewers[1], application=applications[2], rating=Decimal('4.0'), issues=['problem'])
+
+        with self.assertNumQueries(2 + 3 * 2):  # the reviewer columns + 3 per chunk
+            rows = list(csv.DictReader(exports.iter_wide_csv(chunk_size=2)))
+
+        self.assertEqual([row['id'] for row in rows], [str(a.pk) for a in applications])
+        self.assertNotIn('r1_3_rating', rows[0])
+        self.assertNotIn('r2_1_rating', rows[0])
+        self.assertEqual((rows[0]['r1_count'], rows[0]['r1_average'], rows[0]['r1_standard_deviation']), ('2', '7.0', '1.0'))
+        self.assertEqual((rows[0]['r1_1_reviewer'], rows[0]['r1_1_rating'], rows[0]['r1_1_recommendations']), ('reviewer0', '6.0', 'oc, certificate'))
+        self.assertEqual((rows[0]['r1_2_reviewer'], rows[0]['r1_2_rating']), ('reviewer1', '8.0'))
+        self.assertEqual((rows[1]['r1_count'], rows[1]['r1_1_rating']), ('0', ''))
+        self.assertEqual((rows[2]['r1_1_rating'], rows[2]['r1_1_issues'], rows[2]['r1_2_rating']), ('4.0', 'problem', ''))
+
+    @override_settings(EXPORT_WATERMARK_MARGIN_SECONDS=0)
+    def test_changed_applications_and_ratings(self):
+        reviewer = User.objects.create(email='no@mail.com', nick='reviewer')
+        applications = [create_application() for _ in range(4)]
+        rating = Round1Rating.objects.create(created_by=reviewer, application=applications[1], rating=Decimal('6.0'))
+        since = timezone.now() - datetime.timedelta(days=1)
+        Application2017.objects.update(updated_at=since - datetime.timedelta(hours=1))
+        Round1Rating.objects.update(updated_at=since - datetime.timedelta(hours=1))
+        Application2017.objects.filter(pk=applications[3].pk).update(updated_at=timezone.now())
+        Round1Rating.objects.filter(pk=rating.pk).update(updated_at=timezone.now())
+
+        self.client.force_login(get_user_model().objects.create_user('admin', password='secret'))
+        response = self.client.get(reverse('application:export_apps_with_ratings'), {'since': since.isoformat()})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['id'] for row in rows], [str(applications[1].pk), str(applications[3].pk)])
+        self.assertEqual(rows[0]['r1_1_rating'], '6.0')
+        self.assertIn('X-Export-Watermark', response)
+
+
+class SnapshotDirectoryTest(SimpleTestCase):
+    def test_snapshots_are_not_served_as_files(self):
+        directory = os.path.realpath(settings.EXPORT_SNAPSHOT_DIR)
+        for served in (settings.MEDIA_ROOT, settings.STATIC_ROOT):
+            self.assertFalse(directory.startswith(os.path.join(os.path.realpath(served), '')), served)
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings_override = override_settings(EXPORT_SNAPSHOT_DIR=directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        user = User.objects.create(email='no@mail.com')
+        Round1Rating.objects.create(created_by=user, application=create_application(), rating=Decimal('6.0'))
+        self.url = reverse('application:export_round1ratings_secretlink')
+
+    def test_snapshot_is_served_without_queries(self):
+        live = b''.join(self.client.get(self.url).streaming_content)  # no snapshot yet
+        sha256, changed = snapshots.write_snapshot('round1ratings')
+        self.assertTrue(changed)
+        self.assertEqual(snapshots.write_snapshot('round1ratings'), (sha256, False))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+            self.assertEqual(b''.join(response.streaming_content), live)
+            self.assertEqual(response['ETag'], '"{}"'.format(sha256))
+
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), live)
+
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"{}"'.format(sha256))
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['X-Export-Watermark'], snapshots.get_snapshot('round1ratings')['watermark'].isoformat())
+
+        response = self.client.get(self.url, {'live': 1})
+        self.assertNotIn('ETag', response)
+        self.assertEqual(b''.join(response.streaming_content), live)
+
+    @override_settings(EXPORT_WATERMARK_MARGIN_SECONDS=0)
+    def test_incremental_export_starts_from_the_snapshot(self):
+        snapshots.write_snapshot('round1ratings')
+        response = self.client.get(self.url)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2)
+        watermark = response['X-Export-Watermark']
+
+        rating = Round1Rating.objects.get()
+        rating.rating = Decimal('7.0')
+        rating.save()
+        response = self.client.get(self.url, {'since': watermark})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('7.0', lines[1].split(','))
+
+        snapshots.write_snapshot('round1ratings')  # the watermark moves on even when the rows did not change
+        self.assertEqual(snapshots.write_snapshot('round1ratings')[1], False)
+        self.assertGreater(snapshots.get_snapshot('round1ratings')['watermark'], exports.parse_watermark(watermark))
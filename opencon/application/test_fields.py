@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase, TestCase
+
+from .fields import ChoiceListField
+from .models import Application2017
+from .testing import create_application
+
+
+class ChoiceListFieldTest(SimpleTestCase):
+    def test_stored_as_json(self):
+        field = ChoiceListField()
+        self.assertEqual(field.get_prep_value(['oa_week', 'other']), '["oa_week", "other"]')
+        self.assertEqual(field.get_prep_value(('female', '')), '["female", ""]')
+
+    def test_legacy_values(self):
+        field = ChoiceListField()
+        self.assertEqual(field.from_db_value("['oa_week']", None, None, None), ['oa_week'])
+        self.assertEqual(field.from_db_value("(['european'], 'other')", None, None, None), [['european'], 'other'])
+        self.assertEqual(field.from_db_value('', None, None, None), [])
+        self.assertEqual(field.get_prep_value("('female', '')"), '["female", ""]')
+
+
+class ChoiceListQueryTest(TestCase):
+    def test_round_trip_and_lookup(self):
+        application = create_application(events=['oa_week', 'other'])
+        create_application(events=['other'])
+        self.assertEqual(Application2017.objects.get(pk=application.pk).events, ['oa_week', 'other'])
+        self.assertEqual(list(Application2017.objects.filter(events__contains='oa_week')), [application])
@@ -0,0 +1,50 @@
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+
+from opencon.rating.models import User, Round0Rating
+from .models import Application2017
+from .testing import create_application
+
+
+@skipUnless(connection.vendor == 'postgresql', 'partial indexes are only created on PostgreSQL')
+class EligibilityIndexTest(TestCase):
+    """The eligibility queries can be answered from the partial indexes (see indexes.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='no@mail.com')
+        applications = [create_application() for _ in range(40)]
+        pks = [application.pk for application in applications]
+        Application2017.objects.filter(pk__in=pks[:10]).update(need_rating0=False, need_rating1=False, rating1=8)
+        Application2017.objects.filter(pk__in=pks[10:20]).update(need_rating0=False, need_rating1=True)
+        Application2017.objects.filter(pk__in=pks[20:25]).update(status='blacklisted', need_rating0=False, need_rating1=False, need_rating2=False)
+        Application2017.objects.filter(pk__in=pks[25:30]).update(status='deleted')
+
+    def assertUsesIndex(self, queryset, *names):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}'.format(connection.ops.quote_name(Application2017._meta.db_table)))
+            cursor.execute('SET LOCAL enable_seqscan = off')  # the seeded table is tiny -- only check that the index is usable
+            cursor.execute('EXPLAIN ' + sql, params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertTrue(any(name in plan for name in names), plan)
+
+    def test_need_rating(self):
+        self.assertUsesIndex(Application2017.objects.get_need_rating(0), 'application_need_rating0')
+        self.assertUsesIndex(Application2017.objects.get_unrated(self.user), 'application_need_rating1')
+        self.assertUsesIndex(Application2017.objects.get_unrated2(self.user), 'application_need_rating2', 'application_round2')
+
+    def test_round_lists(self):
+        self.assertUsesIndex(Application2017.objects.get_all_round1(), 'application_round1')
+        self.assertUsesIndex(Application2017.objects.get_all_round2(), 'application_round2')
+
+
+class UniqueRatingTest(TestCase):
+    def test_one_rating_per_reviewer(self):
+        user = User.objects.create(email='no@mail.com')
+        application = create_application()
+        Round0Rating.objects.create(created_by=user, application=application, decision='yes')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Round0Rating.objects.create(created_by=user, application=application, decision='no')
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from opencon.rating.models import User, Round1Rating, Round2Rating
+from . import letters
+from .models import OutgoingEmail
+from .testing import create_application
+
+
+class DecisionLetterTest(TestCase):
+    def setUp(self):
+        self.applications = [create_application() for _ in range(3)]
+        reviewers = [User.objects.create(email='{}@example.com'.format(i), nick='reviewer{}'.format(i)) for i in range(2)]
+        Round1Rating.objects.create(created_by=reviewers[0], application=self.applications[0], rating=Decimal('6.0'), note="Don't give up!")
+        Round1Rating.objects.create(created_by=reviewers[1], application=self.applications[0], rating=Decimal('8.0'), note='  ')
+        Round2Rating.objects.create(created_by=reviewers[1], application=self.applications[0], rating=Decimal('8.0'),
+                                    decision='yes', comments='Great work', note='Great work on open data.')
+
+    def test_letters_with_notes(self):
+        self.assertEqual(letters.queue_letters(chunk_size=2), {'queued': 3, 'skipped': 0, 'duplicates': 0})
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+        letter = OutgoingEmail.objects.get(key=letters.letter_key(self.applications[0].pk))
+        self.assertEqual(letter.subject, 'OpenCon 2017 -- Your application')
+        self.assertEqual(letter.to, [self.applications[0].email])
+        self.assertIn("* Don't give up!", letter.body)
+        self.assertIn('* Great work on open data.', letter.body)
+        self.assertNotIn('reviewer', OutgoingEmail.objects.get(key=letters.letter_key(self.applications[1].pk)).body)
+
+    def test_resume(self):
+        OutgoingEmail.objects.queue('Sent before', '', ['x@example.com'], key=letters.letter_key(self.applications[1].pk))
+        self.assertEqual(letters.queue_letters(), {'queued': 2, 'skipped': 1, 'duplicates': 0})
+        self.assertEqual(letters.queue_letters(), {'queued': 0, 'skipped': 3, 'duplicates': 0})
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+    def test_deleted_and_duplicate_applications(self):
+        create_application(email=self.applications[0].email.upper())  # submitted twice
+        deleted = create_application(status='deleted')
+        self.assertEqual(letters.queue_letters(), {'queued': 3, 'skipped': 0, 'duplicates': 1})
+        self.assertFalse(OutgoingEmail.objects.filter(key=letters.letter_key(deleted.pk)).exists())
+
+        self.assertEqual(letters.queue_letters(include_deleted=True), {'queued': 1, 'skipped': 3, 'duplicates': 1})
+        self.assertTrue(OutgoingEmail.objects.filter(key=letters.letter_key(deleted.pk)).exists())
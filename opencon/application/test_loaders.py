@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from django.test import TestCase
+
+from opencon.rating.models import User
+from .loaders import DraftLoader, UserLoader, load_airports
+from .models import Airport, Draft
+from .testing import create_application
+
+ROWS = [
+    '1,"Goroka","Goroka","Papua New Guinea","GKA","AYGA",-6.081689,145.391881,5282,10,"U","Pacific/Port_Moresby"',
+    '2,"Doncaster Sheffield","Doncaster, Sheffield","United Kingdom","DSA","EGCN",53.474722,-1.004444,55,0,"E","Europe/London"',
+    '3,"Blacklisted","Nowhere","Nowhere","BLA","XXXX",0,0,0,0,"U","\\N"',
+]
+
+
+class AirportLoaderTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def load(self, rows):
+        list_path, blacklist_path = os.path.join(self.directory, 'list.txt'), os.path.join(self.directory, 'blacklist.txt')
+        with open(list_path, 'w') as f:
+            f.write('\n'.join(rows) + '\n')
+        with open(blacklist_path, 'w') as f:
+            f.write('# comment\nBLA\n')
+        return load_airports(list_path, blacklist_path)
+
+    def test_diff(self):
+        self.assertEqual(self.load(ROWS).created, 3)  # + "Other airport"
+        doncaster = Airport.objects.get(iata_code='DSA')
+        self.assertEqual(doncaster.name, 'Doncaster, Sheffield (Doncaster Sheffield), United Kingdom')
+        self.assertEqual((doncaster.latitude, doncaster.timezone), (53.474722, 'Europe/London'))
+
+        self.assertEqual(self.load(ROWS), (0, 0, 0, 0))
+
+        create_application(airport=doncaster)
+        result = self.load([ROWS[0].replace('Goroka"', 'Goroka Airport"', 1)])
+        self.assertEqual((result.created, result.updated, result.deleted, result.kept), (0, 1, 0, 1))
+        self.assertTrue(Airport.objects.filter(pk=doncaster.pk).exists())  # still referenced
+        self.assertEqual(Airport.objects.get(iata_code='GKA').name, 'Goroka (Goroka Airport), Papua New Guinea')
+
+
+class UserLoaderTest(TestCase):
+    def test_upsert(self):
+        User.objects.create(email='known@example.com', first_name='Old', last_name='Name', nick='known')
+        User.objects.create(email='same@example.com', first_name='Same', last_name='User', nick='same')
+        path = os.path.join(tempfile.mkdtemp(), 'users.txt')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('email,first_name,last_name,nick\n'
+                    '# comment\n'
+                    'new@example.com,New,User,new\n'
+                    'known@example.com,Known,"Name, Jr.",known\n'
+                    'same@example.com,Same,User,same\n'
+                    'not-an-email,Bad,Row,bad\n'
+                    'short@example.com,Short\n')
+
+        loader = UserLoader()
+        self.assertEqual(loader.load(path), (1, 1, 1, 2))
+        self.assertEqual([number for number, messages in loader.errors], [6, 7])  # lines of the file
+        self.assertEqual(User.objects.get(email='known@example.com').last_name, 'Name, Jr.')
+        self.assertEqual(User.objects.filter(email='new@example.com').count(), 1)
+        self.assertEqual(UserLoader().load(path), (0, 0, 3, 2))
+
+
+class DraftLoaderTest(TestCase):
+    def test_unchanged_drafts_are_skipped(self):
+        Draft.objects.create(email='saved@example.com', data=json.dumps(OrderedDict([('first_name', ['Jane']), ('email', ['saved@example.com'])])))
+        path = os.path.join(tempfile.mkdtemp(), 'drafts.txt')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('email,first_name,last_name,bio\n'
+                    'saved@example.com,Jane,,\n'
+                    'new@example.com,John,Doe,Lorem ipsum\n')
+
+        self.assertEqual(DraftLoader().load(path), (1, 0, 1, 0))
+        self.assertEqual(DraftLoader().load(path), (0, 0, 2, 0))
+        self.assertEqual(json.loads(Draft.objects.get(email='new@example.com').data)['bio'], ['Lorem ipsum'])
+
+    def test_multi_line_fields(self):
+        path = os.path.join(tempfile.mkdtemp(), 'drafts.txt')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('email,first_name,bio\n'
+                    'first@example.com,Jane,"Lorem ipsum\n'
+                    '\n'
+                    '# not a comment, ""quoted""\n'
+                    'dolor sit amet."\n'
+                    '\n'
+                    'not-an-email,John,"Lorem\nipsum"\n'
+                    'second@example.com,John,Doe\n')
+
+        loader = DraftLoader()
+        self.assertEqual(loader.load(path), (2, 0, 0, 1))
+        self.assertEqual([number for number, messages in loader.errors], [7])  # the first line of the row
+        data = json.loads(Draft.objects.get(email='first@example.com').data)
+        self.assertEqual(data['bio'], ['Lorem ipsum\n\n# not a comment, "quoted"\ndolor sit amet.'])
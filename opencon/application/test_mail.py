@@ -0,0 +1,52 @@
+from smtplib import SMTPException
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .mail import send_batch
+from .models import Draft, OutgoingEmail
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPException('Relay unavailable')
+
+
+@override_settings(DEFAULT_FROM_EMAIL='opencon@example.org', MAIL_OUTBOX_MAX_ATTEMPTS=2, MAIL_OUTBOX_RETRY_SECONDS=60)
+class OutboxTest(TestCase):
+    def queue(self):
+        return OutgoingEmail.objects.queue('Subject', '<p>Body</p>', ['applicant@example.org'], bcc=['backup@example.org'], html=True)
+
+    def test_send(self):
+        email = self.queue()
+        self.assertEqual(send_batch(), {'sent': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].bcc, ['backup@example.org'])
+        self.assertEqual(mail.outbox[0].content_subtype, 'html')
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.SENT, 1))
+        self.assertEqual(send_batch(), {'sent': 0, 'retried': 0, 'failed': 0})
+
+    def test_retry_with_backoff(self):
+        email = self.queue()
+        self.assertEqual(send_batch(FailingBackend()), {'sent': 0, 'retried': 1, 'failed': 0})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.QUEUED)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('Relay unavailable', email.last_error)
+        self.assertEqual(send_batch(FailingBackend()), {'sent': 0, 'retried': 0, 'failed': 0})  # not due yet
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_batch(FailingBackend()), {'sent': 0, 'retried': 0, 'failed': 1})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.FAILED, 2))
+
+    @override_settings(SEND_EMAILS=True, DEFAULT_REPLYTO_EMAIL='reply@example.org')
+    def test_draft_access_is_queued(self):
+        draft = Draft.objects.create(email='applicant@example.org', data='{}')
+        self.assertTrue(draft.send_access())
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().to, ['applicant@example.org'])
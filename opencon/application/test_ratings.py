@@ -0,0 +1,119 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from opencon.rating.models import User, Round0Rating, Round1Rating
+from .models import Application2017
+from .ratings import DEFAULT_POLICY, EMPTY_STATS, RatingStats, decide, fetch_rating_stats, recalculate_range
+from .simulation import decide_arrays
+from .testing import create_application
+
+
+class DecideTest(SimpleTestCase):
+    def test_new_application_needs_round0(self):
+        decision = decide(EMPTY_STATS, 'regular')
+        self.assertTrue(decision.need_rating0)
+        self.assertFalse(decision.need_rating1)
+        self.assertFalse(decision.need_rating2)
+
+    def test_nos_blacklist(self):
+        decision = decide(EMPTY_STATS._replace(r0_no=2), 'regular')
+        self.assertEqual(decision.status, 'blacklisted')
+        self.assertFalse(decision.need_rating0)
+
+    def test_third_opinion_for_distant_ratings(self):
+        stats = EMPTY_STATS._replace(r0_yes=1, r1_count=2, r1_sum=Decimal('12.0'), r1_spread=Decimal('4.0'))
+        decision = decide(stats, 'regular')
+        self.assertEqual(decision.rating1, Decimal('6.0'))
+        self.assertTrue(decision.need_rating1)
+
+    def test_low_rating_needs_single_review(self):
+        stats = EMPTY_STATS._replace(r0_yes=1, r1_count=1, r1_sum=Decimal('2.0'))
+        self.assertFalse(decide(stats, 'regular').need_rating1)
+
+
+class DecideArraysTest(SimpleTestCase):
+    def test_matches_decide(self):
+        rng = random.Random(2017)
+        statuses, rows = [], []
+        for _ in range(500):
+            r1 = [Decimal(rng.randint(0, 20)) / 2 for _ in range(rng.randint(0, 3))]
+            r2 = [Decimal(rng.randint(0, 20)) / 2 for _ in range(rng.randint(0, 2))]
+            statuses.append(rng.choice(['regular', 'blacklisted', 'whitelist2', 'whitelist3']))
+            rows.append(EMPTY_STATS._replace(
+                r0_yes=rng.randint(0, 2), r0_no=rng.randint(0, 2), r0_review=rng.randint(0, 1) * rng.randint(0, 1),
+                r1_count=len(r1), r1_sum=sum(r1, Decimal(0)), r1_spread=max(r1) - min(r1) if r1 else Decimal(0),
+                r2_count=len(r2), r2_sum=sum(r2, Decimal(0)),
+            ))
+        data = {name: [getattr(row, name) for row in rows] for name in RatingStats._fields}
+        data = {name: np.array(values, dtype=float if 'sum' in name or 'spread' in name else int) for name, values in data.items()}
+        data['status'] = np.array(statuses, dtype=object)
+
+        for policy in [DEFAULT_POLICY, DEFAULT_POLICY._replace(yeses_needed=2, needed_rating_to_round2=6)]:
+            outcome = decide_arrays(data, policy)
+            for i, (row, status) in enumerate(zip(rows, statuses)):
+                decision = decide(row, status, policy)
+                self.assertEqual(outcome['blacklisted'][i], decision.status == 'blacklisted')
+                self.assertAlmostEqual(outcome['rating1'][i], float(decision.rating1))
+                for name in ['need_rating0', 'need_rating1', 'need_rating2']:
+                    self.assertEqual(outcome[name][i], getattr(decision, name), (name, row, status))
+
+
+class RecalculateRatingsTest(TestCase):
+    def setUp(self):
+        self.application = create_application()
+        self.reviewers = [User.objects.create(email='{}@example.com'.format(i)) for i in range(2)]
+        Round0Rating.objects.create(created_by=self.reviewers[0], application=self.application, decision='yes')
+
+    def test_stats(self):
+        Round1Rating.objects.create(created_by=self.reviewers[0], application=self.application, rating=Decimal('9.0'))
+        Round1Rating.objects.create(created_by=self.reviewers[1], application=self.application, rating=Decimal('5.5'))
+        stats = fetch_rating_stats([self.application.pk])[self.application.pk]
+        self.assertEqual(stats, RatingStats(1, 0, 0, 2, Decimal('14.5'), Decimal('111.25'), Decimal('3.5'), 0, Decimal(0), Decimal(0)))
+        self.application.refresh_from_db()
+        self.assertAlmostEqual(self.application.rating1, 7.25)
+        self.assertTrue(self.application.need_rating1)  # third opinion
+
+    def test_recalculation_uses_running_totals(self):
+        with self.assertNumQueries(0):
+            self.application.recalculate_ratings()
+
+    def test_running_totals_follow_ratings(self):
+        first = Round1Rating.objects.create(created_by=self.reviewers[0], application=self.application, rating=Decimal('9.0'))
+        Round1Rating.objects.create(created_by=self.reviewers[1], application=self.application, rating=Decimal('5.5'))
+        first = Round1Rating.objects.get(pk=first.pk)
+        first.rating = Decimal('6.0')
+        first.save()
+        Round0Rating.objects.filter(created_by=self.reviewers[0]).delete()
+
+        self.application.refresh_from_db()
+        stats = fetch_rating_stats([self.application.pk])[self.application.pk]
+        self.assertEqual(self.application.get_rating_stats(), stats)
+        self.assertEqual(stats.r1_sum, Decimal('11.5'))
+        self.assertEqual(stats.r0_yes, 0)
+
+    def test_rating_save_does_not_read_ratings(self):
+        # the locked read and the UPDATE of the application, the INSERT of the rating, the release of its queue slot
+        with self.assertNumQueries(4):
+            rating = Round1Rating.objects.create(created_by=self.reviewers[1], application=self.application, rating=Decimal('8.0'))
+        self.assertEqual((rating.application.r1_count, rating.application.rating1), (1, Decimal('8.0')))
+        self.application.refresh_from_db()
+        self.assertEqual((self.application.r1_count, self.application.rating1), (1, 8.0))
+
+        rating.comments = 'Edited'
+        with self.assertNumQueries(3):  # the rating, its queue slot and its flags -- the totals do not change
+            rating.save()
+
+    def test_bulk_recalculation_writes_changed_applications(self):
+        Round1Rating.objects.create(created_by=self.reviewers[0], application=self.application, rating=Decimal('9.0'))
+        Application2017.objects.filter(pk=self.application.pk).update(rating1=0, need_rating0=True, r1_count=0, r1_sum=0)
+
+        self.assertEqual(recalculate_range((self.application.pk, None)), (1, 1))
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.rating1, 9.0)
+        self.assertFalse(self.application.need_rating0)
+        self.assertEqual(self.application.get_rating_stats(), fetch_rating_stats([self.application.pk])[self.application.pk])
+
+        self.assertEqual(recalculate_range((self.application.pk, None)), (1, 0))
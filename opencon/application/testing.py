@@ -0,0 +1,38 @@
+"""
+Helpers for creating test data (used by the test_*.py modules).
+"""
+import uuid
+
+from .models import Airport, Application2017
+
+
+def create_application(**kwargs):
+    """Creates a submitted application with all the required fields filled in"""
+    airport, _ = Airport.objects.get_or_create(iata_code='---', defaults={'name': 'Other airport'})
+    data = {
+        'email': '{}@example.com'.format(uuid.uuid4().hex),
+        'type': 'invite_scholarship',
+        'first_name': 'Jane',
+        'last_name': 'Doe',
+        'affiliation_1': 'University of Example',
+        'bio': 'Lorem ipsum dolor sit amet.',
+        'essay_interest': 'Lorem ipsum dolor sit amet.',
+        'essay_ideas': 'Lorem ipsum dolor sit amet.',
+        'events': ['oa_week'],
+        'area_of_interest': 'open_access',
+        'citizenship': 'SK',
+        'residence': 'SK',
+        'profession': ['researcher'],
+        'experience': '1to5',
+        'degrees': ['masters'],
+        'field': 'un0322',
+        'gender': ['female', ''],
+        'age': '26to33',
+        'ethnicity': [['european'], ''],
+        'airport': airport,
+        'acknowledgments': ['1', '2', '3', '4'],
+    }
+    data.update(kwargs)
+    application = Application2017(**data)
+    application.save()
+    return application
@@ -44,6 +44,7 @@ urlpatterns = [
     url(r'^export/round0ratings/$', login_required(views.Round0RatingExportView.as_view()), name='export_round0ratings'),
     url(r'^export/round1ratings/$', login_required(views.Round1RatingExportView.as_view()), name='export_round1ratings'),
     url(r'^export/round2ratings/$', login_required(views.Round2RatingExportView.as_view()), name='export_round2ratings'),
+    url(r'^export/applications-with-ratings/$', login_required(views.ApplicationsWithRatingsExportView.as_view()), name='export_apps_with_ratings'),
 
     # for secret link download URLs: no login_required
     url(r'^export/' + authsecret + '/applications/$', views.Application2017ExportView.as_view(), name='export_apps_2017_secretlink'),
@@ -52,4 +53,5 @@ urlpatterns = [
     url(r'^export/' + authsecret + '/round0ratings/$', views.Round0RatingExportView.as_view(), name='export_round0ratings_secretlink'),
     url(r'^export/' + authsecret + '/round1ratings/$', views.Round1RatingExportView.as_view(), name='export_round1ratings_secretlink'),
     url(r'^export/' + authsecret + '/round2ratings/$', views.Round2RatingExportView.as_view(), name='export_round2ratings_secretlink'),
+    url(r'^export/' + authsecret + '/applications-with-ratings/$', views.ApplicationsWithRatingsExportView.as_view(), name='export_apps_with_ratings_secretlink'),
 ]
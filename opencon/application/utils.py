@@ -1,3 +1,7 @@
+import ast
+import json
+
+
 def parse_raw_choices(str):
     """
     Parses choices from a raw text string, so it's possible to do things like this:
@@ -48,3 +52,27 @@ def get_longest_key(tuple_of_tuples):
     blah=CharField(max_length=get_longest_key(BLAH_CHOICES))
     """
     return max(len(i) for i in dict(tuple_of_tuples).values())
+
+
+def decode_literal(value):
+    """
+    Decodes a list (or dict) stored as text. It is stored as JSON, earlier
+    versions stored the Python repr (e.g. "['oa_week']" or "('female', '')"),
+    which is still understood -- JSON is tried first, it is much faster than
+    `ast.literal_eval`. Tuples are returned as lists. Raises ValueError.
+
+    USAGE:
+    decode_literal('["oa_week"]')  # ['oa_week']
+    decode_literal("(['european'], '')")  # [['european'], '']
+    """
+    if not isinstance(value, str):
+        return list(value) if isinstance(value, tuple) else value
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError) as e:
+        raise ValueError('Cannot decode {!r}: {}'.format(value, e))
+    return list(value) if isinstance(value, tuple) else value
@@ -2,9 +2,10 @@ from django.core import validators
 from django.core.exceptions import ValidationError
 from django.utils.translation import ungettext_lazy
 
-import ast
 import string
 
+from .utils import decode_literal
+
 
 class MaxChoicesValidator(validators.BaseValidator):
     message = ungettext_lazy(
@@ -18,7 +19,7 @@ class MaxChoicesValidator(validators.BaseValidator):
         return a > b
 
     def clean(self, x):
-        lst = ast.literal_eval(x)
+        lst = decode_literal(x)
         return len(lst)
 
 
@@ -34,7 +35,7 @@ class MinChoicesValidator(validators.BaseValidator):
         return a < b
 
     def clean(self, x):
-        lst = ast.literal_eval(x)
+        lst = decode_literal(x)
         return len(lst)
 
 
@@ -49,12 +50,12 @@ class EverythingCheckedValidator(validators.BaseValidator):
         return a != b
 
     def clean(self, x):
-        lst = ast.literal_eval(x)
+        lst = decode_literal(x)
         return len(lst)
 
 
 def none_validator(x):
-    x = ast.literal_eval(x)
+    x = decode_literal(x)
     if 'none' in x and len(x) > 1:
         raise ValidationError('You cannot choose both "None" and another option.')
 
@@ -97,6 +98,6 @@ def orcid_validator(value):
 
 # 2017-06-24`00:20:27 -- custom expenses validator
 def expenses_validator(x):
-    x = ast.literal_eval(x)
+    x = decode_literal(x)
     if 'fee_full' in x and 'fee_discount' in x:
         raise ValidationError('Full conference fee and 50% discount on conference registration fee cannot both be checked.')
@@ -5,20 +5,19 @@ from datetime import datetime
 
 from dal import autocomplete
 from django.conf import settings
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest
 from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.urlresolvers import reverse_lazy, reverse
-from django.http import HttpResponse
 from django.views import View
 from django.views.generic import FormView, TemplateView
 from django.utils import timezone
 
 from .forms import Application2017Form
 from .helpers import is_valid_email_address
-from .models import Airport, Draft, Application2017, Reference
+from .models import Draft, Application2017, Reference
 from .resources import Application2017Resource, DraftResource, UserResource, Round0RatingResource, Round1RatingResource, Round2RatingResource
-from . import constants
+from . import airport_index, autocomplete_cache, constants, exports, snapshots
 
 
 # todo: find better solution for prefilling fields!
@@ -361,12 +360,15 @@ def send_email(request, email):
     return render(request, template_name, {})
 
 
-class AirportAutocomplete(autocomplete.Select2QuerySetView):
+class AirportAutocomplete(autocomplete_cache.CachedAutocompleteMixin, autocomplete.Select2QuerySetView):
+    cache_name = 'airports'
+
+    def cache_version(self):
+        return airport_index.current_version()
+
     def get_queryset(self):
-        qs = Airport.objects.all()
-        if self.q:
-            qs = qs.filter(Q(name__icontains=self.q) | Q(iata_code__istartswith=self.q))
-        return qs
+        # a list of AirportEntries from the in-memory index -- no database queries
+        return airport_index.get_index().search(self.q)
 
 
 class InstitutionAutocomplete(autocomplete.Select2QuerySetView):
@@ -413,50 +415,67 @@ class ThankYou(TemplateView):
         # return super().get(request, *args, **kwargs)
 
 
-class Application2017ExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = Application2017Resource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_applications_2017.csv'
-        return response
-
-class DraftExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = DraftResource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_drafts.csv'
-        return response
-
-class UserExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = UserResource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_users.csv'
-        return response
-
-class Round0RatingExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = Round0RatingResource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_round0ratings.csv'
-        return response
-
-class Round1RatingExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = Round1RatingResource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_round1ratings.csv'
-        return response
-
-class Round2RatingExportView(View):
-
-    def get(self, request, *args, **kwargs ):
-        dataset = Round2RatingResource().export()
-        response = HttpResponse(dataset.csv, content_type='csv')
-        response['Content-Disposition'] = 'attachment; filename=opencon_round2ratings.csv'
-        return response
+class ExportView(View):
+    """
+    Serves the latest snapshot of the export (see snapshots.py). The export of
+    `resource_class` is streamed from the database (see exports.py) with
+    `?live=1`, with `?since=` (only the rows changed since then) or when there
+    is no snapshot yet.
+    """
+    resource_class = None
+    filename = None
+    snapshot = None
+
+    def get(self, request, *args, **kwargs):
+        since = request.GET.get('since')
+        if since:
+            try:
+                since = exports.parse_watermark(since)
+            except ValueError as e:
+                return HttpResponseBadRequest(str(e))
+        elif not request.GET.get('live'):
+            snapshot = snapshots.get_snapshot(self.snapshot)
+            if snapshot is not None:
+                return snapshots.snapshot_response(request, snapshot, self.filename)
+        return self.live_response(since or None)
+
+    def live_response(self, since):
+        return exports.csv_response(self.resource_class(), self.filename, since=since)
+
+class Application2017ExportView(ExportView):
+    resource_class = Application2017Resource
+    filename = 'opencon_applications_2017.csv'
+    snapshot = 'applications'
+
+class DraftExportView(ExportView):
+    resource_class = DraftResource
+    filename = 'opencon_drafts.csv'
+    snapshot = 'drafts'
+
+class UserExportView(ExportView):
+    resource_class = UserResource
+    filename = 'opencon_users.csv'
+    snapshot = 'users'
+
+class Round0RatingExportView(ExportView):
+    resource_class = Round0RatingResource
+    filename = 'opencon_round0ratings.csv'
+    snapshot = 'round0ratings'
+
+class Round1RatingExportView(ExportView):
+    resource_class = Round1RatingResource
+    filename = 'opencon_round1ratings.csv'
+    snapshot = 'round1ratings'
+
+class Round2RatingExportView(ExportView):
+    resource_class = Round2RatingResource
+    filename = 'opencon_round2ratings.csv'
+    snapshot = 'round2ratings'
+
+class ApplicationsWithRatingsExportView(ExportView):
+    """One row per application, with the ratings of each reviewer in columns (see exports.iter_wide_csv)"""
+    filename = 'opencon_applications_2017_with_ratings.csv'
+    snapshot = 'applications-with-ratings'
+
+    def live_response(self, since):
+        return exports.wide_csv_response(self.filename, since=since)
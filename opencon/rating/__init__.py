@@ -0,0 +1 @@
+default_app_config = 'opencon.rating.apps.RatingConfig'
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RatingConfig(AppConfig):
+    name = 'opencon.rating'
+    label = 'rating'
+
+    def ready(self):
+        from . import signals  # noqa -- connects the signal handlers
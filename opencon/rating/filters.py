@@ -1,30 +1,60 @@
 from django import forms
-from opencon.application.models import Application2017
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from opencon.application.models import CHOICE_LABELS
 
 import django_filters
 
+
+def facet_counts(queryset, name, cache_key):
+    """
+    [(value, number of applications)] of the field `name` in the queryset -- one
+    grouped query, cached for RATING_FILTER_CACHE_SECONDS
+    """
+    rows = cache.get(cache_key)
+    if rows is None:
+        rows = list(queryset.order_by().values_list(name).annotate(n=Count('id')).order_by(name))
+        cache.set(cache_key, rows, settings.RATING_FILTER_CACHE_SECONDS)
+    return rows
+
+
 class Round1NeedsReviewFilter(django_filters.FilterSet):
+    """
+    The choices of the facets are the values found among the filtered
+    applications (the ones still waiting for the reviewer's rating), labelled
+    with their counts, e.g. "Brazil (14)". They are computed when the filter is
+    created (not when the module is imported) and cached per reviewer.
+    """
+    FACETS = ('area_of_interest', 'field', 'citizenship')
 
     area_of_interest = django_filters.MultipleChoiceFilter(
         name='area_of_interest',
         label='Area of Interest',
-        # choices=Application2017.AREA_OF_INTEREST_CHOICES,
-        choices = [(i, dict(Application2017.AREA_OF_INTEREST_CHOICES).get(i)) for i in Application2017.objects.filter(need_rating1=True).values_list('area_of_interest', flat=True).order_by('area_of_interest').distinct()],
         widget=forms.CheckboxSelectMultiple,
     )
 
     field = django_filters.MultipleChoiceFilter(
         name='field',
         label='Field of Study',
-        # choices=Application2017.FIELD_CHOICES,
-        choices = [(i, dict(Application2017.FIELD_CHOICES).get(i)) for i in Application2017.objects.filter(need_rating1=True).values_list('field', flat=True).order_by('field').distinct()],
         widget=forms.CheckboxSelectMultiple,
     )
 
     citizenship = django_filters.MultipleChoiceFilter(
         name='citizenship',
         label='Citizenship of Applicant',
-        # choices=Application2017.COUNTRY_CHOICES,
-        choices = [(i, dict(Application2017.COUNTRY_CHOICES).get(i)) for i in Application2017.objects.filter(need_rating1=True).values_list('citizenship', flat=True).order_by('citizenship').distinct()],
         widget=forms.CheckboxSelectMultiple,
     )
+
+    def __init__(self, data=None, queryset=None, user=None, **kwargs):
+        super().__init__(data, queryset, **kwargs)
+        for name in self.FACETS:
+            cache_key = 'rating-facets:{}:{}'.format(name, user.pk if user else '')
+            counts = dict(facet_counts(self.queryset, name, cache_key))
+            selected = self.data.getlist(name) if hasattr(self.data, 'getlist') else []
+            for value in selected:  # keep the checked values (e.g. after the last such application was rated)
+                counts.setdefault(value, 0)
+            self.filters[name].extra['choices'] = [
+                (value, '{} ({})'.format(CHOICE_LABELS.label(name, value, value), count))
+                for value, count in sorted(counts.items(), key=lambda item: str(item[0]))
+            ]
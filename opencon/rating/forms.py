@@ -3,8 +3,6 @@ from django import forms
 from django.forms import widgets
 from .models import Round0Rating, Round1Rating, Round2Rating
 
-import ast
-
 
 class Round0RateForm(forms.ModelForm):
     class Meta:
@@ -16,15 +14,6 @@ class Round0RateForm(forms.ModelForm):
 
 
 class Round1RateForm(forms.ModelForm):
-    def __init__(self, *args, **kwargs):
-        if kwargs.get('instance'):
-            kwargs['initial'] = {
-                'recommendations': ast.literal_eval(kwargs.get('instance').recommendations or '[]'),
-                'issues': ast.literal_eval(kwargs.get('instance').issues or '[]'),
-            }
-
-        super().__init__(*args, **kwargs)
-
     class Meta:
         model = Round1Rating
         fields = 'application rating recommendations issues comments note'.split()
@@ -41,15 +30,6 @@ class Round1RateForm(forms.ModelForm):
         return comments
 
 class Round2RateForm(forms.ModelForm):
-    def __init__(self, *args, **kwargs):
-        if kwargs.get('instance'):
-            kwargs['initial'] = {
-                'recommendations': ast.literal_eval(kwargs.get('instance').recommendations or '[]'),
-                'issues': ast.literal_eval(kwargs.get('instance').issues or '[]'),
-            }
-
-        super().__init__(*args, **kwargs)
-
     class Meta:
         model = Round2Rating
         fields = 'application rating decision recommendations issues comments note'.split()
@@ -0,0 +1,69 @@
+"""
+Reviewer leaderboards (see Round0Stats, Round1Stats and Round2Stats).
+
+A leaderboard is computed by one aggregate query -- the number of ratings, their
+sum and sum of squares per reviewer -- and the average and (population) standard
+deviation are derived from these. The result is cached for
+LEADERBOARD_CACHE_SECONDS and dropped from the cache whenever a rating of the
+round is saved or deleted (see signals.py), so the cost of showing a leaderboard
+does not grow with the number of ratings.
+"""
+import math
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from .models import User
+
+LeaderboardRow = namedtuple('LeaderboardRow', 'name finished_count avg standard_deviation')
+
+# round: (reverse relation from User to the ratings, whether the ratings have a score, max. displayed reviewers)
+LEADERBOARDS = {
+    0: ('rated0', False, 'LEADERBOARD_ROUND0_MAX_DISPLAYED'),
+    1: ('rated', True, 'LEADERBOARD_ROUND1_MAX_DISPLAYED'),
+    2: ('rated2', True, 'LEADERBOARD_ROUND2_MAX_DISPLAYED'),
+}
+
+
+def cache_key(rating_round):
+    return 'rating:leaderboard:{}'.format(rating_round)
+
+
+def compute_leaderboard(rating_round):
+    """List of LeaderboardRows of the reviewers with the most ratings in the round"""
+    relation, scored, limit = LEADERBOARDS[rating_round]
+    aggregates = {'finished_count': Count(relation)}
+    if scored:
+        rating = '{}__rating'.format(relation)
+        aggregates['total'] = Sum(rating)
+        aggregates['squares'] = Sum(F(rating) * F(rating), output_field=DecimalField())
+
+    users = User.objects.values('pk', 'nick').annotate(**aggregates)
+    users = users.filter(finished_count__gte=1).order_by('-finished_count', 'pk')[:getattr(settings, limit)]
+
+    rows = []
+    for user in users:
+        count, avg, deviation = user['finished_count'], None, None
+        if scored:
+            avg = float(user['total']) / count
+            # population standard deviation: sqrt(E[x^2] - E[x]^2)
+            deviation = math.sqrt(max(float(user['squares']) / count - avg * avg, 0))
+        rows.append(LeaderboardRow(user['nick'], count, avg, deviation))
+    return rows
+
+
+def get_leaderboard(rating_round):
+    """The cached leaderboard of the round (computed on a cache miss)"""
+    rows = cache.get(cache_key(rating_round))
+    if rows is None:
+        rows = compute_leaderboard(rating_round)
+        cache.set(cache_key(rating_round), rows, settings.LEADERBOARD_CACHE_SECONDS)
+    return rows
+
+
+def invalidate(rating_round):
+    """Drops the cached leaderboard once the current transaction (e.g. the one saving a rating) commits"""
+    transaction.on_commit(lambda: cache.delete(cache_key(rating_round)))
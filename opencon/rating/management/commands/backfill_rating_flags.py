@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ...models import RatingFlag, Round1Rating, Round2Rating
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RatingFlag table (recommendations and issues checked in Round 1 / Round 2 ratings) from the ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in [Round1Rating, Round2Rating]:
+            with transaction.atomic():
+                RatingFlag.objects.filter(round=model.ROUND).delete()
+                count = 0
+                ratings = model.objects.only('application', *model.FLAG_FIELDS).order_by('pk')
+                flags = []
+                for rating in ratings.iterator():
+                    flags.extend(
+                        RatingFlag(round=model.ROUND, rating_id=rating.pk, application_id=rating.application_id, field=field, flag=flag)
+                        for field, flag in set(rating.get_flags())
+                    )
+                    if len(flags) >= options['chunk_size']:
+                        count += len(RatingFlag.objects.bulk_create(flags))
+                        flags = []
+                count += len(RatingFlag.objects.bulk_create(flags))
+            self.stdout.write('{}: {} flags.'.format(model.__name__, count))
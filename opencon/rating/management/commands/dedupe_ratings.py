@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from opencon.application.models import Application2017
+from opencon.application.ratings import repair_totals
+from ... import leaderboard
+from ...models import RatingFlag, Round0Rating, Round1Rating, Round2Rating
+
+ROUNDS = {Round0Rating: 0, Round1Rating: 1, Round2Rating: 2}
+
+
+def has_columns(model, names):
+    """Whether the table of the model exists and has the columns (this runs before all migrations are applied)"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return False
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+    return set(names) <= columns
+
+
+class Command(BaseCommand):
+    help = 'Delete duplicate ratings (more than one rating of an application by the same reviewer), keeping the latest one -- run before migrating to the unique (application, created_by) constraints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the duplicates')
+
+    def handle(self, *args, **options):
+        self.flags_migrated = has_columns(RatingFlag, ['rating_id'])
+        affected = set()
+        for model in [Round0Rating, Round1Rating, Round2Rating]:
+            duplicates = (model.objects.values('application', 'created_by')
+                          .annotate(n=Count('id'), latest=Max('id')).filter(n__gt=1).order_by())
+            deleted = 0
+            for duplicate in duplicates:
+                deleted += duplicate['n'] - 1
+                affected.add(duplicate['application'])
+                if not options['dry_run']:
+                    self.delete_duplicates(model, duplicate)
+            if deleted and not options['dry_run']:
+                leaderboard.invalidate(ROUNDS[model])
+            self.stdout.write('{}: {} duplicate ratings {}.'.format(
+                model.__name__, deleted, 'found' if options['dry_run'] else 'deleted'))
+
+        if options['dry_run'] or not affected:
+            return
+        if has_columns(Application2017, [Application2017._meta.get_field(name).column for name in Application2017.SUMMARY_FIELDS]):
+            repair_totals(sorted(affected))
+            self.stdout.write('Recalculated {} applications.'.format(len(affected)))
+        else:
+            self.stdout.write('The running totals are not migrated yet: fill them with verify_rating_summaries --repair after migrating.')
+
+    def delete_duplicates(self, model, duplicate):
+        """
+        Deletes the ratings with one DELETE, without the signals: they would
+        subtract the ratings from the running totals of the application, which
+        may not be migrated yet -- the totals are recalculated afterwards instead
+        """
+        with transaction.atomic():
+            pks = list(model.objects.filter(
+                application=duplicate['application'], created_by=duplicate['created_by'],
+            ).exclude(pk=duplicate['latest']).values_list('pk', flat=True))
+            if hasattr(model, 'FLAG_FIELDS') and self.flags_migrated:
+                RatingFlag.objects.filter(round=model.ROUND, rating_id__in=pks).delete()
+            ratings = model.objects.filter(pk__in=pks)
+            ratings._raw_delete(ratings.db)
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ...models import User
+
+
+class Command(BaseCommand):
+    help = 'Send the invite mail to every reviewer who has not been invited yet (disabled reviewers are skipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the reviewers who would be invited')
+        parser.add_argument('--batch-size', type=int, default=100, help='Mail sent (and reviewers marked as invited) at a time')
+        parser.add_argument('--per-minute', type=int, default=0, help='Send at most this many mail per minute (no limit by default)')
+
+    def handle(self, *args, **options):
+        if not settings.REVIEWER_MAIL_ENABLED and not options['dry_run']:
+            raise CommandError('Reviewer mail is disabled (REVIEWER_MAIL_ENABLED)')
+        batch_size = options['batch_size']
+        if options['per_minute']:
+            batch_size = min(batch_size, options['per_minute'])
+
+        users = list(User.objects.filter(invitation_sent=False, disabled_at__isnull=True).order_by('pk'))
+        messages = []
+        for user in users:
+            subject, message = user.invite_message()
+            messages.append(EmailMessage(subject, message, settings.FROM_MAIL, [user.email]))
+
+        if options['dry_run']:
+            for user in users:
+                self.stdout.write('{} <{}>'.format(user.nick, user.email))
+            self.stdout.write('Would invite {} reviewers.'.format(len(users)))
+            return
+
+        invited = 0
+        connection = get_connection()
+        with connection:  # one SMTP connection for all of the mail
+            for start in range(0, len(messages), batch_size):
+                started = time.monotonic()
+                try:
+                    connection.send_messages(messages[start:start + batch_size])
+                except Exception as error:
+                    raise CommandError('Invited {} reviewers, then sending failed: {}'.format(invited, error))
+                batch = users[start:start + batch_size]
+                User.objects.filter(pk__in=[user.pk for user in batch]).update(invitation_sent=True, updated_at=timezone.now())
+                invited += len(batch)
+
+                if options['per_minute'] and start + batch_size < len(messages):
+                    time.sleep(max(0, 60.0 * len(batch) / options['per_minute'] - (time.monotonic() - started)))
+        self.stdout.write('Invited {} reviewers.'.format(invited))
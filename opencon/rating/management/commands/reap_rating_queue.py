@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from ... import queue
+
+
+class Command(BaseCommand):
+    help = 'Return expired / abandoned rating leases to the queue and re-sync the queue with the applications (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        stats = queue.reap()
+        self.stdout.write(
+            'Released {expired} expired and {abandoned} abandoned leases, '
+            'queued {added} and removed {removed} slots.'.format(**stats)
+        )
@@ -1,17 +1,20 @@
 import math
+import random
 import uuid
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.core.urlresolvers import reverse
 from django.core.validators import MinLengthValidator
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.template.loader import render_to_string
 from .validators import rating_validator
 
 from decimal import Decimal
 
+from opencon.application.fields import ChoiceListField
+from opencon.application.models import Application2017, OutgoingEmail
+from opencon.application.ratings import RatingDecision
 from opencon.application.utils import parse_raw_choices
 
 RATING_METADATA_1_CHOICES = [
@@ -32,7 +35,7 @@ RATING_METADATA_2_CHOICES = [
 class TimestampMixin(models.Model):
     """ Mixin for saving the creation time and the time of the last update """
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # incremental exports (see application/exports.py)
 
     class Meta:
         abstract = True
@@ -57,18 +60,13 @@ class User(TimestampMixin, models.Model):
 
     disabled_at = models.DateTimeField(blank=True, null=True)
 
-    def invite(self):
-        """
-        Send invite mail to application email address.
-        """
-        if not settings.REVIEWER_MAIL_ENABLED:
-            return
-
+    def invite_message(self):
+        """(subject, message) of the invite mail"""
         context = {
             "user": self,
             "link": "{}{}".format(
                 settings.BASE_URL,
-                reverse("rating:rate", args=[self.uuid])
+                reverse("rating:login", args=[self.uuid.hex])
             )
         }
 
@@ -76,16 +74,21 @@ class User(TimestampMixin, models.Model):
             "rating/email/invite.subject", context
         ).strip()
         message = render_to_string("rating/email/invite.message", context)
+        return subject, message
 
-        send_mail(
-            subject,
-            message,
-            settings.FROM_MAIL,
-            [self.email],
-            fail_silently=False
-        )
-        self.invitation_sent = True
-        self.save()
+    def invite(self):
+        """
+        Queue the invite mail to the reviewer's email address (see application/mail.py).
+        To invite all of the reviewers, use `python manage.py invite_reviewers`.
+        """
+        if not settings.REVIEWER_MAIL_ENABLED:
+            return
+
+        subject, message = self.invite_message()
+        with transaction.atomic():
+            OutgoingEmail.objects.queue(subject, message, [self.email], from_email=settings.FROM_MAIL)
+            self.invitation_sent = True
+            self.save()
 
     def __str__(self):
         return self.nick
@@ -131,7 +134,111 @@ STATE_CHOICES = (
 )
 
 
-class Round0Rating(TimestampMixin, models.Model):
+class ApplicationSummaryMixin(models.Model):
+    """
+    Keeps the running totals on Application2017 (see Application2017.SUMMARY_FIELDS)
+    in sync: the contribution of a rating is added when it is created and swapped
+    when it is edited. The application is recalculated in the same UPDATE as its
+    totals, after one locked read (see ApplicationManager.apply_summary_changes),
+    and its rating queue slots are synced if the rounds it needs changed.
+    Deleted ratings are subtracted in signals.py.
+
+    The rating models define `CONTRIBUTION_FIELDS` (the fields the contribution
+    depends on) and `get_contribution()`, which returns {summary field: value}
+    this rating adds to the running totals of its application.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_contribution = None
+        if {cls._meta.get_field(name).attname for name in cls.CONTRIBUTION_FIELDS} <= set(field_names):
+            instance._saved_contribution = (instance.application_id, instance.get_contribution())
+        return instance
+
+    def get_saved_contribution(self):
+        if self.pk is None:
+            return None
+        if getattr(self, '_saved_contribution', None) is None:  # deferred fields -- load what is in the database
+            saved = type(self)._default_manager.only(*self.CONTRIBUTION_FIELDS).filter(pk=self.pk).first()
+            self._saved_contribution = saved._saved_contribution if saved else None
+        return self._saved_contribution
+
+    def update_application_summary(self, previous, current):
+        from . import queue  # the queue module imports the models
+
+        changes = {}  # {application id: {summary field: difference}}
+        for contribution, sign in ((previous, -1), (current, 1)):
+            if contribution is not None:
+                application_id, values = contribution
+                totals = changes.setdefault(application_id, {})
+                for field, value in values.items():
+                    totals[field] = totals.get(field, 0) + sign * value
+
+        for application_id, totals in sorted(changes.items()):  # locked in the order of their ids
+            if not any(totals.values()):
+                continue  # e.g. only the comments were edited
+            application = Application2017.objects.apply_summary_changes(application_id, totals)
+            if application is None:
+                continue
+            queue.sync_application(application)
+            cache_name = self._meta.get_field('application').get_cache_name()
+            if application_id == self.application_id and hasattr(self, cache_name):  # the application the caller holds
+                for field in Application2017.SUMMARY_FIELDS + list(RatingDecision._fields):
+                    setattr(self.application, field, getattr(application, field))
+                self.application._saved_eligible_rounds = application._saved_eligible_rounds
+
+    def save(self, *args, **kwargs):
+        # no savepoint: an error here fails the surrounding transaction (the request) anyway
+        with transaction.atomic(savepoint=False):
+            previous = self.get_saved_contribution()
+            current = (self.application_id, self.get_contribution())
+            # the application is locked before the rating is written: the rating's foreign key
+            # takes a share lock on it, and two such locks could not both be upgraded (a deadlock)
+            self.update_application_summary(previous, current)
+            obj = super().save(*args, **kwargs)
+            self._saved_contribution = current
+        return obj
+
+
+class RatingFlagsMixin(models.Model):
+    """
+    Copies the checked recommendations and issues (FLAG_FIELDS) of a rating to
+    RatingFlag, one row per flag, whenever the rating is saved, so they can be
+    queried without decoding the ratings. The flags of deleted ratings are
+    removed in signals.py.
+    """
+    FLAG_FIELDS = ('recommendations', 'issues')
+
+    class Meta:
+        abstract = True
+
+    def get_flags(self):
+        """[(field, flag)] checked in this rating"""
+        return [(field, flag) for field in self.FLAG_FIELDS for flag in getattr(self, field) or [] if flag]
+
+    def sync_flags(self, created=False):
+        if not created:  # a new rating has no flags yet
+            RatingFlag.objects.filter(round=self.ROUND, rating_id=self.pk).delete()
+        RatingFlag.objects.bulk_create(
+            RatingFlag(round=self.ROUND, rating_id=self.pk, application_id=self.application_id, field=field, flag=flag)
+            for field, flag in set(self.get_flags())
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        created = self._state.adding
+        with transaction.atomic(savepoint=False):  # see ApplicationSummaryMixin.save
+            obj = super().save(*args, **kwargs)
+            if update_fields is None or set(update_fields) & ({'application', 'application_id'} | set(self.FLAG_FIELDS)):
+                self.sync_flags(created)
+        return obj
+
+
+class Round0Rating(ApplicationSummaryMixin, TimestampMixin, models.Model):
     """
     Application rating.
     """
@@ -161,16 +268,21 @@ class Round0Rating(TimestampMixin, models.Model):
         max_length=10,
     )
 
-    def save(self, *args, **kwargs):
-        obj = super().save(*args, **kwargs)
-        self.application.save()  # when save is envoked ratings are recalculated
-        return obj
+    class Meta:
+        unique_together = (('application', 'created_by'), )  # one rating per reviewer, later edits update it
+
+    CONTRIBUTION_FIELDS = ('application', 'decision')
 
+    def get_contribution(self):
+        return {'r0_{}_count'.format(self.decision): 1}
 
-class Round1Rating(TimestampMixin, models.Model):
+
+class Round1Rating(RatingFlagsMixin, ApplicationSummaryMixin, TimestampMixin, models.Model):
     """
     Application rating.
     """
+    ROUND = 1
+
     created_by = models.ForeignKey(
         User,
         related_name="rated"
@@ -200,7 +312,7 @@ class Round1Rating(TimestampMixin, models.Model):
         I nominate this applicant for a certificate of recognition [certificate]
         """
     )
-    recommendations = models.TextField(
+    recommendations = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Recommendations',
         help_text='',
@@ -215,7 +327,7 @@ class Round1Rating(TimestampMixin, models.Model):
         I personally know this applicant [personal_relationship]
         """
     )
-    issues = models.TextField(
+    issues = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Special Situations',
         help_text='',
@@ -239,16 +351,22 @@ class Round1Rating(TimestampMixin, models.Model):
         # validators=[MinLengthValidator(3)],
     )
 
-    def save(self, *args, **kwargs):
-        obj = super().save(*args, **kwargs)
-        self.application.save()  # when save is envoked ratings are recalculated
-        return obj
+    class Meta:
+        unique_together = (('application', 'created_by'), )
 
+    CONTRIBUTION_FIELDS = ('application', 'rating')
 
-class Round2Rating(TimestampMixin, models.Model):
+    def get_contribution(self):
+        rating = Decimal(self.rating)
+        return {'r1_count': 1, 'r1_sum': rating, 'r1_sum_squares': rating * rating}
+
+
+class Round2Rating(RatingFlagsMixin, ApplicationSummaryMixin, TimestampMixin, models.Model):
     """
     Application rating.
     """
+    ROUND = 2
+
     created_by = models.ForeignKey(
         User,
         related_name="rated2"
@@ -290,7 +408,7 @@ class Round2Rating(TimestampMixin, models.Model):
         This applicant is a potential speaker for OpenCon 2017 [speaker]
         """
     )
-    recommendations = models.TextField(
+    recommendations = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Other Recommendations',
         help_text='',
@@ -305,7 +423,7 @@ class Round2Rating(TimestampMixin, models.Model):
         I personally know this applicant [personal_relationship]
         """
     )
-    issues = models.TextField(
+    issues = ChoiceListField(
         # Widget: Checkboxes -- choices are defined in forms.py
         verbose_name='Special Situations',
         help_text='',
@@ -330,7 +448,89 @@ class Round2Rating(TimestampMixin, models.Model):
         max_length=600,
     )
 
-    def save(self, *args, **kwargs):
-        obj = super().save(*args, **kwargs)
-        self.application.save()  # when save is envoked ratings are recalculated
-        return obj
+    class Meta:
+        unique_together = (('application', 'created_by'), )
+
+    CONTRIBUTION_FIELDS = ('application', 'rating')
+
+    def get_contribution(self):
+        rating = Decimal(self.rating)
+        return {'r2_count': 1, 'r2_sum': rating, 'r2_sum_squares': rating * rating}
+
+
+class RatingQueueSlot(models.Model):
+    """
+    One slot in the rating queue of a round (see queue.py). Every application
+    which needs a rating in the round has exactly one slot. Slots are shuffled
+    once when they are created (`position`), a reviewer claims a slot for
+    RATING_LEASE_MINUTES (`claimed_by`, `lease_expires_at`).
+    """
+    ROUND_CHOICES = (
+        (0, 'Round 0'),
+        (1, 'Round 1'),
+        (2, 'Round 2'),
+    )
+    round = models.PositiveSmallIntegerField(choices=ROUND_CHOICES)
+    application = models.ForeignKey(
+        "application.Application2017",
+        related_name="queue_slots"
+    )
+    position = models.FloatField(default=random.random)
+    claimed_by = models.ForeignKey(
+        User,
+        related_name="claimed_slots",
+        blank=True, null=True,
+    )
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = (('round', 'application'), )
+        index_together = (('round', 'position'), )
+
+    def __str__(self):
+        return 'R{} slot for application {}'.format(self.round, self.application_id)
+
+
+class RatingFlagQuerySet(models.QuerySet):
+    def applications(self, flag, min_count=1):
+        """IDs of the applications with at least `min_count` ratings flagged with `flag`"""
+        return (self.filter(flag=flag).values('application_id')
+                .annotate(n=models.Count('id')).filter(n__gte=min_count).values_list('application_id', flat=True))
+
+    def ratings(self, flag):
+        """IDs of the ratings flagged with `flag` (use together with `round`, e.g. `.filter(round=1)`)"""
+        return self.filter(flag=flag).values_list('rating_id', flat=True)
+
+    def counts(self):
+        """{(round, flag): number of ratings}"""
+        rows = self.values_list('round', 'flag').annotate(n=models.Count('id')).order_by()
+        return {(round, flag): n for round, flag, n in rows}
+
+
+class RatingFlag(models.Model):
+    """
+    One recommendation or issue checked in a Round 1 / Round 2 rating
+    (see RatingFlagsMixin), e.g. applications with a certificate nomination:
+    `Application2017.objects.filter(pk__in=RatingFlag.objects.applications('certificate'))`.
+    Fill the table for existing ratings with `python manage.py backfill_rating_flags`.
+    """
+    ROUND_CHOICES = (
+        (1, 'Round 1'),
+        (2, 'Round 2'),
+    )
+    round = models.PositiveSmallIntegerField(choices=ROUND_CHOICES)
+    rating_id = models.IntegerField()  # Round1Rating or Round2Rating, depending on `round`
+    application = models.ForeignKey(
+        "application.Application2017",
+        related_name="rating_flags"
+    )
+    field = models.CharField(max_length=20)  # recommendations / issues
+    flag = models.CharField(max_length=30)
+
+    objects = RatingFlagQuerySet.as_manager()
+
+    class Meta:
+        index_together = (('flag', 'application'), ('round', 'rating_id'), )
+
+    def __str__(self):
+        return 'R{} rating {}: {}'.format(self.round, self.rating_id, self.flag)
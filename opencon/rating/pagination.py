@@ -0,0 +1,75 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+
+KeysetPage = namedtuple('KeysetPage', 'object_list next_url previous_url')
+
+
+class KeysetPaginationMixin(object):
+    """
+    Keyset ("seek") pagination for list views: instead of an OFFSET, the next
+    page starts after the last row of the current one (`?after=<pk>`) and the
+    previous page ends before its first row (`?before=<pk>`). Rows are ordered
+    by `keyset` (which has to end with 'pk' to be unique), so every page is one
+    index range scan, no matter how far the reviewer browsed.
+
+    Adds `keyset_page` to the context (see rating/keyset_pagination.html).
+    """
+    keyset = ('pk',)
+    page_size = None  # settings.RATING_LIST_PAGE_SIZE by default
+
+    def get_page_size(self):
+        return self.page_size or settings.RATING_LIST_PAGE_SIZE
+
+    def get_cursor(self, queryset, name):
+        """Values of the keyset fields of the row given by the `name` GET parameter (or None)"""
+        try:
+            pk = int(self.request.GET.get(name, ''))
+        except ValueError:
+            return None
+        if self.keyset == ('pk',):
+            return {'pk': pk}
+        return queryset.model._base_manager.filter(pk=pk).values(*self.keyset).first()
+
+    def seek(self, cursor, lookup):
+        """Rows strictly after (lookup='gt') or before (lookup='lt') the cursor in keyset order"""
+        condition = Q()
+        for i, field in enumerate(self.keyset):
+            equal = {name: cursor[name] for name in self.keyset[:i]}
+            condition |= Q(**equal) & Q(**{'{}__{}'.format(field, lookup): cursor[field]})
+        return condition
+
+    def get_keyset_page(self, queryset):
+        page_size = self.get_page_size()
+        after, before = self.get_cursor(queryset, 'after'), self.get_cursor(queryset, 'before')
+
+        if before is not None:
+            rows = list(queryset.filter(self.seek(before, 'lt')).order_by(*['-' + field for field in self.keyset])[:page_size + 1])
+            has_previous, has_next = len(rows) > page_size, True
+            rows = rows[:page_size][::-1]
+        else:
+            if after is not None:
+                queryset = queryset.filter(self.seek(after, 'gt'))
+            rows = list(queryset.order_by(*self.keyset)[:page_size + 1])
+            has_previous, has_next = after is not None, len(rows) > page_size
+            rows = rows[:page_size]
+
+        return KeysetPage(
+            rows,
+            self.page_url('after', rows[-1].pk) if rows and has_next else None,
+            self.page_url('before', rows[0].pk) if rows and has_previous else None,
+        )
+
+    def page_url(self, name, pk):
+        query = self.request.GET.copy()
+        query.pop('after', None)
+        query.pop('before', None)
+        query[name] = pk
+        return '?' + query.urlencode()
+
+    def get_context_data(self, **kwargs):
+        page = self.get_keyset_page(kwargs.pop('object_list', self.object_list))
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context.update({'keyset_page': page})
+        return context
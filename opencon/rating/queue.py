@@ -0,0 +1,160 @@
+"""
+Rating queue -- assigns applications to reviewers.
+
+Every application which needs a rating in a round has one RatingQueueSlot in
+that round. Slots get a random position when they are created, so picking the
+next application is an index scan on (round, position) instead of sorting all
+unrated applications with `order_by('?')` on every page view.
+
+Claiming a slot is a lease: for RATING_LEASE_MINUTES no other reviewer is given
+the same application. Rows are locked with `SELECT ... FOR UPDATE SKIP LOCKED`
+on PostgreSQL, so two reviewers loading the rating page at the same time never
+wait for (or get) the same slot. Leases which expired or belong to disabled
+reviewers are returned to the queue by `python manage.py reap_rating_queue`.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from opencon.application.db import skip_locked_pks
+from opencon.application.models import Application2017
+
+from .models import RatingQueueSlot
+
+ROUNDS = (0, 1, 2)
+
+# reverse relation from the slot to the ratings of its application, per round
+RATED_BY = {
+    0: 'application__ratings0__created_by',
+    1: 'application__ratings__created_by',
+    2: 'application__ratings2__created_by',
+}
+
+CLAIM_ATTEMPTS = 5  # only relevant without SKIP LOCKED (SQLite), see claim()
+
+
+def lease_duration():
+    return datetime.timedelta(minutes=settings.RATING_LEASE_MINUTES)
+
+
+def available_slots(user, rating_round, now=None):
+    """Slots of the round which are not leased and which the user has not rated yet, in queue order"""
+    now = now or timezone.now()
+    return RatingQueueSlot.objects.filter(
+        round=rating_round,
+    ).filter(
+        Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+    ).exclude(
+        **{RATED_BY[rating_round]: user}
+    ).order_by('position')
+
+
+def claim(user, rating_round):
+    """
+    Leases the next application of the round to the user and returns it (or None
+    if there is nothing left to rate). The previous lease of the user in this
+    round (e.g. a skipped application) is returned to the end of the queue.
+    """
+    release(user, rating_round, requeue=True)
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        with transaction.atomic():
+            pks = skip_locked_pks(available_slots(user, rating_round, now))
+            if not pks:
+                return None
+            # conditional UPDATE: on PostgreSQL the row is already locked, elsewhere this is compare-and-set
+            claimed = RatingQueueSlot.objects.filter(pk=pks[0]).filter(
+                Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+            ).update(claimed_by=user, lease_expires_at=now + lease_duration())
+        if not claimed:
+            continue  # somebody else was faster
+        slot = RatingQueueSlot.objects.select_related('application').get(pk=pks[0])
+        if slot.application.needs_rating(rating_round):
+            return slot.application
+        slot.delete()  # stale slot (the application was changed without being saved through the model)
+    return None
+
+
+def release(user, rating_round, requeue=False):
+    """Returns the lease(s) of the user to the queue -- at the end of it, if `requeue` is set"""
+    slots = RatingQueueSlot.objects.filter(round=rating_round, claimed_by=user)
+    changes = {'claimed_by': None, 'lease_expires_at': None}
+    if requeue:
+        changes['position'] = F('position') + 1
+    return slots.update(**changes)
+
+
+def finish(user, application_id, rating_round):
+    """Called once the user rated the application -- the slot stays in the queue if more ratings are needed"""
+    return RatingQueueSlot.objects.filter(
+        round=rating_round, application_id=application_id, claimed_by=user,
+    ).update(claimed_by=None, lease_expires_at=None)
+
+
+def sync_application(application, created=False):
+    """
+    Makes sure the application has a slot exactly in the rounds where it needs a
+    rating. Nothing is queried if those rounds are the ones of the application
+    as it was loaded (or last synced).
+    """
+    eligible = application.eligible_rounds()
+    if not created and eligible == getattr(application, '_saved_eligible_rounds', None):
+        return
+    application._saved_eligible_rounds = eligible
+
+    existing = set()
+    if not created:
+        slots = RatingQueueSlot.objects.filter(application=application)
+        slots.exclude(round__in=eligible).delete()
+        if eligible:
+            existing = set(slots.values_list('round', flat=True))
+    missing = [RatingQueueSlot(round=rating_round, application=application)
+               for rating_round in eligible if rating_round not in existing]
+    if missing:
+        create_slots(missing)
+
+
+def create_slots(slots):
+    """Bulk-creates slots, skipping the ones created by a concurrent request in the meanwhile"""
+    try:
+        with transaction.atomic():
+            RatingQueueSlot.objects.bulk_create(slots, batch_size=500)
+    except IntegrityError:
+        for slot in slots:
+            try:
+                with transaction.atomic():
+                    slot.save()
+            except IntegrityError:
+                pass
+
+
+def reap(now=None):
+    """
+    Returns expired leases and leases of disabled reviewers to the queue and
+    re-syncs queue membership with the applications table. Returns a dict of counts.
+    """
+    now = now or timezone.now()
+    released = {'claimed_by': None, 'lease_expires_at': None}
+    stats = {
+        'expired': RatingQueueSlot.objects.filter(lease_expires_at__lt=now).update(**released),
+        'abandoned': RatingQueueSlot.objects.filter(claimed_by__disabled_at__isnull=False).update(**released),
+        'added': 0,
+        'removed': 0,
+    }
+
+    for rating_round in ROUNDS:
+        eligible = set(Application2017.objects.get_need_rating(rating_round).values_list('pk', flat=True))
+        queued = set(RatingQueueSlot.objects.filter(round=rating_round).values_list('application_id', flat=True))
+
+        stale = queued - eligible
+        if stale:
+            stats['removed'] += RatingQueueSlot.objects.filter(round=rating_round, application_id__in=stale).delete()[0]
+
+        missing = eligible - queued
+        create_slots([RatingQueueSlot(round=rating_round, application_id=pk) for pk in missing])
+        stats['added'] += len(missing)
+
+    return stats
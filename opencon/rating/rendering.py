@@ -0,0 +1,115 @@
+"""
+Formatting of the application data shown on the rating pages.
+
+Every displayed field has a formatter which turns the stored value into the
+text shown to the reviewers (choice codes into labels, stored lists into
+comma-separated labels, ...). The formatters of the fields displayed in each
+round are looked up once, when the module is imported (RENDERERS), so
+rendering an application is a single pass over its displayed fields.
+"""
+import logging
+
+from opencon.application.models import CHOICE_LABELS, DISPLAYED_FIELDS_ROUND_0, DISPLAYED_FIELDS_ROUND_1, DISPLAYED_FIELDS_ROUND_2
+from opencon.application.utils import decode_literal
+
+logger = logging.getLogger(__name__)
+
+
+class MalformedValue(ValueError):
+    pass
+
+
+def parse_literal(value):
+    """Lists are decoded by ChoiceListField already, other fields store them as text"""
+    try:
+        return decode_literal(value)
+    except ValueError as e:
+        raise MalformedValue(str(e))
+
+
+def simple_choice(name):
+    def format_value(value):
+        return CHOICE_LABELS.label(name, value)
+    return format_value
+
+
+def multi_choice(name):
+    def format_value(value):
+        if not value:
+            return ''
+        return ', '.join(CHOICE_LABELS.labels(name, parse_literal(value)))
+    return format_value
+
+
+def comma_list(name):
+    # imported from drafts -- not stored as lists (`['value1', 'value2']`) but as strings (`value1, value2`)
+    def format_value(value):
+        if not value:
+            return ''
+        return ', '.join(CHOICE_LABELS.labels(name, value.split(', ')))
+    return format_value
+
+
+def format_gender(value):
+    """Stored as (choice, written in answer)"""
+    choice, written_in = parse_literal(value)
+    if written_in:
+        return CHOICE_LABELS.label('gender', written_in, written_in)
+    return CHOICE_LABELS.label('gender', choice)
+
+
+def format_ethnicity(value):
+    """Stored as ([choices], written in answer)"""
+    choices, written_in = parse_literal(value)
+    if not choices and not written_in:  # the question is optional, skipping it stores (None, None)
+        return ''
+    labels = CHOICE_LABELS.labels('ethnicity', [choice for choice in choices or [] if choice != 'other'])
+    if written_in:
+        labels.append('WRITTEN IN: ' + written_in)
+    return ', '.join(labels)
+
+
+FORMATTERS = {
+    'citizenship': simple_choice('citizenship'),
+    'residence': simple_choice('residence'),
+    'field': simple_choice('field'),
+    'age': simple_choice('age'),
+    'fundraising_potential': simple_choice('fundraising_potential'),
+    'experience': simple_choice('experience'),
+    'profession': multi_choice('profession'),
+    'events': multi_choice('events'),
+    'degrees': multi_choice('degrees'),
+    'expenses': multi_choice('expenses'),
+    'attended': comma_list('attended'),
+    'engagement': comma_list('engagement'),
+    'gender': format_gender,
+    'ethnicity': format_ethnicity,
+}
+
+
+class ApplicationRenderer(object):
+    """Renders the given fields of applications (see Application2017.get_data) for the rating pages"""
+
+    def __init__(self, fields=None):
+        self.fields = list(fields) if fields is not None else None  # None -- all fields
+        self.formatters = {name: FORMATTERS[name] for name in self.fields or FORMATTERS if name in FORMATTERS}
+
+    def render(self, application):
+        data = application.get_data(self.fields)
+        for item in data:
+            formatter = self.formatters.get(item.get('name'))
+            if formatter is None:
+                continue
+            try:
+                item['content'] = formatter(item['content'])
+            except (MalformedValue, TypeError, ValueError, AttributeError):
+                # shown as it is stored
+                logger.warning('Malformed %s of application %s: %r', item['name'], application.pk, item['content'])
+        return data
+
+
+RENDERERS = {
+    0: ApplicationRenderer(DISPLAYED_FIELDS_ROUND_0),
+    1: ApplicationRenderer(DISPLAYED_FIELDS_ROUND_1),
+    2: ApplicationRenderer(DISPLAYED_FIELDS_ROUND_2),
+}
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from opencon.application.models import Application2017
+
+from . import leaderboard, queue
+from .models import RatingFlag, Round0Rating, Round1Rating, Round2Rating
+
+RATING_MODELS = {
+    Round0Rating: 0,
+    Round1Rating: 1,
+    Round2Rating: 2,
+}
+
+
+@receiver(post_save, sender=Application2017)
+def sync_rating_queue(sender, instance, created=False, raw=False, **kwargs):
+    """Every save recalculates the ratings -- add / remove the application to / from the rating queues accordingly"""
+    if not raw:
+        queue.sync_application(instance, created)
+
+
+def finish_rating_lease(sender, instance, raw=False, **kwargs):
+    if not raw:
+        queue.finish(instance.created_by_id, instance.application_id, RATING_MODELS[sender])
+
+for model in RATING_MODELS:
+    post_save.connect(finish_rating_lease, sender=model, dispatch_uid='finish_rating_lease_{}'.format(model.__name__))
+
+
+def subtract_rating_contribution(sender, instance, **kwargs):
+    """
+    Deleted ratings no longer count towards the running totals of the application.
+    The application is recalculated once the transaction commits -- if the rating
+    was deleted together with its application, there is nothing left to recalculate.
+    """
+    application_id = instance.application_id
+    Application2017.objects.update_summary(application_id, instance.get_contribution(), sign=-1)
+
+    def recalculate():
+        application = Application2017.objects.get_all().filter(pk=application_id).first()
+        if application is not None:
+            application.save()
+
+    transaction.on_commit(recalculate)
+
+for model in RATING_MODELS:
+    post_delete.connect(subtract_rating_contribution, sender=model, dispatch_uid='subtract_rating_contribution_{}'.format(model.__name__))
+
+
+def invalidate_leaderboard(sender, instance, raw=False, **kwargs):
+    if not raw:
+        leaderboard.invalidate(RATING_MODELS[sender])
+
+for model in RATING_MODELS:
+    post_save.connect(invalidate_leaderboard, sender=model, dispatch_uid='invalidate_leaderboard_save_{}'.format(model.__name__))
+    post_delete.connect(invalidate_leaderboard, sender=model, dispatch_uid='invalidate_leaderboard_delete_{}'.format(model.__name__))
+
+
+def delete_rating_flags(sender, instance, **kwargs):
+    RatingFlag.objects.filter(round=RATING_MODELS[sender], rating_id=instance.pk).delete()
+
+for model in (Round1Rating, Round2Rating):
+    post_delete.connect(delete_rating_flags, sender=model, dispatch_uid='delete_rating_flags_{}'.format(model.__name__))
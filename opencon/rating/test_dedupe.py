@@ -0,0 +1,38 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from opencon.application.testing import create_application
+from .models import RatingFlag, User, Round1Rating
+
+
+class TestDedupeRatings(TestCase):
+    def setUp(self):
+        # the duplicates were created before the unique constraint (dropped before any rating is inserted,
+        # PostgreSQL does not alter a table with pending foreign key checks)
+        with connection.schema_editor() as editor:
+            editor.alter_unique_together(Round1Rating, Round1Rating._meta.unique_together, [])
+        self.application = create_application()
+        self.reviewer = User.objects.create(email='no@mail.com')
+
+    def test_duplicates_are_deleted_and_totals_recalculated(self):
+        first = Round1Rating.objects.create(created_by=self.reviewer, application=self.application, rating=Decimal('4.0'), recommendations=['oc'])
+        latest = Round1Rating.objects.create(created_by=self.reviewer, application=self.application, rating=Decimal('8.0'))
+
+        out = StringIO()
+        call_command('dedupe_ratings', stdout=out)
+        self.assertIn('Round1Rating: 1 duplicate ratings deleted.', out.getvalue())
+        self.assertEqual(list(Round1Rating.objects.values_list('pk', flat=True)), [latest.pk])
+        self.assertFalse(RatingFlag.objects.filter(round=1, rating_id=first.pk).exists())
+
+        self.application.refresh_from_db()
+        self.assertEqual((self.application.r1_count, self.application.r1_sum, self.application.rating1), (1, Decimal('8.0'), 8.0))
+
+    def test_dry_run(self):
+        for rating in ['4.0', '8.0']:
+            Round1Rating.objects.create(created_by=self.reviewer, application=self.application, rating=Decimal(rating))
+        call_command('dedupe_ratings', dry_run=True, stdout=StringIO())
+        self.assertEqual(Round1Rating.objects.count(), 2)
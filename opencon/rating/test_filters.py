@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+
+from opencon.application.models import CHOICE_LABELS, Application2017
+from opencon.application.testing import create_application
+from .filters import Round1NeedsReviewFilter
+from .models import User
+
+
+class TestRound1NeedsReviewFilter(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='no@mail.com')
+        for citizenship in ['BR', 'BR', 'SK']:
+            create_application(citizenship=citizenship)
+        self.queryset = Application2017.objects.all()
+
+    def test_choices_with_counts(self):
+        with self.assertNumQueries(3):  # one grouped query per facet
+            choices = Round1NeedsReviewFilter(queryset=self.queryset, user=self.user).form.fields['citizenship'].choices
+        self.assertEqual([label for value, label in choices], ['Brazil (2)', 'Slovakia (1)'])
+
+        with self.assertNumQueries(0):
+            Round1NeedsReviewFilter(queryset=self.queryset, user=self.user).form
+
+    def test_every_facet_is_labelled(self):
+        fields = Round1NeedsReviewFilter(queryset=self.queryset, user=self.user).form.fields
+        self.assertEqual(fields['area_of_interest'].choices, [
+            ('open_access', '{} (3)'.format(CHOICE_LABELS.label('area_of_interest', 'open_access'))),
+        ])
+        self.assertEqual(fields['field'].choices, [('un0322', '{} (3)'.format(CHOICE_LABELS.label('field', 'un0322')))])
+
+    def test_selected_values_are_kept(self):
+        data = QueryDict('citizenship=CZ')
+        filterset = Round1NeedsReviewFilter(data, queryset=self.queryset, user=self.user)
+        self.assertIn(('CZ', 'Czechia (0)'), filterset.form.fields['citizenship'].choices)
+        self.assertEqual(list(filterset.qs), [])
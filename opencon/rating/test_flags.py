@@ -0,0 +1,48 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from opencon.application.testing import create_application
+from .models import RatingFlag, User, Round1Rating, Round2Rating
+
+
+class TestRatingFlags(TestCase):
+    def setUp(self):
+        self.reviewers = [User.objects.create(email='{}@example.com'.format(i), nick='reviewer{}'.format(i)) for i in range(2)]
+        self.applications = [create_application() for i in range(2)]
+
+    def rate(self, reviewer, application, recommendations=(), issues=()):
+        return Round1Rating.objects.create(
+            created_by=reviewer, application=application, rating=Decimal('7.0'),
+            recommendations=list(recommendations), issues=list(issues),
+        )
+
+    def test_flags_follow_the_ratings(self):
+        first = self.rate(self.reviewers[0], self.applications[0], ['certificate', 'oc'], ['personal_relationship'])
+        self.rate(self.reviewers[1], self.applications[0], ['certificate'])
+        self.rate(self.reviewers[0], self.applications[1], ['oc'])
+
+        self.assertEqual(set(RatingFlag.objects.applications('certificate')), {self.applications[0].pk})
+        self.assertEqual(set(RatingFlag.objects.applications('certificate', min_count=2)), {self.applications[0].pk})
+        self.assertEqual(set(RatingFlag.objects.applications('oc', min_count=2)), set())
+        self.assertEqual(list(RatingFlag.objects.filter(round=1).ratings('personal_relationship')), [first.pk])
+        self.assertEqual(RatingFlag.objects.counts(), {(1, 'certificate'): 2, (1, 'oc'): 2, (1, 'personal_relationship'): 1})
+
+        first.recommendations = []
+        first.save()
+        self.assertEqual(RatingFlag.objects.counts()[(1, 'certificate')], 1)
+        first.delete()
+        self.assertNotIn((1, 'personal_relationship'), RatingFlag.objects.counts())
+
+    def test_backfill(self):
+        self.rate(self.reviewers[0], self.applications[0], ['certificate'], ['problem'])
+        Round2Rating.objects.create(
+            created_by=self.reviewers[1], application=self.applications[0], rating=Decimal('8.0'),
+            decision='yes', comments='Great work.', recommendations=['speaker'],
+        )
+        RatingFlag.objects.all().delete()
+
+        call_command('backfill_rating_flags', stdout=StringIO())
+        self.assertEqual(RatingFlag.objects.counts(), {(1, 'certificate'): 1, (1, 'problem'): 1, (2, 'speaker'): 1})
@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import User
+
+
+@override_settings(REVIEWER_MAIL_ENABLED=True, BASE_URL='https://apply.example.org', FROM_MAIL='opencon@example.org')
+class InviteReviewersTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(email='alice@example.com', first_name='Alice', nick='alice')
+        self.bob = User.objects.create(email='bob@example.com', first_name='Bob', nick='bob')
+        User.objects.create(email='invited@example.com', nick='invited', invitation_sent=True)
+        User.objects.create(email='disabled@example.com', nick='disabled', disabled_at=timezone.now())
+
+    def invite(self, *args):
+        out = StringIO()
+        call_command('invite_reviewers', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run(self):
+        self.assertIn('Would invite 2 reviewers.', self.invite('--dry-run'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(User.objects.filter(pk=self.alice.pk, invitation_sent=True).exists())
+
+    def test_invite(self):
+        self.assertIn('Invited 2 reviewers.', self.invite('--batch-size', '1'))
+        self.assertEqual([message.to for message in mail.outbox], [['alice@example.com'], ['bob@example.com']])
+        self.assertIn('https://apply.example.org' + reverse('rating:login', args=[self.alice.uuid.hex]), mail.outbox[0].body)
+        self.assertEqual(User.objects.filter(invitation_sent=False).count(), 1)  # the disabled reviewer
+
+        self.assertIn('Invited 0 reviewers.', self.invite())
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from opencon.application.testing import create_application
+from . import leaderboard
+from .models import User, Round0Rating, Round1Rating
+
+
+class TestLeaderboard(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reviewers = [User.objects.create(email='{}@example.com'.format(i), nick='reviewer{}'.format(i)) for i in range(2)]
+        for rating in ['9.0', '5.5', '7.0']:
+            application = create_application()
+            Round0Rating.objects.create(created_by=self.reviewers[1], application=application, decision='yes')
+            Round1Rating.objects.create(created_by=self.reviewers[0], application=application, rating=Decimal(rating))
+
+    def test_matches_per_user_statistics(self):
+        with self.assertNumQueries(1):
+            rows = leaderboard.compute_leaderboard(1)
+        self.assertEqual([row.name for row in rows], ['reviewer0'])
+        self.assertEqual(rows[0].finished_count, 3)
+        self.assertAlmostEqual(rows[0].avg, float(self.reviewers[0].avg()))
+        self.assertAlmostEqual(rows[0].standard_deviation, self.reviewers[0].standard_deviation())
+
+        self.assertEqual(leaderboard.compute_leaderboard(0), [leaderboard.LeaderboardRow('reviewer1', 3, None, None)])
+
+    def test_leaderboard_is_cached(self):
+        leaderboard.get_leaderboard(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.get_leaderboard(1)[0].finished_count, 3)
@@ -0,0 +1,57 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from opencon.application.models import Application2017
+from opencon.application.testing import create_application
+from . import queue
+from .models import User, Round0Rating, RatingQueueSlot
+
+
+class TestRatingQueue(TestCase):
+    def setUp(self):
+        self.applications = [create_application() for _ in range(3)]
+        self.alice = User.objects.create(email='alice@example.com', is_round_0_reviewer=True)
+        self.bob = User.objects.create(email='bob@example.com', is_round_0_reviewer=True)
+
+    def test_new_applications_are_queued(self):
+        self.assertEqual(RatingQueueSlot.objects.filter(round=0).count(), 3)
+
+    def test_leased_application_is_not_given_to_another_reviewer(self):
+        first = queue.claim(self.alice, 0)
+        second = queue.claim(self.bob, 0)
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertNotEqual(first, second)
+
+    def test_rated_application_is_not_offered_again(self):
+        application = queue.claim(self.alice, 0)
+        Round0Rating.objects.create(created_by=self.alice, application=application, decision='no')
+        for _ in range(5):
+            self.assertNotEqual(queue.claim(self.alice, 0), application)
+
+    def test_reap_returns_expired_lease(self):
+        application = queue.claim(self.alice, 0)
+        RatingQueueSlot.objects.filter(claimed_by=self.alice).update(
+            lease_expires_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        stats = queue.reap()
+        self.assertEqual(stats['expired'], 1)
+        self.assertFalse(RatingQueueSlot.objects.filter(application=application, claimed_by__isnull=False).exists())
+
+    def test_unchanged_application_is_not_synced(self):
+        application = Application2017.objects.get(pk=self.applications[0].pk)
+        with self.assertNumQueries(1):  # the UPDATE of the application only
+            application.save()
+
+        RatingQueueSlot.objects.filter(application=application).delete()
+        application.status = 'whitelist3'  # no longer needs any rating
+        with self.assertNumQueries(2):  # + the DELETE of its slots (there is nothing to add)
+            application.save()
+
+    def test_decided_application_leaves_the_queue(self):
+        application = queue.claim(self.alice, 0)
+        Round0Rating.objects.create(created_by=self.alice, application=application, decision='yes')
+        self.assertFalse(RatingQueueSlot.objects.filter(round=0, application=application).exists())
+        self.assertTrue(RatingQueueSlot.objects.filter(round=1, application=application).exists())
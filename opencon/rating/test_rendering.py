@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from opencon.application.testing import create_application
+from .rendering import FORMATTERS, RENDERERS, ApplicationRenderer
+
+
+class TestApplicationRenderer(TestCase):
+    def render(self, rating_round, application):
+        return {item['name']: item['content'] for item in RENDERERS[rating_round].render(application) if 'name' in item}
+
+    def test_choices_are_labelled(self):
+        application = create_application(events="['oa_week']", attended='2015, 2016')
+        data = self.render(2, application)
+        self.assertEqual(data['events'], 'Open Access Week')
+        self.assertEqual(data['attended'], 'OpenCon 2015, OpenCon 2016')
+        self.assertEqual(data['gender'], 'Female')
+        self.assertEqual(data['ethnicity'], 'European origin')
+
+    def test_malformed_value_is_logged_and_shown_as_stored(self):
+        application = create_application(gender='female')
+        with self.assertLogs('opencon.rating.rendering', 'WARNING'):
+            data = ApplicationRenderer(['gender']).render(application)
+        self.assertEqual(data[0]['content'], 'female')
+
+    def test_skipped_answers_are_empty(self):
+        application = create_application(ethnicity=[None, None])  # see OptionalMultiChoiceField.compress
+        data = ApplicationRenderer(['ethnicity']).render(application)
+        self.assertEqual(data[0]['content'], '')
+        self.assertEqual(FORMATTERS['attended'](None), '')
+        self.assertEqual(FORMATTERS['profession'](None), '')
+
+    def test_written_in_ethnicity_without_choices(self):
+        application = create_application(ethnicity=[None, 'Written in answer'])
+        data = ApplicationRenderer(['ethnicity']).render(application)
+        self.assertEqual(data[0]['content'], 'WRITTEN IN: Written in answer')
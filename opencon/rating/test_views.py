@@ -1,8 +1,18 @@
-from django.test import TestCase
-from .models import User
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from opencon.application.testing import create_application
+from .models import User, Round0Rating, Round1Rating
 from django.core.urlresolvers import reverse
 
 
+class TestImports(SimpleTestCase):
+    def test_views_and_urls_import(self):
+        from . import filters, rendering, views  # they import CHOICE_LABELS from the application models
+        self.assertIn('citizenship', rendering.FORMATTERS)
+        self.assertEqual(reverse('rating:rate_round1'), '/rate/round1/')
+
+
 class TestLoginView(TestCase):
     def test_valid_user_login(self):
         user = User.objects.create(email='no@mail.com')
@@ -29,3 +39,53 @@ class TestLogoutView(TestCase):
         logout_response = self.client.get(logout_url)
 
         self.assertIsNone(self.client.session.get('user_pk'))
+
+
+class TestAllRound1View(TestCase):
+    def test_rated_applications_are_highlighted(self):
+        user = User.objects.create(email='no@mail.com')
+        applications = [create_application() for _ in range(2)]
+        for application in applications:
+            Round0Rating.objects.create(created_by=user, application=application, decision='yes')
+        Round1Rating.objects.create(created_by=user, application=applications[0], rating=Decimal('6.0'))
+
+        self.client.get(reverse('rating:login', kwargs={'uuid': user.uuid.hex}))
+        response = self.client.get(reverse('rating:all1'))
+        self.assertEqual(response.context['rated_ids'], {applications[0].pk})
+        self.assertContains(response, 'table_highlight_green', count=2)  # the row + the legend
+
+    @override_settings(RATING_LIST_PAGE_SIZE=2)
+    def test_keyset_pagination(self):
+        user = User.objects.create(email='no@mail.com')
+        applications = [create_application() for _ in range(3)]
+        for application in applications:
+            Round0Rating.objects.create(created_by=user, application=application, decision='yes')
+
+        self.client.get(reverse('rating:login', kwargs={'uuid': user.uuid.hex}))
+        url = reverse('rating:all1')
+        first = self.client.get(url).context
+        self.assertEqual([a.pk for a in first['object_list']], [a.pk for a in applications[:2]])
+        self.assertIsNone(first['keyset_page'].previous_url)
+
+        second = self.client.get(url + first['keyset_page'].next_url).context
+        self.assertEqual([a.pk for a in second['object_list']], [applications[2].pk])
+        self.assertIsNone(second['keyset_page'].next_url)
+
+        back = self.client.get(url + second['keyset_page'].previous_url).context
+        self.assertEqual([a.pk for a in back['object_list']], [a.pk for a in applications[:2]])
+
+
+class TestRound1RateView(TestCase):
+    def test_second_submission_updates_the_rating(self):
+        user = User.objects.create(email='no@mail.com')
+        application = create_application()
+        Round0Rating.objects.create(created_by=user, application=application, decision='yes')
+
+        self.client.get(reverse('rating:login', kwargs={'uuid': user.uuid.hex}))
+        for rating in ['6.0', '8.0']:
+            self.client.post(reverse('rating:rate_round1'), {'application': application.pk, 'rating': rating})
+
+        ratings = Round1Rating.objects.filter(application=application, created_by=user)
+        self.assertEqual([r.rating for r in ratings], [Decimal('8.0')])
+        application.refresh_from_db()
+        self.assertEqual(application.r1_count, 1)
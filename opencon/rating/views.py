@@ -1,6 +1,5 @@
 from django.conf import settings
 from django.core.urlresolvers import reverse_lazy
-from django.db.models import Count
 from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import View, TemplateView, ListView
@@ -11,14 +10,16 @@ from .filters import Round1NeedsReviewFilter
 # #todo -- #annualcheck -- import the correct model
 from opencon.application.models import Application2017
 
+from . import leaderboard, queue
+from .pagination import KeysetPaginationMixin
+from .rendering import RENDERERS
 from .forms import Round0RateForm, Round1RateForm, Round2RateForm, ChangeStatusForm
 from .models import User, Round0Rating, Round1Rating, Round2Rating
 
 from abc import ABC, abstractproperty, abstractmethod
 
-from opencon.application.models import DISPLAYED_FIELDS_ROUND_0, DISPLAYED_FIELDS_ROUND_1, DISPLAYED_FIELDS_ROUND_2
-
-import ast
+# columns shown by the application lists (the essays etc. are not loaded, see `.only()` in the views below)
+LIST_FIELDS = ['first_name', 'last_name', 'citizenship', 'affiliation_1']
 
 class AuthenticatedMixin(View, ABC):
 
@@ -78,7 +79,7 @@ class Logout(View):
 
 
 class AbstractRateView(AuthenticatedMixin, View, ABC):
-    displayed_data = DISPLAYED_FIELDS_ROUND_1
+    renderer = RENDERERS[1]
 
     @abstractproperty
     def rate_form_class(self):
@@ -104,63 +105,7 @@ class AbstractRateView(AuthenticatedMixin, View, ABC):
                     'application': application.id,
                 }
             )
-        displayed_data = application.get_data(self.displayed_data)
-        for item in displayed_data:
-
-            # *** fix simple values ***
-            if item.get('name')=='citizenship':
-                item['content']=dict(Application2017.COUNTRY_CHOICES).get(item.get('content'))
-            if item.get('name')=='residence':
-                item['content']=dict(Application2017.COUNTRY_CHOICES).get(item.get('content'))
-            if item.get('name')=='field':
-                item['content']=dict(Application2017.FIELD_CHOICES).get(item.get('content'))
-            # ... and more fields from R2 form
-            if item.get('name')=='age':
-                item['content']=dict(Application2017.AGE_CHOICES).get(item.get('content'))
-            if item.get('name')=='fundraising_potential':
-                item['content']=dict(Application2017.FUNDRAISING_POTENTIAL_CHOICES).get(item.get('content'))
-            if item.get('name')=='experience':
-                item['content']=dict(Application2017.EXPERIENCE_CHOICES).get(item.get('content'))
-
-            # *** fix checkboxes ***
-            if item.get('name')=='profession':
-                item['content']=', '.join([dict(Application2017.PROFESSION_CHOICES).get(choice) for choice in ast.literal_eval(item.get('content'))])
-            if item.get('name')=='events':
-                item['content']=', '.join([dict(Application2017.EVENTS_CHOICES).get(choice) for choice in ast.literal_eval(item.get('content'))])
-            if item.get('name')=='degrees':
-                item['content']=', '.join([dict(Application2017.DEGREES_CHOICES).get(choice) for choice in ast.literal_eval(item.get('content'))])
-            if item.get('name')=='expenses':
-                item['content']=', '.join([dict(Application2017.EXPENSES_CHOICES).get(choice) for choice in ast.literal_eval(item.get('content'))])
-
-            # *** fix checkboxes stored as simple comma-separated values ***
-            # (these are imported elements, not properly stored as lists: `['value1', 'value2']` but as strings: `value1, value2`)
-            if item.get('name')=='attended' and item.get('content'):
-                item['content']=', '.join([dict(Application2017.ATTENDED_CHOICES).get(choice) for choice in item.get('content').split(', ')])
-            if item.get('name')=='engagement' and item.get('content'):
-                item['content']=', '.join([dict(Application2017.ENGAGEMENT_CHOICES).get(choice) for choice in item.get('content').split(', ')])
-
-            # *** fix complex fields (gender, ethnicity) ***
-            if item.get('name')=='gender':
-                try:
-                    content=ast.literal_eval(item.get('content'))
-                    if content[1]:
-                        item['content'] = dict(Application2017.GENDER_CHOICES).get(content[1])
-                    else:
-                        item['content'] = dict(Application2017.GENDER_CHOICES).get(content[0])
-                except:
-                    print('error parsing gender')
-
-            if item.get('name')=='ethnicity':
-                lst = []
-                try:
-                    content=ast.literal_eval(item.get('content'))
-                    if content[0]:
-                        lst.extend([dict(Application2017.ETHNICITY_CHOICES).get(choice) for choice in content[0] if choice!='other'])
-                    if content[1]:
-                        lst.append(str('WRITTEN IN: ' + content[1]))
-                    item['content']=', '.join(lst)
-                except:
-                    print('error parsing ethnicity')
+        displayed_data = self.renderer.render(application)
 
         context = {
             'user': created_by,
@@ -181,6 +126,20 @@ class AbstractRateView(AuthenticatedMixin, View, ABC):
 
         return context
 
+    def get_rate_form(self, request, user, rating_pk):
+        """
+        The rating form for the POSTed data -- bound to the edited rating or to the
+        reviewer's existing rating of the application (there is one per reviewer,
+        e.g. a form submitted twice updates it)
+        """
+        model = self.rate_form_class._meta.model
+        if rating_pk is not None:
+            rating = get_object_or_404(model, pk=rating_pk, created_by=user)
+        else:
+            application_pk = request.POST.get('application', '')
+            rating = model.objects.filter(application_id=application_pk, created_by=user).first() if application_pk.isdigit() else None
+        return self.rate_form_class(request.POST, instance=rating)
+
     def change_status(self, request, user, rating_pk):
         application = get_object_or_404(Application2017, pk=request.POST['application'])
 
@@ -200,7 +159,7 @@ class AbstractRateView(AuthenticatedMixin, View, ABC):
 
 
 class Round0RateView(AbstractRateView):
-    displayed_data = DISPLAYED_FIELDS_ROUND_0
+    renderer = RENDERERS[0]
     rate_form_class = Round0RateForm
     permission = 0
     skip_url = reverse_lazy('rating:rate_round0')
@@ -209,7 +168,7 @@ class Round0RateView(AbstractRateView):
         user = super().get_user(request)
 
         if rating_pk is None:
-            unrated = Application2017.objects.get_unrated0(user).order_by('?').first()
+            unrated = queue.claim(user, 0)
         else:
             unrated = get_object_or_404(Round0Rating, pk=rating_pk, created_by=user)
             if not unrated.application.need_rating0:
@@ -230,11 +189,7 @@ class Round0RateView(AbstractRateView):
         return render(request, template_name, context=context)
 
     def rate(self, request, user, rating_pk):
-        if rating_pk is None:
-            rate_form = Round0RateForm(request.POST)
-        else:
-            rating = get_object_or_404(Round0Rating, pk=rating_pk, created_by=user)
-            rate_form = Round1RateForm(request.POST, instance=rating)
+        rate_form = self.get_rate_form(request, user, rating_pk)
 
         if rate_form.is_valid():
             rating = rate_form.save(commit=False)
@@ -261,7 +216,7 @@ class Round1RateView(AbstractRateView):
         user = super().get_user(request)
 
         if rating_pk is None:
-            unrated = Application2017.objects.get_unrated(user).order_by('?').first()
+            unrated = queue.claim(user, 1)
         else:
             unrated = get_object_or_404(Round1Rating, pk=rating_pk, created_by=user)
             if not unrated.application.need_rating1:
@@ -282,11 +237,7 @@ class Round1RateView(AbstractRateView):
         return render(request, template_name, context=context)
 
     def rate(self, request, user, rating_pk):
-        if rating_pk is None:
-            rate_form = Round1RateForm(request.POST)
-        else:
-            rating = get_object_or_404(Round1Rating, pk=rating_pk, created_by=user)
-            rate_form = Round1RateForm(request.POST, instance=rating)
+        rate_form = self.get_rate_form(request, user, rating_pk)
 
         if rate_form.is_valid():
             rating = rate_form.save(commit=False)
@@ -336,8 +287,8 @@ class AbstractRound2RateView(AbstractRateView):
     permission = 2
     rate_form_class = Round2RateForm
     skip_url = reverse_lazy('rating:rate_round2')
-    displayed_data = DISPLAYED_FIELDS_ROUND_2
-    # displayed_data = None  # for displaying all the data
+    renderer = RENDERERS[2]
+    # renderer = rendering.ApplicationRenderer()  # for displaying all the data
 
     def get_context_data(self, created_by, application, rate_form=None):
         context = super().get_context_data(created_by, application, rate_form)
@@ -354,7 +305,7 @@ class Round2RateView(AbstractRound2RateView):
         context = {'user': user}
         template_name = 'rating/round2-rate.html'
         if rating_pk is None:  # new rating
-            application = Application2017.objects.get_unrated2(user).order_by('?').first()
+            application = queue.claim(user, 2)
             if application:
                 context = self.get_context_data(user, application)
             else:
@@ -367,11 +318,7 @@ class Round2RateView(AbstractRound2RateView):
         return render(request, template_name, context=context)
 
     def rate(self, request, user, rating_pk):
-        if rating_pk is None:
-            rate_form = Round2RateForm(request.POST)
-        else:
-            rating = get_object_or_404(Round2Rating, pk=rating_pk, created_by=user)
-            rate_form = Round2RateForm(request.POST, instance=rating)
+        rate_form = self.get_rate_form(request, user, rating_pk)
 
         if rate_form.is_valid():
             rating = rate_form.save(commit=False)
@@ -427,9 +374,7 @@ class Round0Stats(AuthenticatedMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        users = User.objects.annotate(finished_count0=Count('rated0')).prefetch_related('rated0')
-        users = users.filter(finished_count0__gte=1).order_by('-finished_count0')[:settings.LEADERBOARD_ROUND0_MAX_DISPLAYED]
-        context.update({'ranking': users})
+        context.update({'ranking': leaderboard.get_leaderboard(0)})
         return context
 
 
@@ -439,9 +384,7 @@ class Round1Stats(AuthenticatedMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        users = User.objects.annotate(finished_count=Count('rated')).prefetch_related('rated')
-        users = users.filter(finished_count__gte=1).order_by('-finished_count')[:settings.LEADERBOARD_ROUND1_MAX_DISPLAYED]
-        context.update({'ranking': users})
+        context.update({'ranking': leaderboard.get_leaderboard(1)})
         return context
 
 
@@ -451,60 +394,58 @@ class Round2Stats(AuthenticatedMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        users = User.objects.annotate(finished_count2=Count('rated2')).prefetch_related('rated2')
-        users = users.filter(finished_count2__gte=1).order_by('-finished_count2')[:settings.LEADERBOARD_ROUND2_MAX_DISPLAYED]
-        context.update({'ranking': users})
+        context.update({'ranking': leaderboard.get_leaderboard(2)})
         return context
 
 
-class Round1PreviousRatings(AuthenticatedMixin, ListView):
+class Round1PreviousRatings(KeysetPaginationMixin, AuthenticatedMixin, ListView):
     template_name = 'rating/ratings_list.html'
     permission = 1
 
     def get_queryset(self):
         user = self.get_user()
-        return Round1Rating.objects.filter(created_by=user) # .prefetch_related('application', 'application__institution')
+        ratings = Round1Rating.objects.filter(created_by=user).select_related('application')
+        return ratings.only('rating', 'application', *['application__{}'.format(name) for name in LIST_FIELDS])
 
-class AllRound1(AuthenticatedMixin, ListView):
+class AllRound1(KeysetPaginationMixin, AuthenticatedMixin, ListView):
     template_name = 'rating/application_list-round1.html'
     permission = 1
 
     def get_queryset(self):
-        return Application2017.objects.get_all_round1() # .prefetch_related('institution')
+        return Application2017.objects.get_all_round1().only(*LIST_FIELDS, 'area_of_interest', 'need_rating1')
 
     def get_context_data(self, **kwargs):
-        user_id = self.get_user().pk
-        user = User.objects.prefetch_related('rated', 'rated__application').get(pk=user_id) # #todo -- rename 'rated' to 'rated1' (once renamed, fix it in templates, too)
         context = super().get_context_data(**kwargs)
-        context.update({'user': user})
+        # ids of the applications the user rated -- the template highlights them with `object.pk in rated_ids`
+        rated_ids = set(self.get_user().rated.values_list('application_id', flat=True)) # #todo -- rename 'rated' to 'rated1'
+        context.update({'rated_ids': rated_ids})
         return context
 
-class AllRound2(AuthenticatedMixin, ListView):
+class AllRound2(KeysetPaginationMixin, AuthenticatedMixin, ListView):
     template_name = 'rating/application_list-round2.html'
     permission = 2
 
     def get_queryset(self):
-        return Application2017.objects.get_all_round2() # .prefetch_related('institution')
+        return Application2017.objects.get_all_round2().only(*LIST_FIELDS, 'rating2', 'need_rating2')
 
     def get_context_data(self, **kwargs):
-        user_id = self.get_user().pk
-        user = User.objects.prefetch_related('rated2', 'rated2__application').get(pk=user_id)
         context = super().get_context_data(**kwargs)
-        context.update({'user': user})
+        rated_ids = set(self.get_user().rated2.values_list('application_id', flat=True))
+        context.update({'rated_ids': rated_ids})
         return context
 
 # loosely inspired by https://web.archive.org/web/20170704150829/https://raw.githubusercontent.com/WISVCH/dienst2/4d79c79e519cd0ed9953bd60eef288619d071f6c/post/views.py
-class Round1NeedsReview(AuthenticatedMixin, FilterView):
+class Round1NeedsReview(KeysetPaginationMixin, AuthenticatedMixin, FilterView):
     template_name = 'rating/round1-needs-review.html'
     permission = 1
     filterset_class = Round1NeedsReviewFilter
+    keyset = ('citizenship', 'pk')
 
     def get_queryset(self):
-        return Application2017.objects.get_all_round1().exclude(ratings__created_by=self.user).order_by('citizenship') # .prefetch_related('institution') -- .select_related('sender', 'recipient', 'category')
+        applications = Application2017.objects.get_all_round1().exclude(ratings__created_by=self.user)
+        return applications.only('first_name', 'last_name', 'citizenship', 'field')
 
-    def get_context_data(self, **kwargs):
-        user_id = self.get_user().pk
-        user = User.objects.prefetch_related('rated', 'rated__application').get(pk=user_id) # #todo -- rename 'rated' to 'rated1' (once renamed, fix it in templates, too)
-        context = super(Round1NeedsReview, self).get_context_data(**kwargs)
-        context.update({'user': user})
-        return context
+    def get_filterset_kwargs(self, filterset_class):
+        kwargs = super().get_filterset_kwargs(filterset_class)
+        kwargs['user'] = self.user
+        return kwargs